@@ -3,12 +3,102 @@ from discord.ext import commands
 from discord.ui import Button, View, Select
 from datetime import datetime
 import asyncio
+import logging
 import requests
 
+logger = logging.getLogger(__name__)
+
+# Discord embeds hold at most 25 fields; query_members takes at most 100 ids
+JAILSTATUS_MAX_FIELDS = 25
+QUERY_MEMBERS_BATCH = 100
+
 class ModerationCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def _ensure_guild_user(self, db_manager, guild, member):
+        """Make sure the guild and user rows referenced by moderation records exist"""
+        await db_manager.get_or_create_guild(guild.id, {
+            'name': guild.name,
+            'owner_id': guild.owner_id,
+            'member_count': guild.member_count or 0
+        })
+        await db_manager.get_or_create_user(member.id, {
+            'username': member.name,
+            'discriminator': member.discriminator,
+            'display_name': member.display_name,
+            'bot': member.bot
+        })
+
+    async def _store_jail(self, guild, member, moderator, reason, original_roles):
+        """Persist a jail record and add it to the in-memory jail index"""
+        db_manager = getattr(self.bot, 'db_manager', None)
+        if db_manager:
+            try:
+                await self._ensure_guild_user(db_manager, guild, member)
+                await db_manager.jail_user(guild.id, member.id, moderator.id,
+                                           reason=reason, original_roles=original_roles)
+            except Exception as e:
+                logger.error(f"Failed to persist jail for user {member.id} in guild {guild.id}: {e}")
+
+        threat_detector = getattr(self.bot, 'threat_detector', None)
+        if threat_detector:
+            threat_detector.user_context.record_jail(guild.id, member.id)
+
+        self.bot.jail_data.setdefault(guild.id, {})[member.id] = {
+            'original_roles': original_roles,
+            'jailed_by': moderator.id,
+            'reason': reason,
+            'timestamp': datetime.now().timestamp()
+        }
+
+    async def _store_warning(self, guild, member, moderator, reason):
+        """Persist a warning so it counts towards the member's history"""
+        db_manager = getattr(self.bot, 'db_manager', None)
+        if db_manager:
+            try:
+                await self._ensure_guild_user(db_manager, guild, member)
+                await db_manager.add_warning(guild.id, member.id, moderator.id, reason=reason)
+            except Exception as e:
+                logger.error(f"Failed to persist warning for user {member.id} in guild {guild.id}: {e}")
+
+        threat_detector = getattr(self.bot, 'threat_detector', None)
+        if threat_detector:
+            threat_detector.user_context.record_warning(guild.id, member.id)
+
+    async def _release_jail(self, guild_id, user_id):
+        """Close the jail record and drop it from the in-memory jail index"""
+        self.bot.jail_data.get(guild_id, {}).pop(user_id, None)
+
+        db_manager = getattr(self.bot, 'db_manager', None)
+        if db_manager:
+            try:
+                await db_manager.unjail_user(guild_id, user_id)
+            except Exception as e:
+                logger.error(f"Failed to persist unjail for user {user_id} in guild {guild_id}: {e}")
+
+    async def _resolve_members(self, guild, user_ids):
+        """Resolve members from the cache, querying the gateway in batches for the rest"""
+        members = {}
+        missing = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member:
+                members[user_id] = member
+            else:
+                missing.append(user_id)
+
+        for start in range(0, len(missing), QUERY_MEMBERS_BATCH):
+            try:
+                batch = missing[start:start + QUERY_MEMBERS_BATCH]
+                for member in await guild.query_members(user_ids=batch, limit=len(batch)):
+                    members[member.id] = member
+            except (asyncio.TimeoutError, discord.ClientException) as e:
+                logger.warning(f"Failed to query jailed members in guild {guild.id}: {e}")
+                break
+
+        return members
+
     # Slash Commands
     @discord.app_commands.command(name="logs", description="Configure logging for server events")
     @commands.has_permissions(administrator=True)
@@ -370,15 +460,7 @@ class ModerationCog(commands.Cog):
                 return
 
             # Store jail data
-            if guild_id not in self.bot.jail_data:
-                self.bot.jail_data[guild_id] = {}
-
-            self.bot.jail_data[guild_id][member.id] = {
-                'original_roles': original_roles,
-                'jailed_by': ctx.author.id,
-                'reason': reason,
-                'timestamp': datetime.now().timestamp()
-            }
+            await self._store_jail(ctx.guild, member, ctx.author, reason, original_roles)
 
             # Send jail notification
             embed = discord.Embed(
@@ -494,7 +576,7 @@ class ModerationCog(commands.Cog):
                         await ctx.send(f"❌ Failed to restore role {role.name}: {e}")
 
             # Remove from jail data
-            del self.bot.jail_data[guild_id][member.id]
+            await self._release_jail(guild_id, member.id)
 
             # Send unjail notification
             embed = discord.Embed(
@@ -542,7 +624,8 @@ class ModerationCog(commands.Cog):
         """Check who is currently in jail"""
         guild_id = ctx.guild.id
 
-        if guild_id not in self.bot.jail_data or not self.bot.jail_data[guild_id]:
+        jailed = self.bot.jail_data.get(guild_id)
+        if not jailed:
             embed = discord.Embed(
                 title="🔒 Jail Status",
                 description="✅ No users are currently in jail.",
@@ -553,33 +636,39 @@ class ModerationCog(commands.Cog):
 
         embed = discord.Embed(
             title="🔒 Jail Status",
-            description=f"📊 **Total jailed users:** {len(self.bot.jail_data[guild_id])}",
+            description=f"📊 **Total jailed users:** {len(jailed)}",
             color=0xff9900
         )
 
-        for user_id, jail_info in self.bot.jail_data[guild_id].items():
-            try:
-                user = await self.bot.fetch_user(user_id)
-                time_in_jail = datetime.now().timestamp() - jail_info['timestamp']
-                hours = time_in_jail / 3600
+        shown = list(jailed.items())[:JAILSTATUS_MAX_FIELDS]
+        members = await self._resolve_members(ctx.guild, [user_id for user_id, _ in shown])
+        now = datetime.now().timestamp()
 
+        for user_id, jail_info in shown:
+            hours = (now - jail_info['timestamp']) / 3600
+            member = members.get(user_id)
+
+            if member:
                 embed.add_field(
-                    name=f"{user.name}#{user.discriminator}",
+                    name=f"{member.name}#{member.discriminator}",
                     value=f"**ID:** {user_id}\n"
                           f"**Jailed by:** <@{jail_info['jailed_by']}>\n"
                           f"**Time:** {hours:.1f} hours\n"
                           f"**Reason:** {jail_info['reason'] or 'No reason provided'}",
                     inline=False
                 )
-            except:
+            else:
                 embed.add_field(
                     name=f"Unknown User ({user_id})",
-                    value=f"**Time:** {(datetime.now().timestamp() - jail_info['timestamp']) / 3600:.1f} hours\n"
+                    value=f"**Time:** {hours:.1f} hours\n"
                           f"**Reason:** {jail_info['reason'] or 'No reason provided'}",
                     inline=False
                 )
 
-        embed.set_footer(text="Use !unjail @user to release a user")
+        footer = "Use !unjail @user to release a user"
+        if len(jailed) > len(shown):
+            footer = f"Showing {len(shown)} of {len(jailed)} • {footer}"
+        embed.set_footer(text=footer)
         await ctx.send(embed=embed)
 
     @commands.command(name='purge')
@@ -677,6 +766,8 @@ class ModerationCog(commands.Cog):
     @commands.has_permissions(manage_messages=True)
     async def warn(self, ctx, member: discord.Member, *, reason=None):
         """Warn a user"""
+        await self._store_warning(ctx.guild, member, ctx.author, reason)
+
         embed = discord.Embed(
             title="⚠️ User Warned",
             description=f"{member.mention} has been warned.",
@@ -105,6 +105,56 @@ class UtilityCommandsCog(commands.Cog):
 
         await ctx.send(embed=embed)
 
+    @commands.command(name='dbstats')
+    @commands.has_permissions(administrator=True)
+    async def dbstats(self, ctx, action: str = None):
+        """Show database query timings (admin only)"""
+        db_manager = getattr(self.bot, 'db_manager', None)
+        if not db_manager:
+            await ctx.send("❌ La base de datos no está disponible.")
+            return
+
+        if action == 'reset':
+            db_manager.reset_query_stats()
+            await ctx.send("✅ Estadísticas de consultas reiniciadas.")
+            return
+
+        stats = db_manager.get_query_stats(top=5)
+
+        embed = discord.Embed(
+            title="🗄️ Estadísticas de base de datos",
+            description=f"**Consultas registradas:** {stats['statement_count']}",
+            color=0x0099ff
+        )
+
+        methods = "\n".join(
+            f"`{m['name']}` • {m['count']}x • prom {m['avg_ms']:.1f}ms • p95 {m['p95_ms']:.0f}ms"
+            for m in stats['methods']
+        )
+        embed.add_field(name="⏱️ Métodos más costosos", value=methods[:1024] or "Sin datos", inline=False)
+
+        statements = "\n".join(
+            f"`{s['name'][:150]}`\n{s['count']}x • total {s['total_ms']:.0f}ms • filas {s['rows']}"
+            for s in stats['statements'][:3]
+        )
+        embed.add_field(name="🧾 Consultas más costosas", value=statements[:1024] or "Sin datos", inline=False)
+
+        pool = stats['pool_wait']
+        embed.add_field(
+            name="🏊 Espera del pool",
+            value=f"p50 {pool['p50_ms']:.0f}ms • p95 {pool['p95_ms']:.0f}ms • máx {pool['max_ms']:.1f}ms",
+            inline=False
+        )
+
+        slow = "\n".join(
+            f"{q['duration_ms']:.0f}ms • `{(q['method'] or '?')}` • `{q['sql'][:100]}`"
+            for q in stats['slow_queries'][-3:]
+        )
+        embed.add_field(name="🐢 Consultas lentas recientes", value=slow[:1024] or "Ninguna", inline=False)
+
+        embed.set_footer(text="Usa !dbstats reset para reiniciar las estadísticas")
+        await ctx.send(embed=embed)
+
     @commands.command(name='commands')
     async def commands(self, ctx):
         """Show a simple list of all commands"""
@@ -1,2 +1,4 @@
 # Config package initialization
 # This file makes the config directory a proper Python package
+
+from .manager import config_manager
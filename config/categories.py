@@ -80,7 +80,10 @@ COMMAND_CATEGORIES = {
             "`!warn <usuario> [razón]`": "Advertir a un usuario",
             "`!jail <usuario> [razón]`": "Enviar a un usuario a la cárcel",
             "`!unjail <usuario> [razón]`": "Liberar a un usuario de la cárcel",
-            "`!jailstatus`": "Ver usuarios en la cárcel"
+            "`!jailstatus`": "Ver usuarios en la cárcel",
+            "`!unlock`": "Levantar el bloqueo automático por raid",
+            "`!threats [minutos]`": "Ver un resumen de las amenazas detectadas",
+            "`!rule [regla] [campo] [valor]`": "Ver o ajustar las reglas de detección del servidor"
         },
         "color": 0xff0000
     },
@@ -0,0 +1,74 @@
+# Runtime settings read from the environment (.env in development)
+
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+@dataclass
+class DiscordSettings:
+    token: Optional[str] = field(default_factory=lambda: os.getenv('DISCORD_TOKEN'))
+    application_id: Optional[str] = field(default_factory=lambda: os.getenv('DISCORD_APPLICATION_ID'))
+    command_prefix: str = field(default_factory=lambda: os.getenv('DISCORD_COMMAND_PREFIX', '!'))
+
+@dataclass
+class DatabaseSettings:
+    database_url: str = field(default_factory=lambda: os.getenv('DATABASE_URL', 'sqlite+aiosqlite:///./discord_bot.db'))
+    pool_size: int = field(default_factory=lambda: _env_int('DATABASE_POOL_SIZE', 10))
+    max_overflow: int = field(default_factory=lambda: _env_int('DATABASE_MAX_OVERFLOW', 20))
+    pool_timeout: int = field(default_factory=lambda: _env_int('DATABASE_POOL_TIMEOUT', 30))
+    pool_recycle: int = field(default_factory=lambda: _env_int('DATABASE_POOL_RECYCLE', 3600))
+
+@dataclass
+class SecuritySettings:
+    max_commands_per_minute: int = field(default_factory=lambda: _env_int('MAX_COMMANDS_PER_MINUTE', 10))
+    max_commands_per_hour: int = field(default_factory=lambda: _env_int('MAX_COMMANDS_PER_HOUR', 100))
+
+@dataclass
+class LoggingSettings:
+    level: str = field(default_factory=lambda: os.getenv('LOG_LEVEL', 'INFO'))
+    log_file_path: str = field(default_factory=lambda: os.getenv('LOG_FILE', 'logs/bot.log'))
+    enable_file_logging: bool = field(default_factory=lambda: _env_bool('ENABLE_FILE_LOGGING', True))
+    max_file_size: int = field(default_factory=lambda: _env_int('LOG_MAX_FILE_SIZE', 10 * 1024 * 1024))
+    backup_count: int = field(default_factory=lambda: _env_int('LOG_BACKUP_COUNT', 5))
+    enable_external_logging: bool = field(default_factory=lambda: _env_bool('ENABLE_EXTERNAL_LOGGING', False))
+    external_logging_url: Optional[str] = field(default_factory=lambda: os.getenv('EXTERNAL_LOGGING_URL'))
+
+@dataclass
+class Settings:
+    bot_name: str = field(default_factory=lambda: os.getenv('BOT_NAME', 'Discord Bot'))
+    environment: str = field(default_factory=lambda: os.getenv('ENVIRONMENT', 'development'))
+    debug: bool = field(default_factory=lambda: _env_bool('DEBUG', False))
+    discord: DiscordSettings = field(default_factory=DiscordSettings)
+    database: DatabaseSettings = field(default_factory=DatabaseSettings)
+    security: SecuritySettings = field(default_factory=SecuritySettings)
+    logging: LoggingSettings = field(default_factory=LoggingSettings)
+
+class ConfigManager:
+    """Holds the bot settings loaded from environment variables"""
+
+    def __init__(self):
+        self.settings = Settings()
+
+    def get_encrypted_value(self, key: str) -> Optional[str]:
+        """Get a secret from the environment, decrypting it when CONFIG_ENCRYPTION_KEY is set"""
+        value = os.getenv(key)
+        encryption_key = os.getenv('CONFIG_ENCRYPTION_KEY')
+        if not value or not encryption_key:
+            return value
+        from cryptography.fernet import Fernet
+        return Fernet(encryption_key.encode()).decrypt(value.encode()).decode()
+
+config_manager = ConfigManager()
@@ -4,14 +4,26 @@ Provides persistent storage with SQLAlchemy ORM, migrations, and connection pool
 """
 
 import asyncio
-from typing import Optional, List, Dict, Any, Union
+import functools
+import os
+import itertools
+import re
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from typing import Optional, List, Dict, Any, Union, Tuple, TypeVar, Generic, Callable, Awaitable, Iterable, Set
 from datetime import datetime, timedelta
-from contextlib import asynccontextmanager
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, BigInteger, ForeignKey, Index, event, Float
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
-from sqlalchemy.pool import QueuePool
-from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from sqlalchemy import select, update, insert, delete, literal, func, desc, text, case, cast, and_, or_, table, column, create_engine, inspect, Computed, PrimaryKeyConstraint, UniqueConstraint, Column, Integer, String, Boolean, DateTime, Text, BigInteger, ForeignKey, Index, event, Float
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, relationship, declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError, InterfaceError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import logging
 import json
@@ -20,9 +32,14 @@ from config import config_manager
 # Set up logger
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
 # Base class for all models
 Base = declarative_base()
 
+# Surrogate keys: BIGINT everywhere, but SQLite only auto-increments INTEGER PRIMARY KEY
+BigIntegerPK = BigInteger().with_variant(Integer, 'sqlite')
+
 class Guild(Base):
     """Guild/Server model"""
     __tablename__ = "guilds"
@@ -85,7 +102,6 @@ class Role(Base):
 
     # Relationships
     guild = relationship("Guild", back_populates="roles")
-    members = relationship("GuildMember", back_populates="role", cascade="all, delete-orphan")
 
     # Indexes
     __table_args__ = (
@@ -123,7 +139,7 @@ class GuildMember(Base):
     """Guild member model"""
     __tablename__ = "guild_members"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     nickname = Column(String(100), nullable=True)
@@ -135,7 +151,6 @@ class GuildMember(Base):
     # Relationships
     guild = relationship("Guild", back_populates="members")
     user = relationship("User", back_populates="guild_memberships")
-    role = relationship("Role", back_populates="members")
 
     # Indexes
     __table_args__ = (
@@ -148,7 +163,7 @@ class LogConfig(Base):
     """Logging configuration model"""
     __tablename__ = "log_configs"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     channel_id = Column(BigInteger, nullable=False)
     enabled = Column(Boolean, default=True)
@@ -176,7 +191,7 @@ class JailConfig(Base):
     """Jail configuration model"""
     __tablename__ = "jail_configs"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     channel_id = Column(BigInteger, nullable=True)
     role_id = Column(BigInteger, nullable=True)
@@ -198,7 +213,7 @@ class JailRecord(Base):
     """Jail record model"""
     __tablename__ = "jail_records"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     jail_config_id = Column(BigInteger, ForeignKey('jail_configs.id'), nullable=False)
@@ -215,17 +230,34 @@ class JailRecord(Base):
 
     # Indexes
     __table_args__ = (
-        Index('ix_jail_records_guild_id', 'guild_id'),
+        Index('ix_jail_records_guild_user_active', 'guild_id', 'user_id', 'active'),
+        Index('ix_jail_records_guild_active', 'guild_id',
+              postgresql_where=text('active'), sqlite_where=text('active')),
         Index('ix_jail_records_user_id', 'user_id'),
-        Index('ix_jail_records_active', 'active'),
         Index('ix_jail_records_jailed_at', 'jailed_at'),
     )
 
+class WarningRecord(Base):
+    """Warning record model"""
+    __tablename__ = "warning_records"
+
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
+    guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
+    user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
+    moderator_id = Column(BigInteger, nullable=False)
+    reason = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Indexes
+    __table_args__ = (
+        Index('ix_warning_records_guild_user', 'guild_id', 'user_id'),
+    )
+
 class LogEntry(Base):
     """Log entry model"""
     __tablename__ = "log_entries"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=True)
     channel_id = Column(BigInteger, ForeignKey('channels.id'), nullable=True)
@@ -234,51 +266,48 @@ class LogEntry(Base):
     severity = Column(String(20), default="info")  # info, warning, error, critical
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
-    metadata = Column(Text, nullable=True)  # JSON data
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    event_metadata = Column('metadata', Text, nullable=True)  # JSON data ('metadata' is reserved by declarative)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
     user = relationship("User", back_populates="log_entries")
     channel = relationship("Channel", back_populates="log_entries")
     log_config = relationship("LogConfig", back_populates="log_entries")
 
-    # Indexes
+    # Indexes (partitioned by month on PostgreSQL)
     __table_args__ = (
-        Index('ix_log_entries_guild_id', 'guild_id'),
-        Index('ix_log_entries_event_type', 'event_type'),
-        Index('ix_log_entries_severity', 'severity'),
-        Index('ix_log_entries_timestamp', 'timestamp'),
+        Index('ix_log_entries_guild_timestamp', 'guild_id', 'timestamp'),
+        Index('ix_log_entries_timestamp', 'timestamp'),  # Guild-wide recent counts (get_database_stats)
+        {'postgresql_partition_by': 'RANGE (timestamp)', 'info': {'partition_column': 'timestamp'}},
     )
 
 class CommandUsage(Base):
     """Command usage tracking model"""
     __tablename__ = "command_usage"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=True)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     command_name = Column(String(50), nullable=False)
     execution_time = Column(Integer, nullable=False)  # in milliseconds
     success = Column(Boolean, default=True)
     error_message = Column(Text, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
     user = relationship("User")
 
-    # Indexes
+    # Indexes (partitioned by month on PostgreSQL)
     __table_args__ = (
-        Index('ix_command_usage_guild_id', 'guild_id'),
-        Index('ix_command_usage_user_id', 'user_id'),
-        Index('ix_command_usage_command_name', 'command_name'),
-        Index('ix_command_usage_timestamp', 'timestamp'),
+        Index('ix_command_usage_guild_timestamp', 'guild_id', 'timestamp'),
+        {'postgresql_partition_by': 'RANGE (timestamp)', 'info': {'partition_column': 'timestamp'}},
     )
 
 class RateLimit(Base):
     """Rate limiting model"""
     __tablename__ = "rate_limits"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=True)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     command_name = Column(String(50), nullable=False)
@@ -295,11 +324,87 @@ class RateLimit(Base):
         Index('ix_rate_limits_window_end', 'window_end'),
     )
 
+class DetectionEventRecord(Base):
+    """Threat detection event model"""
+    __tablename__ = "detection_events"
+
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
+    event_id = Column(String(36), nullable=False)
+    guild_id = Column(BigInteger, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    detection_type = Column(String(50), nullable=False)
+    threat_level = Column(String(20), nullable=False)
+    confidence = Column(Float, nullable=False)
+    rule_name = Column(String(100), nullable=True)
+    details = Column(Text, nullable=True)  # JSON data
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
+    resolved = Column(Boolean, default=False)
+    resolution = Column(Text, nullable=True)
+    resolved_by = Column(BigInteger, nullable=True)
+    resolved_at = Column(DateTime, nullable=True)
+
+    # Indexes
+    __table_args__ = (
+        Index('ix_detection_events_event_id', 'event_id', unique=True),
+        Index('ix_detection_events_guild_ts_type', 'guild_id', 'timestamp', 'detection_type'),
+    )
+
+class DetectionRuleOverride(Base):
+    """Per-guild override of a detection rule; NULL columns keep the default"""
+    __tablename__ = "detection_rule_overrides"
+
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
+    guild_id = Column(BigInteger, nullable=False)
+    rule_name = Column(String(50), nullable=False)
+    enabled = Column(Boolean, nullable=True)
+    threshold = Column(Integer, nullable=True)
+    time_window = Column(Integer, nullable=True)  # seconds
+    cooldown_period = Column(Integer, nullable=True)  # seconds
+    action = Column(String(20), nullable=True)
+    severity = Column(String(20), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Indexes
+    __table_args__ = (
+        UniqueConstraint('guild_id', 'rule_name', name='uq_detection_rule_overrides_guild_rule'),
+    )
+
+class RaidLockdown(Base):
+    """Raid lockdown in progress, kept so the verification level survives a restart"""
+    __tablename__ = "raid_lockdowns"
+
+    guild_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    previous_verification_level = Column(Integer, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    ends_at = Column(DateTime, nullable=False)
+
+@compiles(PrimaryKeyConstraint, 'postgresql')
+def _compile_partitioned_primary_key(constraint, compiler, **kw):
+    """PostgreSQL requires the partition key in a partitioned table's primary key.
+
+    The mapped primary key stays ``id`` (ids come from one sequence, so they are
+    still unique); only the DDL on PostgreSQL gets the partition column appended.
+    """
+    partition_column = constraint.table.info.get('partition_column') if constraint.table is not None else None
+    if not partition_column:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+
+    columns = [c.name for c in constraint.columns] + [partition_column]
+    return "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(name) for name in columns)
+
+# Tables range-partitioned by month on PostgreSQL
+PARTITIONED_TABLES = ('log_entries', 'command_usage')
+
+# Alembic scripts live next to this module; 0001 is the schema that create_all used to build
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alembic.ini')
+MIGRATIONS_DIR = os.path.join(os.path.dirname(ALEMBIC_INI), 'migrations')
+BASELINE_REVISION = '0001'
+
 class EconomySettings(Base):
     """Economy settings for guilds"""
     __tablename__ = "economy_settings"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     currency_symbol = Column(String(10), default="$")
     start_balance = Column(BigInteger, default=100)
@@ -340,11 +445,12 @@ class UserEconomy(Base):
     """User economy data"""
     __tablename__ = "user_economy"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     cash = Column(BigInteger, default=0)
     bank = Column(BigInteger, default=0)
+    net_worth = Column(BigInteger, Computed('cash + bank', persisted=True))
     total_earned = Column(BigInteger, default=0)
     last_work = Column(DateTime, nullable=True)
     last_slut = Column(DateTime, nullable=True)
@@ -360,14 +466,15 @@ class UserEconomy(Base):
 
     # Indexes
     __table_args__ = (
-        Index('ix_user_economy_guild_user', 'guild_id', 'user_id'),
+        UniqueConstraint('guild_id', 'user_id', name='uq_user_economy_guild_user'),
+        Index('ix_user_economy_guild_net_worth', 'guild_id', desc('net_worth'), 'user_id'),
     )
 
 class EconomyTransaction(Base):
     """Economy transactions for audit log"""
     __tablename__ = "economy_transactions"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     type = Column(String(50), nullable=False)  # add_money, remove_money, deposit, withdraw, etc.
@@ -390,7 +497,7 @@ class EconomyItem(Base):
     """Store items"""
     __tablename__ = "economy_items"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
@@ -415,7 +522,7 @@ class UserItem(Base):
     """User inventory"""
     __tablename__ = "user_items"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     item_id = Column(BigInteger, ForeignKey('economy_items.id'), nullable=False)
@@ -429,7 +536,7 @@ class UserItem(Base):
 
     # Indexes
     __table_args__ = (
-        Index('ix_user_items_guild_user', 'guild_id', 'user_id'),
+        UniqueConstraint('guild_id', 'user_id', 'item_id', name='uq_user_items_guild_user_item'),
         Index('ix_user_items_item_id', 'item_id'),
     )
 
@@ -437,7 +544,7 @@ class RoleIncome(Base):
     """Role-based income"""
     __tablename__ = "role_income"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     role_id = Column(BigInteger, nullable=False)
     income_amount = Column(BigInteger, nullable=False)
@@ -449,14 +556,14 @@ class RoleIncome(Base):
 
     # Indexes
     __table_args__ = (
-        Index('ix_role_income_guild_role', 'guild_id', 'role_id'),
+        UniqueConstraint('guild_id', 'role_id', name='uq_role_income_guild_role'),
     )
 
 class UserRoleIncome(Base):
     """User role income tracking"""
     __tablename__ = "user_role_income"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     role_income_id = Column(BigInteger, ForeignKey('role_income.id'), nullable=False)
@@ -469,14 +576,14 @@ class UserRoleIncome(Base):
 
     # Indexes
     __table_args__ = (
-        Index('ix_user_role_income_guild_user', 'guild_id', 'user_id'),
+        UniqueConstraint('guild_id', 'user_id', 'role_income_id', name='uq_user_role_income_guild_user_role'),
     )
 
 class CustomReply(Base):
     """Custom replies for commands"""
     __tablename__ = "custom_replies"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     command = Column(String(20), nullable=False)  # work, slut, crime
     type = Column(String(10), nullable=False)  # success, fail
@@ -488,14 +595,14 @@ class CustomReply(Base):
 
     # Indexes
     __table_args__ = (
-        Index('ix_custom_replies_guild_cmd', 'guild_id', 'command'),
+        Index('ix_custom_replies_guild_cmd_type', 'guild_id', 'command', 'type'),
     )
 
 class GameSettings(Base):
     """Game settings for guilds"""
     __tablename__ = "game_settings"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger, ForeignKey('guilds.id'), nullable=False)
     min_bet = Column(BigInteger, default=1)
     max_bet = Column(BigInteger, default=10000)
@@ -514,51 +621,762 @@ class GameSettings(Base):
         Index('ix_game_settings_guild_id', 'guild_id'),
     )
 
+class GuildConfigCache(Generic[T]):
+    """Read-through cache for per-guild configuration rows.
+
+    Entries are keyed by guild_id and expire after ``ttl`` seconds. A ``None``
+    result is cached too (negative entry), so guilds without a row stop hitting
+    the database. Concurrent misses for the same guild share a single load.
+    Cached objects are detached ORM instances and must be treated as read-only.
+    """
+
+    def __init__(self, name: str, ttl: float = 300.0, max_size: int = 10000):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[int, Tuple[float, Optional[T]]] = {}
+        self._pending: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, guild_id: int,
+                          loader: Callable[[], Awaitable[Optional[T]]]) -> Optional[T]:
+        """Return the cached value for a guild, loading it on a miss"""
+        entry = self._entries.get(guild_id)
+        if entry is not None and entry[0] > time.monotonic():
+            if entry[1] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[1]
+
+        pending = self._pending.get(guild_id)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[guild_id] = future
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(value)
+            # Only store if nobody invalidated the guild while we were loading
+            if self._pending.get(guild_id) is future:
+                self.set(guild_id, value)
+            return value
+        finally:
+            if self._pending.get(guild_id) is future:
+                del self._pending[guild_id]
+
+    def set(self, guild_id: int, value: Optional[T]):
+        """Store a value for a guild"""
+        if guild_id not in self._entries and len(self._entries) >= self.max_size:
+            # Evict the oldest inserted entry
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[guild_id] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, guild_id: int):
+        """Drop the cached value for a guild"""
+        self._entries.pop(guild_id, None)
+        self._pending.pop(guild_id, None)
+        self.invalidations += 1
+
+    def clear(self):
+        """Drop every cached value"""
+        self._entries.clear()
+        self._pending.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': (self.hits + self.negative_hits) / lookups if lookups else 0.0
+        }
+
+class LeaderboardIndex:
+    """In-memory net-worth ranking for one guild.
+
+    Keys are kept sorted as ``(-net_worth, user_id)``, matching the order of the
+    ``ix_user_economy_guild_net_worth`` index, so rank lookups are a bisect and
+    pages are slices.
+    """
+
+    __slots__ = ('_keys', '_net_worth', 'loaded_at')
+
+    def __init__(self, rows: Iterable[Tuple[int, int]]):
+        self._net_worth: Dict[int, int] = {user_id: net_worth or 0 for user_id, net_worth in rows}
+        self._keys: List[Tuple[int, int]] = sorted((-worth, user_id) for user_id, worth in self._net_worth.items())
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, user_id: int, net_worth: int):
+        """Move a user to their new position"""
+        self.remove(user_id)
+        insort(self._keys, (-net_worth, user_id))
+        self._net_worth[user_id] = net_worth
+
+    def remove(self, user_id: int):
+        """Drop a user from the ranking"""
+        old = self._net_worth.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based rank of a user, or None if they aren't ranked"""
+        net_worth = self._net_worth.get(user_id)
+        if net_worth is None:
+            return None
+        return bisect_left(self._keys, (-net_worth, user_id)) + 1
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int, int]]:
+        """Get ``(rank, user_id, net_worth)`` rows for a slice of the ranking"""
+        return [
+            (offset + i + 1, user_id, -neg_worth)
+            for i, (neg_worth, user_id) in enumerate(self._keys[offset:offset + limit])
+        ]
+
+class ConfigInvalidationChannel:
+    """Optional Redis pub/sub channel that propagates config cache invalidations
+    between bot processes sharing the same database"""
+
+    CHANNEL_NAME = "koala:config_invalidation"
+
+    def __init__(self, redis_url: str, caches: Dict[str, GuildConfigCache]):
+        self.redis_url = redis_url
+        self._caches = caches
+        self._redis = None
+        self._listener_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Connect to Redis and start listening for invalidations"""
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.from_url(self.redis_url)
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self.CHANNEL_NAME)
+        self._listener_task = asyncio.create_task(self._listen(pubsub))
+        logger.info("Config invalidation channel started")
+
+    async def _listen(self, pubsub):
+        """Apply invalidations published by other processes"""
+        try:
+            async for message in pubsub.listen():
+                if message.get('type') != 'message':
+                    continue
+                try:
+                    cache_name, guild_id = message['data'].decode().split(':', 1)
+                    cache = self._caches.get(cache_name)
+                    if cache:
+                        cache.invalidate(int(guild_id))
+                except (ValueError, AttributeError) as e:
+                    logger.warning(f"Ignoring malformed config invalidation message: {e}")
+        except asyncio.CancelledError:
+            await pubsub.unsubscribe(self.CHANNEL_NAME)
+            raise
+
+    async def publish(self, cache_name: str, guild_id: int):
+        """Tell other processes to drop a cached config"""
+        if not self._redis:
+            return
+        try:
+            await self._redis.publish(self.CHANNEL_NAME, f"{cache_name}:{guild_id}")
+        except Exception as e:
+            logger.error(f"Failed to publish config invalidation: {e}")
+
+    async def stop(self):
+        """Stop listening and close the Redis connection"""
+        if self._listener_task and not self._listener_task.done():
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+@dataclass
+class RetentionPolicy:
+    """How long rows of a table are kept"""
+    model: Any
+    timestamp_column: str
+    retention_days: float
+
+# Default retention per table, in days
+DEFAULT_RETENTION_DAYS = {
+    'log_entries': 30,
+    'command_usage': 90,
+    'rate_limits': 0,  # Expired windows are useless
+    'economy_transactions': 365,
+    'detection_events': 90,
+}
+
+# Latency histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, duration_ms: float):
+        """Record one sample"""
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total += duration_ms
+        if duration_ms > self.max:
+            self.max = duration_ms
+
+    def percentile(self, q: float) -> float:
+        """Approximate percentile as the upper bound of the bucket containing it"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return float(LATENCY_BUCKETS_MS[index]) if index < len(LATENCY_BUCKETS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary of the recorded samples"""
+        buckets = {f"<={bound}": self.counts[index] for index, bound in enumerate(LATENCY_BUCKETS_MS)}
+        buckets[f">{LATENCY_BUCKETS_MS[-1]}"] = self.counts[-1]
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 3),
+            'avg_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max, 3),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': buckets
+        }
+
+class QueryStats:
+    """Latency, row and error counters for one statement shape or method"""
+
+    __slots__ = ('latency', 'rows', 'errors', 'methods')
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.rows = 0
+        self.errors = 0
+        self.methods: set = set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary of the counters"""
+        return {**self.latency.to_dict(), 'rows': self.rows, 'errors': self.errors,
+                'methods': sorted(self.methods)}
+
+# Public DatabaseManager method currently running in this context
+_current_method: ContextVar[Optional[str]] = ContextVar('current_db_method', default=None)
+
+_SQL_WHITESPACE = re.compile(r"\s+")
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w$.])\d+(?:\.\d+)?")
+_SQL_PLACEHOLDER = r"(?:\?|\$\d+|%\(\w+\)s|:\w+|NULL)"
+_SQL_PLACEHOLDER_LISTS = re.compile(rf"\(\s*{_SQL_PLACEHOLDER}(?:\s*,\s*{_SQL_PLACEHOLDER})+\s*\)")
+_SQL_VALUES_ROWS = re.compile(r"(VALUES \([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+
+def normalize_sql(statement: str) -> str:
+    """Collapse literals, IN lists and multi-row VALUES so equivalent statements share one key"""
+    normalized = _SQL_WHITESPACE.sub(' ', statement).strip()
+    normalized = _SQL_LITERALS.sub('?', normalized)
+    normalized = _SQL_PLACEHOLDER_LISTS.sub('(?, ...)', normalized)
+    return _SQL_VALUES_ROWS.sub(r'\1, ...', normalized)
+
+class QueryInstrumentation:
+    """Statement, method and pool-checkout timings collected from engine events.
+
+    Statements are grouped by normalized SQL (at most ``max_statements``
+    shapes; the rest count under ``<other>``). Statements slower than
+    ``slow_query_ms`` are kept as samples.
+    """
+
+    OTHER_KEY = '<other>'
+
+    def __init__(self, slow_query_ms: float = 250.0, max_statements: int = 500, max_slow_samples: int = 50):
+        self.enabled = True
+        self.slow_query_ms = slow_query_ms
+        self.max_statements = max_statements
+        self.statements: Dict[str, QueryStats] = {}
+        self.methods: Dict[str, QueryStats] = {}
+        self.pool_wait = LatencyHistogram()
+        self.slow_queries: deque = deque(maxlen=max_slow_samples)
+        self._normalized: Dict[str, str] = {}
+        self.started_at = datetime.utcnow()
+
+    def attach(self, engine):
+        """Listen to cursor events of a (sync) engine"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        if self.enabled:
+            self.record_statement(statement, duration_ms, getattr(cursor, 'rowcount', -1))
+
+    def _handle_error(self, context):
+        conn = context.connection
+        starts = conn.info.get('query_start') if conn is not None else None
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        if self.enabled and context.statement:
+            self.record_statement(context.statement, duration_ms, -1, error=True)
+
+    def _normalize(self, statement: str) -> str:
+        normalized = self._normalized.get(statement)
+        if normalized is None:
+            if len(self._normalized) >= 2048:
+                self._normalized.clear()
+            normalized = self._normalized[statement] = normalize_sql(statement)
+        return normalized
+
+    def record_statement(self, statement: str, duration_ms: float, rowcount: int = -1, error: bool = False):
+        """Record one executed statement"""
+        key = self._normalize(statement)
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                key = self.OTHER_KEY
+                stats = self.statements.setdefault(key, QueryStats())
+            else:
+                stats = self.statements[key] = QueryStats()
+
+        method = _current_method.get()
+        stats.latency.observe(duration_ms)
+        if rowcount > 0:
+            stats.rows += rowcount
+        if error:
+            stats.errors += 1
+        if method and len(stats.methods) < 5:
+            stats.methods.add(method)
+
+        if duration_ms >= self.slow_query_ms:
+            self.slow_queries.append({
+                'sql': key,
+                'duration_ms': round(duration_ms, 3),
+                'rows': rowcount,
+                'method': method,
+                'error': error,
+                'at': datetime.utcnow().isoformat()
+            })
+
+    def record_method(self, name: str, duration_ms: float, error: bool = False):
+        """Record one DatabaseManager method call"""
+        stats = self.methods.get(name)
+        if stats is None:
+            stats = self.methods[name] = QueryStats()
+        stats.latency.observe(duration_ms)
+        if error:
+            stats.errors += 1
+
+    def record_pool_wait(self, duration_ms: float):
+        """Record how long a session waited for a pooled connection"""
+        self.pool_wait.observe(duration_ms)
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        """Slowest statement shapes and methods by total time, plus pool wait and slow samples"""
+        def _top(entries: Dict[str, QueryStats]) -> List[Dict[str, Any]]:
+            ranked = sorted(entries.items(), key=lambda item: item[1].latency.total, reverse=True)[:top]
+            return [{'name': name, **stats.to_dict()} for name, stats in ranked]
+
+        return {
+            'since': self.started_at.isoformat(),
+            'statement_count': sum(stats.latency.count for stats in self.statements.values()),
+            'statements': _top(self.statements),
+            'methods': _top(self.methods),
+            'pool_wait': self.pool_wait.to_dict(),
+            'slow_queries': list(self.slow_queries)
+        }
+
+    def reset(self):
+        """Drop everything collected so far"""
+        self.statements.clear()
+        self.methods.clear()
+        self.pool_wait = LatencyHistogram()
+        self.slow_queries.clear()
+        self.started_at = datetime.utcnow()
+
+def _timed_method(method):
+    """Wrap a DatabaseManager coroutine so its latency and queries are attributed to it"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        instrumentation = self._instrumentation
+        if not instrumentation.enabled:
+            return await method(self, *args, **kwargs)
+
+        # Queries are attributed to the outermost public method
+        token = _current_method.set(name) if _current_method.get() is None else None
+        start = time.perf_counter()
+        error = False
+        try:
+            return await method(self, *args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            instrumentation.record_method(name, (time.perf_counter() - start) * 1000, error)
+            if token is not None:
+                _current_method.reset(token)
+
+    return wrapper
+
+def _instrument_methods(cls):
+    """Class decorator timing every public coroutine method"""
+    for name, attribute in list(vars(cls).items()):
+        if not name.startswith('_') and asyncio.iscoroutinefunction(attribute) and name not in ('startup', 'shutdown'):
+            setattr(cls, name, _timed_method(attribute))
+    return cls
+
+# Connection pragmas for the embedded SQLite profile
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -65536,  # 64 MiB
+    'mmap_size': 268435456,  # 256 MiB
+    'temp_store': 'MEMORY',
+}
+
+# Set while this context holds the SQLite writer lock
+_sqlite_writer_held: ContextVar[bool] = ContextVar('sqlite_writer_held', default=False)
+
+# Reads in this context go to the primary (pin_primary)
+_primary_pinned: ContextVar[bool] = ContextVar('primary_pinned', default=False)
+
+class WriteTrackingSession(Session):
+    """Primary session that records in ``info['wrote']`` whether it flushed or executed DML"""
+
+@event.listens_for(WriteTrackingSession, 'after_flush')
+def _record_flush(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(WriteTrackingSession, 'do_orm_execute')
+def _record_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+# Tables reported by get_database_stats
+STATS_TABLES = {
+    'guilds': Guild,
+    'users': User,
+    'channels': Channel,
+    'roles': Role,
+    'log_entries': LogEntry,
+    'jail_records': JailRecord,
+    'command_usage': CommandUsage,
+    'economy_settings': EconomySettings,
+    'user_economy': UserEconomy,
+    'economy_transactions': EconomyTransaction,
+    'economy_items': EconomyItem,
+    'user_items': UserItem,
+    'role_income': RoleIncome,
+    'custom_replies': CustomReply,
+    'game_settings': GameSettings,
+}
+
+# PostgreSQL catalogs used for row estimates
+_pg_class = table('pg_class', column('oid'), column('reltuples'))
+_pg_inherits = table('pg_inherits', column('inhrelid'), column('inhparent'))
+
+
+# Dialects the upserts (ON CONFLICT) and RETURNING clauses are written for
+SUPPORTED_DIALECTS = ('postgresql', 'sqlite')
+
+@_instrument_methods
 class DatabaseManager:
     """Enhanced database manager with connection pooling and async support"""
 
-    def __init__(self):
+    def __init__(self, config_cache_ttl: float = 300.0, leaderboard_max_guilds: int = 256,
+                 leaderboard_ttl: float = 600.0, retention_days: Optional[Dict[str, float]] = None,
+                 stats_ttl: float = 30.0, stats_exact_count_limit: int = 100000,
+                 replica_urls: Optional[List[str]] = None, replica_lag_window: float = 5.0,
+                 slow_query_ms: float = 250.0, database_url: Optional[str] = None,
+                 sqlite_pragmas: Optional[Dict[str, Any]] = None):
+        self._database_url = database_url
+        self._sqlite_pragmas = {**SQLITE_PRAGMAS, **(sqlite_pragmas or {})}
+        self._sqlite_write_lock = asyncio.Lock()
         self._engine = None
         self._async_engine = None
         self._session_factory = None
         self._async_session_factory = None
-        self._initialize_database()
+
+        # Optional read replicas (None reads settings.database.replica_urls on first use)
+        self._replica_urls: Optional[List[str]] = list(replica_urls) if replica_urls is not None else None
+        self._replica_engines: List[AsyncEngine] = []
+        self._replica_session_factories: List[async_sessionmaker] = []
+        self._replica_healthy: List[bool] = []
+        self._replica_cursor = itertools.count()
+        self._replica_lag_window = replica_lag_window
+        self._last_primary_write = float('-inf')  # time.monotonic() of the last write session
+        self._replica_health_task: Optional[asyncio.Task] = None
+
+        # Query timings and periodic reporting
+        self._instrumentation = QueryInstrumentation(slow_query_ms)
+        self._metrics_task: Optional[asyncio.Task] = None
+
+        # Per-guild configuration caches
+        self._log_config_cache: GuildConfigCache[LogConfig] = GuildConfigCache('log_config', config_cache_ttl)
+        self._jail_config_cache: GuildConfigCache[JailConfig] = GuildConfigCache('jail_config', config_cache_ttl)
+        self._economy_settings_cache: GuildConfigCache[EconomySettings] = GuildConfigCache('economy_settings', config_cache_ttl)
+        self._game_settings_cache: GuildConfigCache[GameSettings] = GuildConfigCache('game_settings', config_cache_ttl)
+        self._store_items_cache: GuildConfigCache[List[EconomyItem]] = GuildConfigCache('store_items', config_cache_ttl)
+        self._rule_overrides_cache: GuildConfigCache[List[DetectionRuleOverride]] = GuildConfigCache('rule_overrides', config_cache_ttl)
+        self._config_caches: Dict[str, GuildConfigCache] = {
+            cache.name: cache for cache in (
+                self._log_config_cache,
+                self._jail_config_cache,
+                self._economy_settings_cache,
+                self._game_settings_cache,
+                self._store_items_cache,
+                self._rule_overrides_cache,
+            )
+        }
+        self._invalidation_channel: Optional[ConfigInvalidationChannel] = None
+
+        # In-memory rankings for recently active guilds (LRU)
+        self._leaderboards: "OrderedDict[int, LeaderboardIndex]" = OrderedDict()
+        self._leaderboard_max_guilds = leaderboard_max_guilds
+        self._leaderboard_ttl = leaderboard_ttl
+
+        # Retention policies for append-only tables
+        retention = {**DEFAULT_RETENTION_DAYS, **(retention_days or {})}
+        self._retention_policies: Dict[str, RetentionPolicy] = {
+            'log_entries': RetentionPolicy(LogEntry, 'timestamp', retention['log_entries']),
+            'command_usage': RetentionPolicy(CommandUsage, 'timestamp', retention['command_usage']),
+            'rate_limits': RetentionPolicy(RateLimit, 'window_end', retention['rate_limits']),
+            'economy_transactions': RetentionPolicy(EconomyTransaction, 'timestamp', retention['economy_transactions']),
+            'detection_events': RetentionPolicy(DetectionEventRecord, 'timestamp', retention['detection_events']),
+        }
+        self._retention_task: Optional[asyncio.Task] = None
+        self._role_income_task: Optional[asyncio.Task] = None
+
+        # Short-lived snapshot for get_database_stats
+        self._stats_ttl = stats_ttl
+        self._stats_exact_count_limit = stats_exact_count_limit
+        self._stats_cache: Optional[Dict[str, Any]] = None
+        self._stats_cached_at = 0.0
+        self._stats_lock = asyncio.Lock()
+
+        # Engines are created on first use; see _initialize_database and startup()
 
     def _initialize_database(self):
-        """Initialize database engines and session factories"""
+        """Initialize the async engines and session factories"""
+        if self._async_engine is not None:
+            return
+
         try:
-            # Create sync engine for migrations and sync operations
-            self._engine = create_engine(
-                config_manager.settings.database.database_url,
-                poolclass=QueuePool,
-                pool_size=config_manager.settings.database.pool_size,
-                max_overflow=config_manager.settings.database.max_overflow,
-                pool_timeout=config_manager.settings.database.pool_timeout,
-                pool_recycle=config_manager.settings.database.pool_recycle,
-                echo=config_manager.settings.debug,
-                future=True
+            # Create async engine for async operations
+            engine = self._create_async_engine(self.database_url)
+            if engine.dialect.name not in SUPPORTED_DIALECTS:
+                raise ValueError(f"Unsupported database dialect: {engine.dialect.name} "
+                                 f"(supported: {', '.join(SUPPORTED_DIALECTS)})")
+            self._async_engine = engine
+            self._async_session_factory = async_sessionmaker(
+                bind=self._async_engine, expire_on_commit=False, sync_session_class=WriteTrackingSession
             )
 
-            # Create async engine for async operations
-            self._async_engine = create_async_engine(
-                config_manager.settings.database.database_url.replace('postgresql://', 'postgresql+asyncpg://'),
+            if self._replica_urls is None:
+                self._replica_urls = list(getattr(config_manager.settings.database, 'replica_urls', None) or [])
+            for url in self._replica_urls:
+                engine = self._create_async_engine(url)
+                self._replica_engines.append(engine)
+                self._replica_session_factories.append(async_sessionmaker(bind=engine, expire_on_commit=False))
+                self._replica_healthy.append(True)
+
+            logger.info(f"Database engines initialized successfully ({len(self._replica_engines)} read replicas)")
+
+        except Exception as e:
+            logger.error(f"Failed to initialize database: {e}")
+            raise
+
+    @property
+    def database_url(self) -> str:
+        """Primary database URL (explicit argument, otherwise settings)"""
+        return self._database_url or config_manager.settings.database.database_url
+
+    def _create_async_engine(self, url: str) -> AsyncEngine:
+        """Create an async engine for the primary or a replica"""
+        for plain, driver in (('postgresql://', 'postgresql+asyncpg://'), ('sqlite://', 'sqlite+aiosqlite://')):
+            if url.startswith(plain):
+                url = driver + url[len(plain):]
+        options = {
+            'echo': config_manager.settings.debug,
+            'future': True
+        }
+        if url.startswith('sqlite'):
+            options.update(self._sqlite_engine_options(url))
+        else:
+            options.update(
                 pool_size=config_manager.settings.database.pool_size,
                 max_overflow=config_manager.settings.database.max_overflow,
                 pool_timeout=config_manager.settings.database.pool_timeout,
-                pool_recycle=config_manager.settings.database.pool_recycle,
-                echo=config_manager.settings.debug,
-                future=True
+                pool_recycle=config_manager.settings.database.pool_recycle
             )
+        engine = create_async_engine(url, **options)
+        if url.startswith('sqlite'):
+            self._apply_sqlite_pragmas(engine.sync_engine, url)
+        self._instrumentation.attach(engine.sync_engine)
+        return engine
+
+    @staticmethod
+    def _is_sqlite_memory(url: str) -> bool:
+        """Whether a SQLite URL points at an in-memory database"""
+        return ':memory:' in url or url.rstrip('/').endswith(('sqlite:', 'sqlite+aiosqlite:', 'sqlite+pysqlite:'))
+
+    def _sqlite_engine_options(self, url: str) -> Dict[str, Any]:
+        """Engine options for the embedded SQLite profile"""
+        if self._is_sqlite_memory(url):
+            # One shared connection, otherwise every connection gets its own empty database
+            return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+        return {'connect_args': {'timeout': self._sqlite_pragmas.get('busy_timeout', 5000) / 1000}}
+
+    def _apply_sqlite_pragmas(self, engine, url: str):
+        """Set the tuning pragmas on every new SQLite connection"""
+        pragmas = dict(self._sqlite_pragmas)
+        if self._is_sqlite_memory(url):
+            pragmas.pop('journal_mode', None)
+            pragmas.pop('mmap_size', None)
+
+        @event.listens_for(engine, 'connect')
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        """Primary async engine, created on first use"""
+        if self._async_engine is None:
+            self._initialize_database()
+        return self._async_engine
+
+    @property
+    def sync_engine(self):
+        """Synchronous engine for migrations and scripts, created on first use"""
+        if self._engine is None:
+            url = self.database_url.replace('+asyncpg', '').replace('+aiosqlite', '')
+            options = {
+                'echo': config_manager.settings.debug,
+                'future': True
+            }
+            if url.startswith('sqlite'):
+                options.update(self._sqlite_engine_options(url))
+            else:
+                options.update(
+                    poolclass=QueuePool,
+                    pool_size=config_manager.settings.database.pool_size,
+                    max_overflow=config_manager.settings.database.max_overflow,
+                    pool_timeout=config_manager.settings.database.pool_timeout,
+                    pool_recycle=config_manager.settings.database.pool_recycle
+                )
+            self._engine = create_engine(url, **options)
+            if url.startswith('sqlite'):
+                self._apply_sqlite_pragmas(self._engine, url)
+            self._instrumentation.attach(self._engine)
+        return self._engine
+
+    async def startup(self, prewarm_connections: int = 2, redis_url: Optional[str] = None,
+                      retention_interval: Optional[float] = 3600.0,
+                      metrics_reporter: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                      metrics_interval: float = 300.0, migrate: bool = True):
+        """Create engines, pre-warm the primary pool, migrate the schema and start background tasks"""
+        self._initialize_database()
 
-            # Create session factories
-            self._session_factory = sessionmaker(bind=self._engine, expire_on_commit=False)
-            self._async_session_factory = async_sessionmaker(bind=self._async_engine, expire_on_commit=False)
+        if prewarm_connections > 0 and self._dialect_name != 'sqlite':
+            await self._prewarm_pool(self._async_engine, prewarm_connections)
 
-            logger.info("Database engines initialized successfully")
+        # Background tasks and cogs expect the latest schema
+        if migrate:
+            await self.create_tables()
 
-        except Exception as e:
-            logger.error(f"Failed to initialize database: {e}")
-            raise
+        if self._replica_engines:
+            await self.check_replicas()
+            self.start_replica_health_checks()
+
+        if redis_url:
+            await self.start_config_invalidation(redis_url)
+
+        if retention_interval:
+            self.start_retention_task(retention_interval)
+
+        if metrics_reporter:
+            self.start_metrics_reporting(metrics_reporter, metrics_interval)
+
+        logger.info("Database manager started")
+
+    async def shutdown(self):
+        """Stop background tasks and close every connection pool"""
+        await self.stop_retention_task()
+        await self.stop_role_income_task()
+        await self.stop_replica_health_checks()
+        await self.stop_config_invalidation()
+        await self.stop_metrics_reporting()
+
+        for engine in self._replica_engines:
+            await engine.dispose()
+        self._replica_engines.clear()
+        self._replica_session_factories.clear()
+        self._replica_healthy.clear()
+
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+            self._async_engine = None
+            self._async_session_factory = None
+
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+            self._session_factory = None
+
+        logger.info("Database manager stopped")
+
+    async def _prewarm_pool(self, engine: AsyncEngine, connections: int):
+        """Open connections up front so the first requests don't pay for the handshake"""
+        async def _touch():
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        results = await asyncio.gather(*(_touch() for _ in range(connections)), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.error(f"Failed to pre-warm {len(failures)} of {connections} connections: {failures[0]}")
 
     @retry(
         stop=stop_after_attempt(3),
@@ -567,6 +1385,8 @@ class DatabaseManager:
     )
     def get_session(self):
         """Get a synchronous database session"""
+        if self._session_factory is None:
+            self._session_factory = sessionmaker(bind=self.sync_engine, expire_on_commit=False)
         return self._session_factory()
 
     @asynccontextmanager
@@ -575,32 +1395,311 @@ class DatabaseManager:
         wait=wait_exponential(multiplier=1, min=4, max=10),
         retry=retry_if_exception_type(SQLAlchemyError)
     )
-    async def get_async_session(self):
-        """Get an asynchronous database session"""
-        async with self._async_session_factory() as session:
+    async def get_async_session(self, readonly: bool = False):
+        """Get an asynchronous database session.
+
+        ``readonly`` sessions go to a healthy replica (round-robin) unless a
+        session wrote to the primary within the replica lag window or the
+        current context is pinned to it.
+        """
+        self._initialize_database()
+        replica = self._pick_replica() if readonly else None
+        factory = self._async_session_factory if replica is None else self._replica_session_factories[replica]
+
+        # SQLite has a single writer: queue write sessions instead of failing with "database is locked"
+        writer_token = None
+        if not readonly and not _sqlite_writer_held.get() and self._dialect_name == 'sqlite':
+            await self._sqlite_write_lock.acquire()
+            writer_token = _sqlite_writer_held.set(True)
+
+        try:
+            async with self._session_scope(factory, replica) as session:
+                yield session
+        finally:
+            if writer_token is not None:
+                _sqlite_writer_held.reset(writer_token)
+                self._sqlite_write_lock.release()
+
+    @asynccontextmanager
+    async def _session_scope(self, factory: async_sessionmaker, replica: Optional[int]):
+        """Open a session, rolling back on errors and tracking replica health"""
+        async with factory() as session:
             try:
+                if self._instrumentation.enabled:
+                    start = time.perf_counter()
+                    await session.connection()
+                    self._instrumentation.record_pool_wait((time.perf_counter() - start) * 1000)
                 yield session
+            except (OperationalError, InterfaceError, OSError):
+                await session.rollback()
+                if replica is not None:
+                    self._mark_replica(replica, False)
+                raise
             except Exception:
                 await session.rollback()
                 raise
             finally:
+                wrote = session.info.get('wrote', False)
                 await session.close()
+                if wrote and self._replica_engines:
+                    # Read-your-writes: keep every task on the primary while replicas catch up, so the
+                    # next command of the same member sees the write even though it runs in another task.
+                    # Sessions that only read don't count, so they never hold reads off recovered replicas.
+                    self._last_primary_write = time.monotonic()
+
+    def _pick_replica(self) -> Optional[int]:
+        """Choose a healthy replica for a read, or None to use the primary"""
+        if (not self._replica_engines or _primary_pinned.get()
+                or time.monotonic() - self._last_primary_write < self._replica_lag_window):
+            return None
+
+        healthy = [index for index, ok in enumerate(self._replica_healthy) if ok]
+        if not healthy:
+            return None
+        return healthy[next(self._replica_cursor) % len(healthy)]
+
+    def _mark_replica(self, index: int, healthy: bool):
+        """Record a replica's health"""
+        if self._replica_healthy[index] != healthy:
+            state = "healthy" if healthy else "unhealthy"
+            logger.warning(f"Read replica {index} marked {state}")
+        self._replica_healthy[index] = healthy
+
+    @contextmanager
+    def pin_primary(self):
+        """Send every read in this context to the primary"""
+        token = _primary_pinned.set(True)
+        try:
+            yield
+        finally:
+            _primary_pinned.reset(token)
+
+    async def check_replicas(self, timeout: float = 5.0) -> List[bool]:
+        """Ping every replica and update its health"""
+        for index, engine in enumerate(self._replica_engines):
+            try:
+                async with engine.connect() as connection:
+                    await asyncio.wait_for(connection.execute(text("SELECT 1")), timeout)
+                self._mark_replica(index, True)
+            except Exception as e:
+                logger.error(f"Health check failed for read replica {index}: {e}")
+                self._mark_replica(index, False)
+        return list(self._replica_healthy)
+
+    def start_replica_health_checks(self, interval: float = 30.0):
+        """Start periodic replica health checks"""
+        if not self._replica_engines:
+            return
+        if self._replica_health_task and not self._replica_health_task.done():
+            self._replica_health_task.cancel()
+
+        self._replica_health_task = asyncio.create_task(self._replica_health_loop(interval))
+
+    async def stop_replica_health_checks(self):
+        """Stop periodic replica health checks"""
+        if self._replica_health_task and not self._replica_health_task.done():
+            self._replica_health_task.cancel()
+            try:
+                await self._replica_health_task
+            except asyncio.CancelledError:
+                pass
+        self._replica_health_task = None
+
+    async def _replica_health_loop(self, interval: float):
+        """Check replica health periodically"""
+        while True:
+            try:
+                await self.check_replicas()
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in replica health task: {e}")
+                await asyncio.sleep(interval)
+
+    @property
+    def _dialect_name(self) -> str:
+        """Name of the primary database dialect (postgresql, sqlite, ...)"""
+        return self.async_engine.dialect.name
+
+    async def start_config_invalidation(self, redis_url: str):
+        """Share config cache invalidations with other processes through Redis"""
+        if self._invalidation_channel:
+            return
+        channel = ConfigInvalidationChannel(redis_url, self._config_caches)
+        try:
+            await channel.start()
+        except Exception as e:
+            logger.error(f"Failed to start config invalidation channel: {e}")
+            return
+        self._invalidation_channel = channel
+
+    async def stop_config_invalidation(self):
+        """Stop sharing config cache invalidations"""
+        if self._invalidation_channel:
+            await self._invalidation_channel.stop()
+            self._invalidation_channel = None
+
+    async def _invalidate_config(self, cache: GuildConfigCache, guild_id: int):
+        """Invalidate a cached guild config locally and in other processes"""
+        cache.invalidate(guild_id)
+        if self._invalidation_channel:
+            await self._invalidation_channel.publish(cache.name, guild_id)
+
+    def get_config_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get hit/miss statistics for every config cache"""
+        return {name: cache.get_stats() for name, cache in self._config_caches.items()}
+
+    def get_query_stats(self, top: int = 10) -> Dict[str, Any]:
+        """Get query, method and pool checkout timings"""
+        return self._instrumentation.get_stats(top)
+
+    def reset_query_stats(self):
+        """Start query timings from scratch"""
+        self._instrumentation.reset()
+
+    def set_query_instrumentation(self, enabled: bool):
+        """Turn query timing on or off"""
+        self._instrumentation.enabled = enabled
+
+    def start_metrics_reporting(self, reporter: Callable[[Dict[str, Any]], Any], interval: float = 300.0):
+        """Periodically hand query stats to a metrics reporter"""
+        if self._metrics_task and not self._metrics_task.done():
+            self._metrics_task.cancel()
+
+        self._metrics_task = asyncio.create_task(self._metrics_loop(reporter, interval))
+
+    async def stop_metrics_reporting(self):
+        """Stop periodic metrics reporting"""
+        if self._metrics_task and not self._metrics_task.done():
+            self._metrics_task.cancel()
+            try:
+                await self._metrics_task
+            except asyncio.CancelledError:
+                pass
+        self._metrics_task = None
+
+    async def _metrics_loop(self, reporter: Callable[[Dict[str, Any]], Any], interval: float):
+        """Report query stats periodically"""
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                result = reporter(self.get_query_stats())
+                if asyncio.iscoroutine(result):
+                    await result
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in database metrics task: {e}")
 
     async def create_tables(self):
-        """Create all database tables"""
+        """Bring the schema up to date by running the Alembic migrations"""
         try:
-            async with self._async_engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
+            async with self.async_engine.connect() as conn:
+                await conn.run_sync(self._run_migrations)
+                await conn.commit()
+            await self.ensure_partitions()
             logger.info("Database tables created successfully")
         except Exception as e:
             logger.error(f"Failed to create database tables: {e}")
             raise
 
+    def _run_migrations(self, connection):
+        """Upgrade to the latest revision on a sync connection (called through run_sync)"""
+        from alembic import command
+        from alembic.config import Config
+
+        alembic_cfg = Config(ALEMBIC_INI)
+        alembic_cfg.set_main_option('script_location', MIGRATIONS_DIR)
+        alembic_cfg.attributes['connection'] = connection
+
+        # Databases created with create_all before migrations existed match the baseline
+        tables = set(inspect(connection).get_table_names())
+        if 'alembic_version' not in tables and 'user_economy' in tables:
+            logger.info("Stamping existing database schema at the baseline revision")
+            command.stamp(alembic_cfg, BASELINE_REVISION)
+
+        # Alembic must own the transactions so CONCURRENTLY index builds can run in autocommit
+        connection.commit()
+        command.upgrade(alembic_cfg, 'head')
+
+    async def ensure_partitions(self, months_ahead: int = 2):
+        """Create monthly partitions for the current month and the next ``months_ahead`` months.
+
+        A DEFAULT partition catches rows outside every range so inserts never fail;
+        retention purges it in chunks, since it is never dropped as a whole.
+        """
+        if self._dialect_name != 'postgresql':
+            return
+
+        month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        async with self.async_engine.begin() as conn:
+            for table in PARTITIONED_TABLES:
+                await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+                start = month
+                for _ in range(months_ahead + 1):
+                    end = (start + timedelta(days=32)).replace(day=1)
+                    await conn.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {table}_p{start:%Y%m} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+                    ))
+                    start = end
+
+    async def drop_expired_partitions(self, table: str, cutoff: datetime) -> int:
+        """Drop monthly partitions whose whole range is older than ``cutoff``.
+
+        Returns the (estimated) number of rows removed.
+        """
+        if self._dialect_name != 'postgresql' or table not in PARTITIONED_TABLES:
+            return 0
+
+        removed = 0
+        async with self.async_engine.begin() as conn:
+            result = await conn.execute(text(
+                "SELECT c.relname, c.reltuples FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table"
+            ), {'table': table})
+
+            prefix = f"{table}_p"
+            for name, reltuples in result.all():
+                if not name.startswith(prefix):
+                    continue  # Default partition
+                try:
+                    start = datetime.strptime(name[len(prefix):], '%Y%m')
+                except ValueError:
+                    continue
+                end = (start + timedelta(days=32)).replace(day=1)
+                if end > cutoff:
+                    continue
+
+                await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                removed += max(int(reltuples), 0)
+                logger.info(f"Dropped expired partition {name}")
+
+        return removed
+
+    async def purge_partitioned(self, model, timestamp_column: str, cutoff: datetime,
+                                batch_size: int = 5000, pause: float = 0.5) -> int:
+        """Drop expired monthly partitions, then purge expired rows from the DEFAULT partition.
+
+        Rows only reach the DEFAULT partition when no monthly range covers them
+        (backfills, clock skew), so it is usually empty and the DELETE is cheap.
+        """
+        removed = await self.drop_expired_partitions(model.__tablename__, cutoff)
+        default = table(f"{model.__tablename__}_default", column('id'), column(timestamp_column))
+        removed += await self.purge_in_chunks(default, timestamp_column, cutoff, batch_size=batch_size, pause=pause)
+        return removed
+
     async def drop_tables(self):
         """Drop all database tables (use with caution)"""
         try:
-            async with self._async_engine.begin() as conn:
+            async with self.async_engine.begin() as conn:
                 await conn.run_sync(Base.metadata.drop_all)
+                # Without its revision row the next create_tables migrates from scratch
+                await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
             logger.warning("Database tables dropped")
         except Exception as e:
             logger.error(f"Failed to drop database tables: {e}")
@@ -681,11 +1780,14 @@ class DatabaseManager:
         async with self.get_async_session() as session:
             try:
                 # Get or create log config
-                log_config = await session.query(LogConfig).filter_by(guild_id=guild_id).first()
+                result = await session.execute(select(LogConfig).filter_by(guild_id=guild_id).limit(1))
+                log_config = result.scalars().first()
+                created_config = False
                 if not log_config:
                     log_config = LogConfig(guild_id=guild_id, enabled=True)
                     session.add(log_config)
                     await session.flush()
+                    created_config = True
 
                 log_entry = LogEntry(
                     guild_id=guild_id,
@@ -696,11 +1798,13 @@ class DatabaseManager:
                     severity=severity,
                     title=title,
                     description=description,
-                    metadata=json.dumps(metadata) if metadata else None
+                    event_metadata=json.dumps(metadata) if metadata else None
                 )
                 session.add(log_entry)
                 await session.commit()
                 await session.refresh(log_entry)
+                if created_config:
+                    await self._invalidate_config(self._log_config_cache, guild_id)
                 return log_entry
 
             except Exception as e:
@@ -709,15 +1813,20 @@ class DatabaseManager:
                 raise
 
     async def get_guild_log_config(self, guild_id: int) -> Optional[LogConfig]:
-        """Get logging configuration for a guild"""
-        async with self.get_async_session() as session:
-            return await session.query(LogConfig).filter_by(guild_id=guild_id).first()
+        """Get logging configuration for a guild (cached)"""
+        async def load():
+            async with self.get_async_session(readonly=True) as session:
+                result = await session.execute(select(LogConfig).filter_by(guild_id=guild_id).limit(1))
+                return result.scalars().first()
+
+        return await self._log_config_cache.get_or_load(guild_id, load)
 
     async def update_guild_log_config(self, guild_id: int, **kwargs) -> LogConfig:
         """Update logging configuration for a guild"""
         async with self.get_async_session() as session:
             try:
-                log_config = await session.query(LogConfig).filter_by(guild_id=guild_id).first()
+                result = await session.execute(select(LogConfig).filter_by(guild_id=guild_id).limit(1))
+                log_config = result.scalars().first()
                 if not log_config:
                     log_config = LogConfig(guild_id=guild_id)
                     session.add(log_config)
@@ -728,6 +1837,7 @@ class DatabaseManager:
 
                 await session.commit()
                 await session.refresh(log_config)
+                await self._invalidate_config(self._log_config_cache, guild_id)
                 return log_config
 
             except Exception as e:
@@ -736,15 +1846,20 @@ class DatabaseManager:
                 raise
 
     async def get_jail_config(self, guild_id: int) -> Optional[JailConfig]:
-        """Get jail configuration for a guild"""
-        async with self.get_async_session() as session:
-            return await session.query(JailConfig).filter_by(guild_id=guild_id).first()
+        """Get jail configuration for a guild (cached)"""
+        async def load():
+            async with self.get_async_session(readonly=True) as session:
+                result = await session.execute(select(JailConfig).filter_by(guild_id=guild_id).limit(1))
+                return result.scalars().first()
+
+        return await self._jail_config_cache.get_or_load(guild_id, load)
 
     async def update_jail_config(self, guild_id: int, **kwargs) -> JailConfig:
         """Update jail configuration for a guild"""
         async with self.get_async_session() as session:
             try:
-                jail_config = await session.query(JailConfig).filter_by(guild_id=guild_id).first()
+                result = await session.execute(select(JailConfig).filter_by(guild_id=guild_id).limit(1))
+                jail_config = result.scalars().first()
                 if not jail_config:
                     jail_config = JailConfig(guild_id=guild_id)
                     session.add(jail_config)
@@ -755,6 +1870,7 @@ class DatabaseManager:
 
                 await session.commit()
                 await session.refresh(jail_config)
+                await self._invalidate_config(self._jail_config_cache, guild_id)
                 return jail_config
 
             except Exception as e:
@@ -768,18 +1884,20 @@ class DatabaseManager:
         async with self.get_async_session() as session:
             try:
                 # Get or create jail config
-                jail_config = await session.query(JailConfig).filter_by(guild_id=guild_id).first()
+                result = await session.execute(select(JailConfig).filter_by(guild_id=guild_id).limit(1))
+                jail_config = result.scalars().first()
+                created_config = False
                 if not jail_config:
                     jail_config = JailConfig(guild_id=guild_id, enabled=True)
                     session.add(jail_config)
                     await session.flush()
+                    created_config = True
 
                 # Check if user is already jailed
-                existing_jail = await session.query(JailRecord).filter_by(
-                    guild_id=guild_id, user_id=user_id, active=True
-                ).first()
-
-                if existing_jail:
+                result = await session.execute(
+                    select(JailRecord.id).filter_by(guild_id=guild_id, user_id=user_id, active=True).limit(1)
+                )
+                if result.scalar() is not None:
                     raise ValueError("User is already jailed")
 
                 jail_record = JailRecord(
@@ -793,6 +1911,8 @@ class DatabaseManager:
                 session.add(jail_record)
                 await session.commit()
                 await session.refresh(jail_record)
+                if created_config:
+                    await self._invalidate_config(self._jail_config_cache, guild_id)
                 return jail_record
 
             except Exception as e:
@@ -804,9 +1924,10 @@ class DatabaseManager:
         """Release a user from jail"""
         async with self.get_async_session() as session:
             try:
-                jail_record = await session.query(JailRecord).filter_by(
-                    guild_id=guild_id, user_id=user_id, active=True
-                ).first()
+                result = await session.execute(
+                    select(JailRecord).filter_by(guild_id=guild_id, user_id=user_id, active=True).limit(1)
+                )
+                jail_record = result.scalars().first()
 
                 if not jail_record:
                     return None
@@ -821,11 +1942,214 @@ class DatabaseManager:
                 logger.error(f"Failed to unjail user {user_id} in guild {guild_id}: {e}")
                 raise
 
+    async def add_warning(self, guild_id: int, user_id: int, moderator_id: int,
+                          reason: Optional[str] = None) -> WarningRecord:
+        """Record a warning"""
+        async with self.get_async_session() as session:
+            try:
+                warning = WarningRecord(guild_id=guild_id, user_id=user_id,
+                                        moderator_id=moderator_id, reason=reason)
+                session.add(warning)
+                await session.commit()
+                await session.refresh(warning)
+                return warning
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to warn user {user_id} in guild {guild_id}: {e}")
+                raise
+
     async def get_active_jail_records(self, guild_id: int) -> List[JailRecord]:
         """Get all active jail records for a guild"""
+        async with self.get_async_session(readonly=True) as session:
+            result = await session.execute(select(JailRecord).filter_by(guild_id=guild_id, active=True))
+            return list(result.scalars().all())
+
+    async def get_all_active_jail_records(self) -> List[JailRecord]:
+        """Get active jail records for every guild (used to rebuild the jail index at startup)"""
+        async with self.get_async_session(readonly=True) as session:
+            result = await session.execute(select(JailRecord).filter_by(active=True))
+            return list(result.scalars().all())
+
+    async def get_moderation_history(self, guild_id: int) -> Dict[int, Dict[str, int]]:
+        """Get warning and jail counts for every user in a guild that has any"""
+        async with self.get_async_session(readonly=True) as session:
+            history: Dict[int, Dict[str, int]] = {}
+
+            result = await session.execute(
+                select(WarningRecord.user_id, func.count())
+                .where(WarningRecord.guild_id == guild_id)
+                .group_by(WarningRecord.user_id)
+            )
+            for user_id, count in result:
+                history[user_id] = {'warnings': count, 'jails': 0}
+
+            result = await session.execute(
+                select(JailRecord.user_id, func.count())
+                .where(JailRecord.guild_id == guild_id)
+                .group_by(JailRecord.user_id)
+            )
+            for user_id, count in result:
+                history.setdefault(user_id, {'warnings': 0, 'jails': 0})['jails'] = count
+
+            return history
+
+    async def add_detection_events(self, events: List[Dict[str, Any]]) -> int:
+        """Insert a batch of detection events (column name -> value), returns rows written"""
+        if not events:
+            return 0
+
         async with self.get_async_session() as session:
-            result = await session.query(JailRecord).filter_by(guild_id=guild_id, active=True).all()
-            return result
+            try:
+                await session.execute(insert(DetectionEventRecord), events)
+                await session.commit()
+                return len(events)
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to store {len(events)} detection events: {e}")
+                raise
+
+    async def resolve_detection_events(self, resolutions: List[Dict[str, Any]]) -> int:
+        """Mark detection events resolved (event_id, resolution, resolved_by, resolved_at), returns rows updated"""
+        if not resolutions:
+            return 0
+
+        async with self.get_async_session() as session:
+            try:
+                updated = 0
+                for resolution in resolutions:
+                    result = await session.execute(
+                        update(DetectionEventRecord)
+                        .where(DetectionEventRecord.event_id == resolution['event_id'])
+                        .values(resolved=True, resolution=resolution['resolution'],
+                                resolved_by=resolution['resolved_by'], resolved_at=resolution['resolved_at'])
+                        .execution_options(synchronize_session=False)
+                    )
+                    updated += result.rowcount
+                await session.commit()
+                return updated
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to resolve {len(resolutions)} detection events: {e}")
+                raise
+
+    async def get_detection_events(self, guild_id: int, since: datetime,
+                                   detection_type: Optional[str] = None,
+                                   limit: int = 100) -> List[DetectionEventRecord]:
+        """Get a guild's most recent detection events since a point in time"""
+        async with self.get_async_session(readonly=True) as session:
+            query = select(DetectionEventRecord).where(
+                DetectionEventRecord.guild_id == guild_id, DetectionEventRecord.timestamp >= since
+            )
+            if detection_type:
+                query = query.where(DetectionEventRecord.detection_type == detection_type)
+            result = await session.execute(query.order_by(DetectionEventRecord.timestamp.desc()).limit(limit))
+            return list(result.scalars().all())
+
+    async def get_rule_overrides(self, guild_id: int) -> List[DetectionRuleOverride]:
+        """Get the detection rule overrides for a guild (cached)"""
+        return await self._rule_overrides_cache.get_or_load(
+            guild_id, lambda: self._load_rule_overrides(guild_id)
+        )
+
+    async def _load_rule_overrides(self, guild_id: int) -> List[DetectionRuleOverride]:
+        """Load the detection rule overrides for a guild from the database"""
+        async with self.get_async_session(readonly=True) as session:
+            result = await session.execute(
+                select(DetectionRuleOverride).filter_by(guild_id=guild_id).order_by(DetectionRuleOverride.rule_name)
+            )
+            return list(result.scalars().all())
+
+    async def set_rule_override(self, guild_id: int, rule_name: str, **kwargs) -> DetectionRuleOverride:
+        """Override detection rule settings for a guild"""
+        async with self.get_async_session() as session:
+            try:
+                result = await session.execute(
+                    select(DetectionRuleOverride).filter_by(guild_id=guild_id, rule_name=rule_name).limit(1)
+                )
+                override = result.scalars().first()
+                if not override:
+                    override = DetectionRuleOverride(guild_id=guild_id, rule_name=rule_name)
+                    session.add(override)
+
+                for key, value in kwargs.items():
+                    if hasattr(override, key):
+                        setattr(override, key, value)
+
+                await session.commit()
+                await session.refresh(override)
+                await self._invalidate_config(self._rule_overrides_cache, guild_id)
+                return override
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to override rule {rule_name} for guild {guild_id}: {e}")
+                raise
+
+    async def delete_rule_overrides(self, guild_id: int, rule_name: Optional[str] = None) -> int:
+        """Drop a guild's override for one rule, or for every rule, returns rows deleted"""
+        async with self.get_async_session() as session:
+            try:
+                query = delete(DetectionRuleOverride).where(DetectionRuleOverride.guild_id == guild_id)
+                if rule_name:
+                    query = query.where(DetectionRuleOverride.rule_name == rule_name)
+                result = await session.execute(query)
+                await session.commit()
+                await self._invalidate_config(self._rule_overrides_cache, guild_id)
+                return result.rowcount
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to reset rule overrides for guild {guild_id}: {e}")
+                raise
+
+    async def save_raid_lockdown(self, guild_id: int, previous_verification_level: int,
+                                 ends_at: datetime) -> RaidLockdown:
+        """Record a guild's lockdown and the verification level to restore when it ends"""
+        async with self.get_async_session() as session:
+            try:
+                lockdown = await session.get(RaidLockdown, guild_id)
+                if not lockdown:
+                    lockdown = RaidLockdown(guild_id=guild_id)
+                    session.add(lockdown)
+
+                lockdown.previous_verification_level = previous_verification_level
+                lockdown.started_at = datetime.utcnow()
+                lockdown.ends_at = ends_at
+                await session.commit()
+                await session.refresh(lockdown)
+                return lockdown
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to save lockdown for guild {guild_id}: {e}")
+                raise
+
+    async def delete_raid_lockdown(self, guild_id: int) -> bool:
+        """Forget a guild's lockdown once it has been lifted"""
+        async with self.get_async_session() as session:
+            try:
+                result = await session.execute(delete(RaidLockdown).where(RaidLockdown.guild_id == guild_id))
+                await session.commit()
+                return result.rowcount > 0
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to delete lockdown for guild {guild_id}: {e}")
+                raise
+
+    async def get_raid_lockdown(self, guild_id: int) -> Optional[RaidLockdown]:
+        """Get a guild's lockdown in progress, if any"""
+        async with self.get_async_session(readonly=True) as session:
+            return await session.get(RaidLockdown, guild_id)
+
+    async def get_all_raid_lockdowns(self) -> List[RaidLockdown]:
+        """Get the lockdowns in progress for every guild (used to re-arm them at startup)"""
+        async with self.get_async_session(readonly=True) as session:
+            result = await session.execute(select(RaidLockdown))
+            return list(result.scalars().all())
 
     async def track_command_usage(self, guild_id: Optional[int], user_id: int,
                                  command_name: str, execution_time: int,
@@ -896,66 +2220,221 @@ class DatabaseManager:
                 logger.error(f"Failed to check rate limit: {e}")
                 return True  # Allow on error to prevent blocking
 
-    async def cleanup_old_logs(self, days: int = 30):
+    async def cleanup_old_logs(self, days: int = 30) -> int:
         """Clean up old log entries"""
-        async with self.get_async_session() as session:
-            try:
-                cutoff_date = datetime.utcnow() - timedelta(days=days)
-                deleted_count = await session.query(LogEntry).filter(
-                    LogEntry.timestamp < cutoff_date
-                ).delete()
-
-                await session.commit()
-                logger.info(f"Cleaned up {deleted_count} old log entries")
+        try:
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            if self._dialect_name == 'postgresql':
+                deleted_count = await self.purge_partitioned(LogEntry, 'timestamp', cutoff_date)
+            else:
+                deleted_count = await self.purge_in_chunks(LogEntry, 'timestamp', cutoff_date)
+            logger.info(f"Cleaned up {deleted_count} old log entries")
+            return deleted_count
 
-            except Exception as e:
-                await session.rollback()
-                logger.error(f"Failed to cleanup old logs: {e}")
+        except Exception as e:
+            logger.error(f"Failed to cleanup old logs: {e}")
+            return 0
+
+    async def purge_in_chunks(self, model, timestamp_column: str, cutoff: datetime,
+                              batch_size: int = 5000, pause: float = 0.5) -> int:
+        """Delete rows older than ``cutoff`` in bounded primary-key batches.
+
+        Each batch is its own short transaction, followed by a pause, so large
+        purges never hold long locks or produce one huge WAL/replication burst.
+        ``model`` is a mapped class or a table with ``id`` and ``timestamp_column``.
+        """
+        target = getattr(model, '__table__', model)
+        timestamp = target.c[timestamp_column]
+        total = 0
+
+        while True:
+            batch_ids = (
+                select(target.c.id)
+                .where(timestamp < cutoff)
+                .order_by(target.c.id)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            async with self.get_async_session() as session:
+                try:
+                    result = await session.execute(delete(target).where(target.c.id.in_(batch_ids)))
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
 
-    async def get_database_stats(self) -> Dict[str, Any]:
-        """Get database statistics"""
-        async with self.get_async_session() as session:
-            try:
-                stats = {}
-
-                # Count records in each table
-                stats['guilds'] = await session.query(Guild).count()
-                stats['users'] = await session.query(User).count()
-                stats['channels'] = await session.query(Channel).count()
-                stats['roles'] = await session.query(Role).count()
-                stats['log_entries'] = await session.query(LogEntry).count()
-                stats['jail_records'] = await session.query(JailRecord).count()
-                stats['command_usage'] = await session.query(CommandUsage).count()
-                stats['economy_settings'] = await session.query(EconomySettings).count()
-                stats['user_economy'] = await session.query(UserEconomy).count()
-                stats['economy_transactions'] = await session.query(EconomyTransaction).count()
-                stats['economy_items'] = await session.query(EconomyItem).count()
-                stats['user_items'] = await session.query(UserItem).count()
-                stats['role_income'] = await session.query(RoleIncome).count()
-                stats['custom_replies'] = await session.query(CustomReply).count()
-                stats['game_settings'] = await session.query(GameSettings).count()
-
-                # Get recent activity
-                recent_logs = await session.query(LogEntry).filter(
-                    LogEntry.timestamp >= datetime.utcnow() - timedelta(hours=24)
-                ).count()
-                stats['recent_logs_24h'] = recent_logs
+            total += result.rowcount
+            if result.rowcount < batch_size:
+                return total
+            await asyncio.sleep(pause)
 
-                active_jails = await session.query(JailRecord).filter_by(active=True).count()
-                stats['active_jails'] = active_jails
+    async def run_retention(self, batch_size: int = 5000, pause: float = 0.5) -> Dict[str, int]:
+        """Apply every retention policy once and report rows removed per table"""
+        report = {}
+        now = datetime.utcnow()
 
-                return stats
+        try:
+            await self.ensure_partitions()
+        except Exception as e:
+            logger.error(f"Failed to create upcoming partitions: {e}")
 
+        for policy in self._retention_policies.values():
+            table = policy.model.__tablename__
+            cutoff = now - timedelta(days=policy.retention_days)
+            try:
+                if self._dialect_name == 'postgresql' and table in PARTITIONED_TABLES:
+                    # Whole months go away with their partition; only DEFAULT needs a DELETE
+                    report[table] = await self.purge_partitioned(
+                        policy.model, policy.timestamp_column, cutoff,
+                        batch_size=batch_size, pause=pause
+                    )
+                else:
+                    report[table] = await self.purge_in_chunks(
+                        policy.model, policy.timestamp_column, cutoff,
+                        batch_size=batch_size, pause=pause
+                    )
             except Exception as e:
-                logger.error(f"Failed to get database stats: {e}")
-                return {}
+                logger.error(f"Retention failed for {table}: {e}")
+                report[table] = 0
+
+        logger.info(f"Retention run complete: {report}")
+        return report
+
+    def set_retention_days(self, table: str, days: float):
+        """Change how long rows in a table are kept"""
+        policy = self._retention_policies.get(table)
+        if policy is None:
+            raise ValueError(f"No retention policy for table {table}")
+        policy.retention_days = days
+
+    def start_retention_task(self, interval: float = 3600.0):
+        """Start background retention runs"""
+        if self._retention_task and not self._retention_task.done():
+            self._retention_task.cancel()
+
+        self._retention_task = asyncio.create_task(self._retention_loop(interval))
+
+    async def stop_retention_task(self):
+        """Stop background retention runs"""
+        if self._retention_task and not self._retention_task.done():
+            self._retention_task.cancel()
+            try:
+                await self._retention_task
+            except asyncio.CancelledError:
+                pass
+        self._retention_task = None
+
+    async def _retention_loop(self, interval: float):
+        """Run retention periodically"""
+        while True:
+            try:
+                await self.run_retention()
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in retention task: {e}")
+                await asyncio.sleep(interval)
+
+    async def get_database_stats(self, use_cache: bool = True) -> Dict[str, Any]:
+        """Get database statistics (single round trip, cached for a short TTL)"""
+        now = time.monotonic()
+        if use_cache and self._stats_cache is not None and now - self._stats_cached_at < self._stats_ttl:
+            return dict(self._stats_cache)
+
+        async with self._stats_lock:
+            # Another caller may have refreshed the snapshot while we waited
+            if use_cache and self._stats_cache is not None and time.monotonic() - self._stats_cached_at < self._stats_ttl:
+                return dict(self._stats_cache)
+
+            async with self.get_async_session(readonly=True) as session:
+                try:
+                    use_estimates = self._dialect_name == 'postgresql'
+                    columns = []
+                    for name, model in STATS_TABLES.items():
+                        exact = select(func.count()).select_from(model).scalar_subquery()
+                        if use_estimates:
+                            estimate = self._estimated_row_count(model.__tablename__)
+                            columns.append(case(
+                                (estimate >= self._stats_exact_count_limit, estimate),
+                                else_=exact
+                            ).label(name))
+                            columns.append(estimate.label(f'_estimate_{name}'))
+                        else:
+                            columns.append(exact.label(name))
+
+                    columns.append(select(func.count()).select_from(LogEntry).where(
+                        LogEntry.timestamp >= datetime.utcnow() - timedelta(hours=24)
+                    ).scalar_subquery().label('recent_logs_24h'))
+                    columns.append(select(func.count()).select_from(JailRecord).where(
+                        JailRecord.active.is_(True)
+                    ).scalar_subquery().label('active_jails'))
+
+                    row = (await session.execute(select(*columns))).mappings().one()
+
+                    stats = {name: int(row[name] or 0) for name in STATS_TABLES}
+                    stats['recent_logs_24h'] = int(row['recent_logs_24h'] or 0)
+                    stats['active_jails'] = int(row['active_jails'] or 0)
+                    stats['estimated_tables'] = [
+                        name for name in STATS_TABLES
+                        if use_estimates and (row[f'_estimate_{name}'] or 0) >= self._stats_exact_count_limit
+                    ]
+
+                    self._stats_cache = stats
+                    self._stats_cached_at = time.monotonic()
+                    return dict(stats)
+
+                except Exception as e:
+                    logger.error(f"Failed to get database stats: {e}")
+                    return {}
+
+    @staticmethod
+    def _estimated_row_count(table_name: str):
+        """Planner row estimate for a table, summed over its partitions (PostgreSQL only)"""
+        relation = func.to_regclass(table_name)
+        children = select(_pg_inherits.c.inhrelid).where(_pg_inherits.c.inhparent == relation)
+        return select(
+            cast(func.coalesce(func.sum(func.greatest(_pg_class.c.reltuples, 0)), 0), BigInteger)
+        ).where(
+            or_(_pg_class.c.oid == relation, _pg_class.c.oid.in_(children))
+        ).scalar_subquery()
 
     # Economy-related methods
+    async def get_economy_settings(self, guild_id: int) -> Optional[EconomySettings]:
+        """Get economy settings for a guild without creating them (cached, None if missing)"""
+        async def load():
+            async with self.get_async_session(readonly=True) as session:
+                result = await session.execute(select(EconomySettings).filter_by(guild_id=guild_id).limit(1))
+                return result.scalars().first()
+
+        return await self._economy_settings_cache.get_or_load(guild_id, load)
+
     async def get_or_create_economy_settings(self, guild_id: int) -> EconomySettings:
-        """Get or create economy settings for a guild"""
+        """Get or create economy settings for a guild (cached)"""
+        settings = await self._economy_settings_cache.get_or_load(
+            guild_id, lambda: self._load_or_create_economy_settings(guild_id)
+        )
+        if settings is None:
+            # Cached as missing by get_economy_settings
+            self._economy_settings_cache.invalidate(guild_id)
+            settings = await self._economy_settings_cache.get_or_load(
+                guild_id, lambda: self._load_or_create_economy_settings(guild_id)
+            )
+        return settings
+
+    async def _load_or_create_economy_settings(self, guild_id: int) -> EconomySettings:
+        """Load economy settings for a guild from the database, creating them if missing"""
+        async with self.get_async_session(readonly=True) as session:
+            result = await session.execute(select(EconomySettings).filter_by(guild_id=guild_id).limit(1))
+            settings = result.scalars().first()
+        if settings:
+            return settings
+
+        # Only a missing row needs a write session (and, on SQLite, the writer lock)
         async with self.get_async_session() as session:
             try:
-                settings = await session.query(EconomySettings).filter_by(guild_id=guild_id).first()
+                result = await session.execute(select(EconomySettings).filter_by(guild_id=guild_id).limit(1))
+                settings = result.scalars().first()
                 if settings:
                     return settings
 
@@ -974,7 +2453,8 @@ class DatabaseManager:
         """Update economy settings for a guild"""
         async with self.get_async_session() as session:
             try:
-                settings = await session.query(EconomySettings).filter_by(guild_id=guild_id).first()
+                result = await session.execute(select(EconomySettings).filter_by(guild_id=guild_id).limit(1))
+                settings = result.scalars().first()
                 if not settings:
                     settings = EconomySettings(guild_id=guild_id)
                     session.add(settings)
@@ -985,6 +2465,7 @@ class DatabaseManager:
 
                 await session.commit()
                 await session.refresh(settings)
+                await self._invalidate_config(self._economy_settings_cache, guild_id)
                 return settings
 
             except Exception as e:
@@ -994,13 +2475,18 @@ class DatabaseManager:
 
     async def get_or_create_user_economy(self, guild_id: int, user_id: int) -> UserEconomy:
         """Get or create user economy data"""
+        # Resolved before opening the session so the config load never waits on it
+        settings = await self.get_or_create_economy_settings(guild_id)
+
         async with self.get_async_session() as session:
             try:
-                economy = await session.query(UserEconomy).filter_by(guild_id=guild_id, user_id=user_id).first()
+                result = await session.execute(
+                    select(UserEconomy).filter_by(guild_id=guild_id, user_id=user_id).limit(1)
+                )
+                economy = result.scalars().first()
                 if economy:
                     return economy
 
-                settings = await self.get_or_create_economy_settings(guild_id)
                 economy = UserEconomy(
                     guild_id=guild_id,
                     user_id=user_id,
@@ -1009,6 +2495,7 @@ class DatabaseManager:
                 session.add(economy)
                 await session.commit()
                 await session.refresh(economy)
+                self._record_net_worth(guild_id, user_id, economy.net_worth)
                 return economy
 
             except Exception as e:
@@ -1018,42 +2505,45 @@ class DatabaseManager:
 
     async def update_user_balance(self, guild_id: int, user_id: int, cash_change: int = 0, bank_change: int = 0,
                                  reason: str = None, moderator_id: int = None) -> UserEconomy:
-        """Update user balance and log transaction"""
+        """Update user balance and log transaction atomically in the database"""
+        settings = await self.get_or_create_economy_settings(guild_id)
+
         async with self.get_async_session() as session:
             try:
-                economy = await session.query(UserEconomy).filter_by(guild_id=guild_id, user_id=user_id).first()
-                if not economy:
-                    economy = await self.get_or_create_user_economy(guild_id, user_id)
-
-                # Check max balance
-                settings = await self.get_or_create_economy_settings(guild_id)
-                new_cash = economy.cash + cash_change
-                new_bank = economy.bank + bank_change
-
-                if new_cash > settings.max_balance or new_bank > settings.max_balance:
-                    raise ValueError(f"Balance would exceed maximum of {settings.max_balance}")
-
-                if new_cash < 0 or new_bank < 0:
-                    raise ValueError("Balance cannot be negative")
-
-                economy.cash = new_cash
-                economy.bank = new_bank
-                economy.total_earned += max(0, cash_change) + max(0, bank_change)
+                economy = await self._apply_balance_change(
+                    session, guild_id, user_id, cash_change, bank_change,
+                    settings.max_balance, reason, moderator_id
+                )
 
-                # Log transaction
-                if cash_change != 0 or bank_change != 0:
-                    transaction = EconomyTransaction(
-                        guild_id=guild_id,
-                        user_id=user_id,
-                        type="balance_update",
-                        amount=cash_change + bank_change,
-                        reason=reason,
-                        moderator_id=moderator_id
+                if economy is None:
+                    # The conditional UPDATE matched nothing: either the wallet doesn't exist yet
+                    # or the change would push it out of bounds
+                    result = await session.execute(
+                        select(UserEconomy.cash, UserEconomy.bank).filter_by(guild_id=guild_id, user_id=user_id).limit(1)
                     )
-                    session.add(transaction)
+                    current = result.first()
+                    await session.rollback()
+
+                    if current is None:
+                        await self.get_or_create_user_economy(guild_id, user_id)
+                        economy = await self._apply_balance_change(
+                            session, guild_id, user_id, cash_change, bank_change,
+                            settings.max_balance, reason, moderator_id
+                        )
+                        if economy is None:
+                            result = await session.execute(
+                                select(UserEconomy.cash, UserEconomy.bank).filter_by(guild_id=guild_id, user_id=user_id).limit(1)
+                            )
+                            current = result.first()
+
+                    if economy is None:
+                        if (current.cash + cash_change > settings.max_balance or
+                                current.bank + bank_change > settings.max_balance):
+                            raise ValueError(f"Balance would exceed maximum of {settings.max_balance}")
+                        raise ValueError("Balance cannot be negative")
 
                 await session.commit()
-                await session.refresh(economy)
+                self._record_net_worth(guild_id, user_id, economy.net_worth)
                 return economy
 
             except Exception as e:
@@ -1061,24 +2551,152 @@ class DatabaseManager:
                 logger.error(f"Failed to update balance for user {user_id} in guild {guild_id}: {e}")
                 raise
 
-    async def get_leaderboard(self, guild_id: int, limit: int = 10) -> List[UserEconomy]:
+    async def _apply_balance_change(self, session: AsyncSession, guild_id: int, user_id: int,
+                                    cash_change: int, bank_change: int, max_balance: int,
+                                    reason: Optional[str] = None, moderator_id: Optional[int] = None,
+                                    transaction_type: str = "balance_update") -> Optional[UserEconomy]:
+        """Apply a bounded balance change with a single conditional UPDATE and log the transaction.
+
+        Returns the updated row, or None if no wallet matched or the new balance would fall
+        outside ``0..max_balance``. The caller owns the transaction and must commit it.
+        """
+        new_cash = UserEconomy.cash + cash_change
+        new_bank = UserEconomy.bank + bank_change
+        updated = (
+            update(UserEconomy)
+            .where(
+                UserEconomy.guild_id == guild_id,
+                UserEconomy.user_id == user_id,
+                new_cash.between(0, max_balance),
+                new_bank.between(0, max_balance)
+            )
+            .values(
+                cash=new_cash,
+                bank=new_bank,
+                total_earned=UserEconomy.total_earned + max(0, cash_change) + max(0, bank_change)
+            )
+            .returning(*UserEconomy.__table__.c)
+        )
+
+        if not cash_change and not bank_change:
+            statement = updated
+        elif self._dialect_name == 'postgresql':
+            # Log the transaction from a data-modifying CTE so the whole change is one statement
+            updated = updated.cte('updated')
+            logged = insert(EconomyTransaction).from_select(
+                ['guild_id', 'user_id', 'type', 'amount', 'reason', 'moderator_id', 'timestamp'],
+                select(
+                    updated.c.guild_id,
+                    updated.c.user_id,
+                    literal(transaction_type, String),
+                    literal(cash_change + bank_change, BigInteger),
+                    literal(reason, Text),
+                    literal(moderator_id, BigInteger),
+                    literal(datetime.utcnow(), DateTime)
+                )
+            ).cte('logged')
+            statement = select(updated).add_cte(logged)
+        else:
+            statement = updated
+
+        result = await session.execute(
+            select(UserEconomy).from_statement(statement).execution_options(populate_existing=True)
+        )
+        economy = result.scalars().first()
+
+        if economy is not None and (cash_change or bank_change) and self._dialect_name != 'postgresql':
+            session.add(EconomyTransaction(
+                guild_id=guild_id,
+                user_id=user_id,
+                type=transaction_type,
+                amount=cash_change + bank_change,
+                reason=reason,
+                moderator_id=moderator_id
+            ))
+
+        return economy
+
+    async def get_leaderboard(self, guild_id: int, limit: int = 10, offset: int = 0) -> List[UserEconomy]:
         """Get economy leaderboard for a guild"""
-        async with self.get_async_session() as session:
+        async with self.get_async_session(readonly=True) as session:
             try:
-                result = await session.query(UserEconomy).filter_by(guild_id=guild_id).order_by(
-                    (UserEconomy.cash + UserEconomy.bank).desc()
-                ).limit(limit).all()
-                return result
+                result = await session.execute(
+                    select(UserEconomy)
+                    .filter_by(guild_id=guild_id)
+                    .order_by(UserEconomy.net_worth.desc(), UserEconomy.user_id)
+                    .offset(offset)
+                    .limit(limit)
+                )
+                return list(result.scalars().all())
 
             except Exception as e:
                 logger.error(f"Failed to get leaderboard for guild {guild_id}: {e}")
                 return []
 
+    async def get_leaderboard_page(self, guild_id: int, page: int = 1,
+                                   per_page: int = 10) -> Tuple[List[Tuple[int, int, int]], int]:
+        """Get a page of ``(rank, user_id, net_worth)`` rows and the total number of ranked users"""
+        try:
+            index = await self._get_leaderboard_index(guild_id)
+            return index.page((max(page, 1) - 1) * per_page, per_page), len(index)
+
+        except Exception as e:
+            logger.error(f"Failed to get leaderboard page for guild {guild_id}: {e}")
+            return [], 0
+
+    async def get_user_rank(self, guild_id: int, user_id: int) -> Optional[int]:
+        """Get a user's 1-based leaderboard rank"""
+        try:
+            index = await self._get_leaderboard_index(guild_id)
+            return index.rank(user_id)
+
+        except Exception as e:
+            logger.error(f"Failed to get rank for user {user_id} in guild {guild_id}: {e}")
+            return None
+
+    async def _get_leaderboard_index(self, guild_id: int) -> LeaderboardIndex:
+        """Get the in-memory ranking for a guild, loading it from the database if needed"""
+        index = self._leaderboards.get(guild_id)
+        if index is not None and time.monotonic() - index.loaded_at < self._leaderboard_ttl:
+            self._leaderboards.move_to_end(guild_id)
+            return index
+
+        async with self.get_async_session(readonly=True) as session:
+            result = await session.execute(
+                select(UserEconomy.user_id, UserEconomy.net_worth).filter_by(guild_id=guild_id)
+            )
+            index = LeaderboardIndex(result.all())
+
+        self._leaderboards[guild_id] = index
+        self._leaderboards.move_to_end(guild_id)
+        while len(self._leaderboards) > self._leaderboard_max_guilds:
+            self._leaderboards.popitem(last=False)
+        return index
+
+    def _record_net_worth(self, guild_id: int, user_id: int, net_worth: Optional[int]):
+        """Apply a committed balance change to the guild's in-memory ranking, if loaded"""
+        index = self._leaderboards.get(guild_id)
+        if index is not None and net_worth is not None:
+            index.update(user_id, net_worth)
+
     async def get_game_settings(self, guild_id: int) -> GameSettings:
-        """Get game settings for a guild"""
+        """Get game settings for a guild (cached)"""
+        return await self._game_settings_cache.get_or_load(
+            guild_id, lambda: self._load_or_create_game_settings(guild_id)
+        )
+
+    async def _load_or_create_game_settings(self, guild_id: int) -> GameSettings:
+        """Load game settings for a guild from the database, creating them if missing"""
+        async with self.get_async_session(readonly=True) as session:
+            result = await session.execute(select(GameSettings).filter_by(guild_id=guild_id).limit(1))
+            settings = result.scalars().first()
+        if settings:
+            return settings
+
         async with self.get_async_session() as session:
             try:
-                settings = await session.query(GameSettings).filter_by(guild_id=guild_id).first()
+                result = await session.execute(select(GameSettings).filter_by(guild_id=guild_id).limit(1))
+                settings = result.scalars().first()
                 if settings:
                     return settings
 
@@ -1097,7 +2715,8 @@ class DatabaseManager:
         """Update game settings for a guild"""
         async with self.get_async_session() as session:
             try:
-                settings = await session.query(GameSettings).filter_by(guild_id=guild_id).first()
+                result = await session.execute(select(GameSettings).filter_by(guild_id=guild_id).limit(1))
+                settings = result.scalars().first()
                 if not settings:
                     settings = GameSettings(guild_id=guild_id)
                     session.add(settings)
@@ -1108,6 +2727,7 @@ class DatabaseManager:
 
                 await session.commit()
                 await session.refresh(settings)
+                await self._invalidate_config(self._game_settings_cache, guild_id)
                 return settings
 
             except Exception as e:
@@ -1137,35 +2757,40 @@ class DatabaseManager:
 
     async def get_user_inventory(self, guild_id: int, user_id: int) -> List[UserItem]:
         """Get user's inventory"""
-        async with self.get_async_session() as session:
+        async with self.get_async_session(readonly=True) as session:
             try:
-                result = await session.query(UserItem).filter_by(guild_id=guild_id, user_id=user_id).all()
-                return result
+                result = await session.execute(select(UserItem).filter_by(guild_id=guild_id, user_id=user_id))
+                return list(result.scalars().all())
 
             except Exception as e:
                 logger.error(f"Failed to get inventory for user {user_id} in guild {guild_id}: {e}")
                 return []
 
+    def _insert_for_dialect(self, model):
+        """Dialect-specific INSERT construct supporting ON CONFLICT clauses"""
+        if self._dialect_name == 'postgresql':
+            return pg_insert(model)
+        return sqlite_insert(model)
+
+    def _upsert_inventory(self, rows: List[Dict[str, Any]]):
+        """Build an INSERT that adds to the quantity of existing (guild, user, item) rows"""
+        stmt = self._insert_for_dialect(UserItem).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[UserItem.guild_id, UserItem.user_id, UserItem.item_id],
+            set_={'quantity': UserItem.quantity + stmt.excluded.quantity}
+        )
+
     async def add_item_to_inventory(self, guild_id: int, user_id: int, item_id: int, quantity: int = 1):
         """Add item to user's inventory"""
         async with self.get_async_session() as session:
             try:
-                # Check if user already has this item
-                existing = await session.query(UserItem).filter_by(
-                    guild_id=guild_id, user_id=user_id, item_id=item_id
-                ).first()
-
-                if existing:
-                    existing.quantity += quantity
-                else:
-                    user_item = UserItem(
-                        guild_id=guild_id,
-                        user_id=user_id,
-                        item_id=item_id,
-                        quantity=quantity
-                    )
-                    session.add(user_item)
-
+                await session.execute(self._upsert_inventory([{
+                    'guild_id': guild_id,
+                    'user_id': user_id,
+                    'item_id': item_id,
+                    'quantity': quantity,
+                    'acquired_at': datetime.utcnow()
+                }]))
                 await session.commit()
 
             except Exception as e:
@@ -1174,37 +2799,110 @@ class DatabaseManager:
 
     async def remove_item_from_inventory(self, guild_id: int, user_id: int, item_id: int, quantity: int = 1) -> bool:
         """Remove item from user's inventory"""
+        removed = await self.bulk_remove_items(guild_id, [user_id], {item_id: quantity})
+        return user_id in removed.get(item_id, [])
+
+    async def bulk_add_items(self, guild_id: int, user_ids: Iterable[int], items: Dict[int, int],
+                             batch_size: int = 1000) -> int:
+        """Grant every item in ``items`` (item_id -> quantity) to every user, returns rows written"""
+        user_ids = list(dict.fromkeys(user_ids))
+        items = {item_id: quantity for item_id, quantity in items.items() if quantity > 0}
+        if not user_ids or not items:
+            return 0
+
+        now = datetime.utcnow()
+        rows = [
+            {'guild_id': guild_id, 'user_id': user_id, 'item_id': item_id,
+             'quantity': quantity, 'acquired_at': now}
+            for user_id in user_ids
+            for item_id, quantity in items.items()
+        ]
+
         async with self.get_async_session() as session:
             try:
-                existing = await session.query(UserItem).filter_by(
-                    guild_id=guild_id, user_id=user_id, item_id=item_id
-                ).first()
+                for i in range(0, len(rows), batch_size):
+                    await session.execute(self._upsert_inventory(rows[i:i + batch_size]))
+                await session.commit()
+                return len(rows)
 
-                if not existing or existing.quantity < quantity:
-                    return False
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to bulk add items in guild {guild_id}: {e}")
+                raise
+
+    async def bulk_remove_items(self, guild_id: int, user_ids: Iterable[int], items: Dict[int, int],
+                                batch_size: int = 1000) -> Dict[int, List[int]]:
+        """Consume items (item_id -> quantity) from many users.
+
+        Each (user, item) pair is taken only if the user holds enough of it;
+        returns item_id -> user_ids that were charged.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        removed: Dict[int, List[int]] = {}
+        if not user_ids:
+            return removed
 
-                existing.quantity -= quantity
-                if existing.quantity <= 0:
-                    await session.delete(existing)
+        async with self.get_async_session() as session:
+            try:
+                for item_id, quantity in items.items():
+                    charged = []
+                    for i in range(0, len(user_ids), batch_size):
+                        result = await session.execute(
+                            update(UserItem)
+                            .where(
+                                UserItem.guild_id == guild_id,
+                                UserItem.item_id == item_id,
+                                UserItem.user_id.in_(user_ids[i:i + batch_size]),
+                                UserItem.quantity >= quantity
+                            )
+                            .values(quantity=UserItem.quantity - quantity)
+                            .returning(UserItem.user_id)
+                            .execution_options(synchronize_session=False)
+                        )
+                        charged.extend(result.scalars().all())
+
+                    if charged:
+                        removed[item_id] = charged
+
+                # Drop rows that were used up
+                if removed:
+                    await session.execute(
+                        delete(UserItem)
+                        .where(
+                            UserItem.guild_id == guild_id,
+                            UserItem.item_id.in_(list(removed)),
+                            UserItem.quantity <= 0
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
 
                 await session.commit()
-                return True
+                return removed
 
             except Exception as e:
                 await session.rollback()
-                logger.error(f"Failed to remove item from inventory: {e}")
-                return False
+                logger.error(f"Failed to remove items from inventory: {e}")
+                return {}
 
     async def get_store_items(self, guild_id: int) -> List[EconomyItem]:
-        """Get all store items for a guild"""
-        async with self.get_async_session() as session:
-            try:
-                result = await session.query(EconomyItem).filter_by(guild_id=guild_id).all()
-                return result
+        """Get all store items for a guild (cached)"""
+        try:
+            items = await self._store_items_cache.get_or_load(
+                guild_id, lambda: self._load_store_items(guild_id)
+            )
+            return list(items or [])
 
-            except Exception as e:
-                logger.error(f"Failed to get store items for guild {guild_id}: {e}")
-                return []
+        except Exception as e:
+            logger.error(f"Failed to get store items for guild {guild_id}: {e}")
+            return []
+
+    async def _load_store_items(self, guild_id: int) -> List[EconomyItem]:
+        """Load the store catalog for a guild from the database"""
+        async with self.get_async_session(readonly=True) as session:
+            result = await session.execute(
+                select(EconomyItem).filter_by(guild_id=guild_id).order_by(EconomyItem.id)
+            )
+            return list(result.scalars().all())
 
     async def create_store_item(self, guild_id: int, name: str, description: str, price: int,
                               sell_price: int = None, stock: int = -1, role_required: int = None,
@@ -1226,6 +2924,7 @@ class DatabaseManager:
                 session.add(item)
                 await session.commit()
                 await session.refresh(item)
+                await self._invalidate_config(self._store_items_cache, guild_id)
                 return item
 
             except Exception as e:
@@ -1235,12 +2934,12 @@ class DatabaseManager:
 
     async def get_custom_replies(self, guild_id: int, command: str, reply_type: str) -> List[CustomReply]:
         """Get custom replies for a command"""
-        async with self.get_async_session() as session:
+        async with self.get_async_session(readonly=True) as session:
             try:
-                result = await session.query(CustomReply).filter_by(
+                result = await session.execute(select(CustomReply).filter_by(
                     guild_id=guild_id, command=command, type=reply_type
-                ).all()
-                return result
+                ))
+                return list(result.scalars().all())
 
             except Exception as e:
                 logger.error(f"Failed to get custom replies: {e}")
@@ -1283,7 +2982,8 @@ class DatabaseManager:
         """Get role income settings"""
         async with self.get_async_session() as session:
             try:
-                return await session.query(RoleIncome).filter_by(guild_id=guild_id, role_id=role_id).first()
+                result = await session.execute(select(RoleIncome).filter_by(guild_id=guild_id, role_id=role_id).limit(1))
+                return result.scalars().first()
 
             except Exception as e:
                 logger.error(f"Failed to get role income: {e}")
@@ -1293,7 +2993,8 @@ class DatabaseManager:
         """Set role income"""
         async with self.get_async_session() as session:
             try:
-                role_income = await session.query(RoleIncome).filter_by(guild_id=guild_id, role_id=role_id).first()
+                result = await session.execute(select(RoleIncome).filter_by(guild_id=guild_id, role_id=role_id).limit(1))
+                role_income = result.scalars().first()
                 if role_income:
                     role_income.income_amount = income_amount
                     role_income.cooldown = cooldown
@@ -1316,14 +3017,16 @@ class DatabaseManager:
         """Collect role income for user"""
         async with self.get_async_session() as session:
             try:
-                role_income = await session.query(RoleIncome).filter_by(guild_id=guild_id, role_id=role_id).first()
+                result = await session.execute(select(RoleIncome).filter_by(guild_id=guild_id, role_id=role_id).limit(1))
+                role_income = result.scalars().first()
                 if not role_income:
                     return None
 
                 # Check if user can collect
-                user_role_income = await session.query(UserRoleIncome).filter_by(
+                result = await session.execute(select(UserRoleIncome).filter_by(
                     guild_id=guild_id, user_id=user_id, role_income_id=role_income.id
-                ).first()
+                ).limit(1))
+                user_role_income = result.scalars().first()
 
                 now = datetime.utcnow()
                 if user_role_income and user_role_income.last_collected:
@@ -1351,20 +3054,359 @@ class DatabaseManager:
                 logger.error(f"Failed to collect role income: {e}")
                 return None
 
+    async def collect_all_role_income(self, guild_id: int, user_id: int, role_ids: Iterable[int]) -> Dict[int, int]:
+        """Collect and pay income for every eligible role a member has.
+
+        Returns role_id -> amount paid; empty if nothing was due or the payout
+        would exceed the guild's maximum balance.
+        """
+        role_ids = list(set(role_ids))
+        if not role_ids:
+            return {}
+
+        settings = await self.get_or_create_economy_settings(guild_id)
+
+        async with self.get_async_session() as session:
+            try:
+                now = datetime.utcnow()
+                result = await session.execute(
+                    select(RoleIncome, UserRoleIncome.id, UserRoleIncome.last_collected)
+                    .outerjoin(UserRoleIncome, and_(
+                        UserRoleIncome.role_income_id == RoleIncome.id,
+                        UserRoleIncome.guild_id == guild_id,
+                        UserRoleIncome.user_id == user_id
+                    ))
+                    .where(RoleIncome.guild_id == guild_id, RoleIncome.role_id.in_(role_ids))
+                )
+
+                tracked: List[RoleIncome] = []
+                untracked: List[RoleIncome] = []
+                for role_income, tracking_id, last_collected in result.all():
+                    if last_collected and (now - last_collected).total_seconds() < role_income.cooldown:
+                        continue
+                    (tracked if tracking_id else untracked).append(role_income)
+
+                if not tracked and not untracked:
+                    return {}
+
+                # Claim the cooldowns; the predicates make concurrent collections pay once
+                claimed = set()
+                if tracked:
+                    result = await session.execute(
+                        update(UserRoleIncome)
+                        .where(
+                            UserRoleIncome.guild_id == guild_id,
+                            UserRoleIncome.user_id == user_id,
+                            or_(*[
+                                and_(
+                                    UserRoleIncome.role_income_id == role_income.id,
+                                    or_(
+                                        UserRoleIncome.last_collected.is_(None),
+                                        UserRoleIncome.last_collected <= now - timedelta(seconds=role_income.cooldown)
+                                    )
+                                )
+                                for role_income in tracked
+                            ])
+                        )
+                        .values(last_collected=now)
+                        .returning(UserRoleIncome.role_income_id)
+                        .execution_options(synchronize_session=False)
+                    )
+                    claimed.update(result.scalars().all())
+
+                if untracked:
+                    claimed.update(
+                        role_income_id for _, role_income_id in await self._insert_role_income_claims(
+                            session, guild_id, [(user_id, role_income.id) for role_income in untracked], now
+                        )
+                    )
+
+                paid = {
+                    role_income.role_id: role_income.income_amount
+                    for role_income in tracked + untracked if role_income.id in claimed
+                }
+                if not paid:
+                    await session.rollback()
+                    return {}
+
+                await self._ensure_user_economies(session, guild_id, [user_id], settings.start_balance)
+                economy = await self._apply_balance_change(
+                    session, guild_id, user_id, sum(paid.values()), 0, settings.max_balance,
+                    reason="Role income", transaction_type="role_income"
+                )
+                if economy is None:
+                    await session.rollback()
+                    return {}
+
+                await session.commit()
+                self._record_net_worth(guild_id, user_id, economy.net_worth)
+                return paid
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to collect role income for user {user_id} in guild {guild_id}: {e}")
+                return {}
+
+    async def payout_role_income(self, guild_id: int, member_roles: Dict[int, Iterable[int]],
+                                 batch_size: int = 1000) -> Dict[int, int]:
+        """Pay every due role income in a guild in bulk.
+
+        ``member_roles`` maps user_id -> role IDs the member currently holds.
+        Returns user_id -> amount paid. Balances are capped at the guild maximum;
+        members already at the cap are skipped and keep their cooldowns.
+        """
+        settings = await self.get_or_create_economy_settings(guild_id)
+
+        async with self.get_async_session() as session:
+            try:
+                result = await session.execute(select(RoleIncome).filter_by(guild_id=guild_id))
+                incomes = {role_income.role_id: role_income for role_income in result.scalars().all()}
+                if not incomes:
+                    return {}
+
+                # Lock the members' wallets; those already at the cap would be credited
+                # nothing, so their cooldowns are left unclaimed
+                capped = await self._capped_wallets(
+                    session, guild_id, [user_id for user_id, role_ids in member_roles.items()
+                                        if any(role_id in incomes for role_id in role_ids)],
+                    settings.max_balance, batch_size
+                )
+
+                holders: Dict[int, List[int]] = {}
+                for user_id, role_ids in member_roles.items():
+                    if user_id in capped:
+                        continue
+                    for role_id in set(role_ids):
+                        if role_id in incomes:
+                            holders.setdefault(role_id, []).append(user_id)
+
+                now = datetime.utcnow()
+                owed: Dict[int, int] = {}
+                for role_id, user_ids in holders.items():
+                    role_income = incomes[role_id]
+                    cutoff = now - timedelta(seconds=role_income.cooldown)
+                    for i in range(0, len(user_ids), batch_size):
+                        chunk = user_ids[i:i + batch_size]
+                        result = await session.execute(
+                            update(UserRoleIncome)
+                            .where(
+                                UserRoleIncome.guild_id == guild_id,
+                                UserRoleIncome.role_income_id == role_income.id,
+                                UserRoleIncome.user_id.in_(chunk),
+                                or_(UserRoleIncome.last_collected.is_(None), UserRoleIncome.last_collected <= cutoff)
+                            )
+                            .values(last_collected=now)
+                            .returning(UserRoleIncome.user_id)
+                            .execution_options(synchronize_session=False)
+                        )
+                        claimed = list(result.scalars().all())
+                        # Members collecting for the first time; existing rows are skipped by the conflict
+                        claimed.extend(user_id for user_id, _ in await self._insert_role_income_claims(
+                            session, guild_id, [(user_id, role_income.id) for user_id in chunk], now
+                        ))
+                        for user_id in claimed:
+                            owed[user_id] = owed.get(user_id, 0) + role_income.income_amount
+
+                if not owed:
+                    await session.rollback()
+                    return {}
+
+                await self._ensure_user_economies(session, guild_id, list(owed), settings.start_balance, batch_size)
+                credited = await self._credit_cash_bulk(
+                    session, guild_id, owed, settings.max_balance, 'role_income', 'Role income', batch_size=batch_size
+                )
+
+                await session.commit()
+                for user_id, (_, net_worth) in credited.items():
+                    self._record_net_worth(guild_id, user_id, net_worth)
+                return {user_id: amount for user_id, (amount, _) in credited.items() if amount > 0}
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to pay role income in guild {guild_id}: {e}")
+                return {}
+
+    async def settle_chat_money(self, guild_id: int, earnings: Dict[int, int], batch_size: int = 1000) -> Dict[int, int]:
+        """Credit accumulated chat earnings (user_id -> amount) in bulk.
+
+        Returns user_id -> amount credited; members already at the balance cap
+        are left out.
+        """
+        earnings = {user_id: amount for user_id, amount in earnings.items() if amount > 0}
+        if not earnings:
+            return {}
+
+        settings = await self.get_or_create_economy_settings(guild_id)
+
+        async with self.get_async_session() as session:
+            try:
+                await self._ensure_user_economies(session, guild_id, list(earnings), settings.start_balance, batch_size)
+                credited = await self._credit_cash_bulk(
+                    session, guild_id, earnings, settings.max_balance, 'chat_money', 'Chat money',
+                    batch_size=batch_size, last_chat_money=datetime.utcnow()
+                )
+
+                await session.commit()
+                for user_id, (_, net_worth) in credited.items():
+                    self._record_net_worth(guild_id, user_id, net_worth)
+                return {user_id: amount for user_id, (amount, _) in credited.items() if amount > 0}
+
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Failed to settle chat money in guild {guild_id}: {e}")
+                raise
+
+    async def _credit_cash_bulk(self, session: AsyncSession, guild_id: int, amounts: Dict[int, int],
+                                max_balance: int, transaction_type: str, reason: str,
+                                batch_size: int = 1000, **values) -> Dict[int, Tuple[int, int]]:
+        """Add per-user cash amounts (capped at max_balance) and log one transaction each.
+
+        Only what fits under the cap is credited, to cash, total_earned and the
+        transaction log alike. Extra keyword arguments are assigned on every
+        updated wallet. Returns user_id -> (amount credited, new net worth).
+        The caller owns the transaction.
+        """
+        now = datetime.utcnow()
+        credited: Dict[int, Tuple[int, int]] = {}
+        user_ids = list(amounts)
+        for i in range(0, len(user_ids), batch_size):
+            chunk = {user_id: amounts[user_id] for user_id in user_ids[i:i + batch_size]}
+            requested = case(chunk, value=UserEconomy.user_id, else_=0)
+
+            # Lock the wallets and work out what fits under the cap before crediting
+            result = await session.execute(
+                select(
+                    UserEconomy.user_id,
+                    case(
+                        (UserEconomy.cash >= max_balance, 0),
+                        (UserEconomy.cash + requested > max_balance, max_balance - UserEconomy.cash),
+                        else_=requested
+                    )
+                )
+                .where(UserEconomy.guild_id == guild_id, UserEconomy.user_id.in_(list(chunk)))
+                .with_for_update()
+            )
+            deltas = dict(result.tuples().all())
+            if not deltas:
+                continue
+
+            amount = case(deltas, value=UserEconomy.user_id, else_=0)
+            result = await session.execute(
+                update(UserEconomy)
+                .where(UserEconomy.guild_id == guild_id, UserEconomy.user_id.in_(list(deltas)))
+                .values(cash=UserEconomy.cash + amount, total_earned=UserEconomy.total_earned + amount, **values)
+                .returning(UserEconomy.user_id, UserEconomy.net_worth)
+                .execution_options(synchronize_session=False)
+            )
+            for user_id, net_worth in result.tuples().all():
+                credited[user_id] = (deltas[user_id], net_worth)
+
+        transactions = [
+            {'guild_id': guild_id, 'user_id': user_id, 'type': transaction_type,
+             'amount': amount, 'reason': reason, 'timestamp': now}
+            for user_id, (amount, _) in credited.items() if amount > 0
+        ]
+        if transactions:
+            await session.execute(insert(EconomyTransaction), transactions)
+        return credited
+
+    async def _capped_wallets(self, session: AsyncSession, guild_id: int, user_ids: List[int],
+                              max_balance: int, batch_size: int = 1000) -> Set[int]:
+        """Lock the users' wallets and return the ones already holding max_balance or more"""
+        capped: Set[int] = set()
+        for i in range(0, len(user_ids), batch_size):
+            result = await session.execute(
+                select(UserEconomy.user_id, UserEconomy.cash)
+                .where(UserEconomy.guild_id == guild_id, UserEconomy.user_id.in_(user_ids[i:i + batch_size]))
+                .with_for_update()
+            )
+            capped.update(user_id for user_id, cash in result.tuples().all() if cash >= max_balance)
+        return capped
+
+    async def _insert_role_income_claims(self, session: AsyncSession, guild_id: int,
+                                         claims: List[Tuple[int, int]], now: datetime) -> List[Tuple[int, int]]:
+        """Insert (user_id, role_income_id) tracking rows, returning the ones that didn't exist yet"""
+        stmt = self._insert_for_dialect(UserRoleIncome).values([
+            {'guild_id': guild_id, 'user_id': user_id, 'role_income_id': role_income_id, 'last_collected': now}
+            for user_id, role_income_id in claims
+        ])
+        result = await session.execute(
+            stmt.on_conflict_do_nothing(
+                index_elements=[UserRoleIncome.guild_id, UserRoleIncome.user_id, UserRoleIncome.role_income_id]
+            ).returning(UserRoleIncome.user_id, UserRoleIncome.role_income_id)
+        )
+        return list(result.tuples().all())
+
+    async def _ensure_user_economies(self, session: AsyncSession, guild_id: int, user_ids: List[int],
+                                     start_balance: int, batch_size: int = 1000):
+        """Create missing wallets for users in the current transaction"""
+        now = datetime.utcnow()
+        for i in range(0, len(user_ids), batch_size):
+            stmt = self._insert_for_dialect(UserEconomy).values([
+                {'guild_id': guild_id, 'user_id': user_id, 'cash': start_balance, 'bank': 0,
+                 'total_earned': 0, 'created_at': now, 'updated_at': now}
+                for user_id in user_ids[i:i + batch_size]
+            ])
+            await session.execute(
+                stmt.on_conflict_do_nothing(index_elements=[UserEconomy.guild_id, UserEconomy.user_id])
+            )
+
+    def start_role_income_task(self, member_roles_provider: Callable[[], Awaitable[Dict[int, Dict[int, Iterable[int]]]]],
+                               interval: float = 3600.0):
+        """Start scheduled role income payouts.
+
+        ``member_roles_provider`` returns guild_id -> {user_id: role IDs} for the
+        guilds to pay, typically built from the bot's member cache.
+        """
+        if self._role_income_task and not self._role_income_task.done():
+            self._role_income_task.cancel()
+
+        self._role_income_task = asyncio.create_task(self._role_income_loop(member_roles_provider, interval))
+
+    async def stop_role_income_task(self):
+        """Stop scheduled role income payouts"""
+        if self._role_income_task and not self._role_income_task.done():
+            self._role_income_task.cancel()
+            try:
+                await self._role_income_task
+            except asyncio.CancelledError:
+                pass
+        self._role_income_task = None
+
+    async def _role_income_loop(self, member_roles_provider: Callable[[], Awaitable[Dict[int, Dict[int, Iterable[int]]]]],
+                                interval: float):
+        """Pay role income periodically"""
+        while True:
+            try:
+                guilds = await member_roles_provider()
+                for guild_id, member_roles in guilds.items():
+                    paid = await self.payout_role_income(guild_id, member_roles)
+                    if paid:
+                        logger.info(f"Paid role income to {len(paid)} members in guild {guild_id}")
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in role income task: {e}")
+                await asyncio.sleep(interval)
+
     async def reset_economy(self, guild_id: int):
         """Reset all economy data for a guild"""
         async with self.get_async_session() as session:
             try:
                 # Reset user economies
-                await session.query(UserEconomy).filter_by(guild_id=guild_id).update({"cash": 0, "bank": 0, "total_earned": 0})
+                await session.execute(
+                    update(UserEconomy).filter_by(guild_id=guild_id).values(cash=0, bank=0, total_earned=0)
+                )
                 # Delete transactions
-                await session.query(EconomyTransaction).filter_by(guild_id=guild_id).delete()
+                await session.execute(delete(EconomyTransaction).filter_by(guild_id=guild_id))
                 # Delete user items
-                await session.query(UserItem).filter_by(guild_id=guild_id).delete()
+                await session.execute(delete(UserItem).filter_by(guild_id=guild_id))
                 # Delete custom replies
-                await session.query(CustomReply).filter_by(guild_id=guild_id).delete()
+                await session.execute(delete(CustomReply).filter_by(guild_id=guild_id))
 
                 await session.commit()
+                self._leaderboards.pop(guild_id, None)
 
             except Exception as e:
                 await session.rollback()
@@ -1374,19 +3416,19 @@ class DatabaseManager:
         """Remove users from leaderboard that have left the guild"""
         async with self.get_async_session() as session:
             try:
-                # Get all users in economy
-                economy_users = await session.query(UserEconomy).filter_by(guild_id=guild_id).all()
-
                 # Check which users are still in the guild (this would need guild member data)
                 # For now, just remove users with 0 balance
-                deleted_count = await session.query(UserEconomy).filter(
-                    UserEconomy.guild_id == guild_id,
-                    UserEconomy.cash == 0,
-                    UserEconomy.bank == 0
-                ).delete()
+                result = await session.execute(
+                    delete(UserEconomy).where(
+                        UserEconomy.guild_id == guild_id,
+                        UserEconomy.cash == 0,
+                        UserEconomy.bank == 0
+                    )
+                )
 
                 await session.commit()
-                return deleted_count
+                self._leaderboards.pop(guild_id, None)
+                return result.rowcount
 
             except Exception as e:
                 await session.rollback()
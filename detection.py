@@ -4,12 +4,21 @@ Provides sophisticated event detection, pattern recognition, and threat analysis
 """
 
 import asyncio
+import heapq
+import json
+import operator
+import os
+import random
 import re
 import time
-from typing import Dict, List, Any, Optional, Tuple, Set
-from datetime import datetime, timedelta
-from dataclasses import dataclass, field
-from collections import defaultdict, Counter
+import uuid
+from typing import Dict, List, Any, Optional, Tuple, Set, FrozenSet, Deque, Callable, Awaitable
+from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass, field, replace
+from bisect import bisect_left, bisect_right
+from itertools import count, islice
+from collections import OrderedDict, deque, Counter
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 import logging
 from enum import Enum
 
@@ -36,6 +45,7 @@ class DetectionType(Enum):
     BOT_DETECTION = "bot_detection"
     INVITE_ABUSE = "invite_abuse"
     MASS_MENTION = "mass_mention"
+    DUPLICATE_CONTENT = "duplicate_content"
 
 @dataclass
 class DetectionRule:
@@ -46,7 +56,7 @@ class DetectionRule:
     threshold: int = 5
     time_window: int = 60  # seconds
     cooldown_period: int = 300  # seconds
-    action: str = "log"  # log, warn, kick, ban, jail
+    action: str = "log"  # log, warn, kick, ban, jail, lockdown
     severity: ThreatLevel = ThreatLevel.MEDIUM
     patterns: List[str] = field(default_factory=list)
     description: str = ""
@@ -63,44 +73,182 @@ class DetectionEvent:
     timestamp: datetime = field(default_factory=datetime.utcnow)
     resolved: bool = False
     resolution: Optional[str] = None
+    event_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+# Only the first MAX_SCAN_CHARS characters of a message are scanned (Discord's own limit is 4000)
+MAX_SCAN_CHARS = 4000
+# Longest repeated unit looked for by the spam_patterns detector
+MAX_REPEAT_PERIOD = 32
+# Messages longer than this are always analyzed with priority
+RISKY_MESSAGE_LENGTH = 1000
 
 class PatternMatcher:
-    """Advanced pattern matching for suspicious content"""
+    """Advanced pattern matching for suspicious content.
 
-    def __init__(self):
+    Every detector runs in time linear in the scanned text: the regexes avoid
+    nested or overlapping quantifiers, and repetition is found by comparing
+    blocks rather than with backreferences.
+    """
+
+    def __init__(self, max_scan_chars: int = MAX_SCAN_CHARS, max_repeat_period: int = MAX_REPEAT_PERIOD):
+        self.max_scan_chars = max_scan_chars
+        self.max_repeat_period = max_repeat_period
         self._compiled_patterns = {}
+        self._triggers: Dict[str, re.Pattern] = {}
+        self._scanned_sources: Dict[str, str] = {}
+        self._scanners: Dict[FrozenSet[str], re.Pattern] = {}
         self._initialize_patterns()
 
     def _initialize_patterns(self):
         """Initialize regex patterns for detection"""
-        patterns = {
-            'discord_invites': re.compile(r'(?:https?://)?discord(?:app\.com/invite|\.gg)/[a-zA-Z0-9]+'),
-            'suspicious_urls': re.compile(r'https?://(?:[^\.]+\.)*(?:hack|exploit|malware|virus|phish|scam|fake)[^\s]*', re.IGNORECASE),
-            'mass_mentions': re.compile(r'@(?:everyone|here)|\b(?:\d{15,20})\b.*@(?:everyone|here)'),
-            'spam_patterns': re.compile(r'(.)\1{10,}|(.{2,})\1{5,}', re.IGNORECASE),
-            'caps_lock': re.compile(r'[A-Z]{20,}'),
-            'repeated_messages': re.compile(r'^(.{10,})\1+$'),
-            'suspicious_commands': re.compile(r'!(?:eval|exec|system|shell|cmd|powershell|bash)', re.IGNORECASE),
-            'ip_addresses': re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b'),
-            'phone_numbers': re.compile(r'\b(?:\+?1[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})\b'),
-            'email_addresses': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
+        # name -> (pattern, trigger). Folded into one alternation in this priority
+        # order; the trigger must occur in the text for the pattern to match at all.
+        scanned = {
+            'suspicious_urls': (r'(?i:https?://(?:[^\s./]+\.)*(?:hack|exploit|malware|virus|phish|scam|fake)\S*)', r'://'),
+            'discord_invites': (r'(?:https?://)?discord(?:app\.com/invite|\.gg)/[a-zA-Z0-9]+', r'discord'),
+            'email_addresses': (r'(?<![A-Za-z0-9._%+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b', r'@'),
+            'mass_mentions': (r'@(?:everyone|here)', r'@'),
+            'suspicious_commands': (r'(?i:!(?:eval|exec|system|shell|cmd|powershell|bash))', r'!'),
+            'ip_addresses': (r'\b(?:\d{1,3}\.){3}\d{1,3}\b', r'\d\.'),
+            'phone_numbers': (r'\b(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}\b', r'\d'),
+            'caps_lock': (r'(?<![A-Z])[A-Z]{20,}', r'[A-Z]'),
         }
 
-        self._compiled_patterns = patterns
-
-    def match_patterns(self, text: str) -> Dict[str, List[str]]:
-        """Match text against all patterns"""
+        self._scanned_sources = {name: source for name, (source, _) in scanned.items()}
+        self.categories: FrozenSet[str] = frozenset(scanned) | {'spam_patterns', 'repeated_messages'}
+        self._triggers = {name: re.compile(trigger) for name, (_, trigger) in scanned.items()}
+        self._compiled_patterns = {name: re.compile(source) for name, source in self._scanned_sources.items()}
+        self._scanners = {}
+
+        # A single-character backreference only compares forward from each start
+        # (at most 11 steps before failing), so this stays linear
+        self._char_run_pattern = re.compile(r'(.)\1{10,}', re.IGNORECASE | re.DOTALL)
+
+        self._risk_pattern = re.compile(r'://|discord|@everyone|@here', re.IGNORECASE)
+
+    def has_risk_markers(self, text: str) -> bool:
+        """Cheap check for links, invites and mass mentions, used to prioritize analysis"""
+        return len(text) > RISKY_MESSAGE_LENGTH or self._risk_pattern.search(text, 0, self.max_scan_chars) is not None
+
+    def _get_scanner(self, categories: FrozenSet[str]) -> re.Pattern:
+        """Get the combined alternation for a set of categories, compiling it on first use"""
+        scanner = self._scanners.get(categories)
+        if scanner is None:
+            scanner = re.compile('|'.join(
+                f'(?P<{name}>{source})' for name, source in self._scanned_sources.items()
+                if name in categories
+            ))
+            self._scanners[categories] = scanner
+        return scanner
+
+    def match_patterns(self, text: str, categories: Optional[FrozenSet[str]] = None) -> Dict[str, List[str]]:
+        """Match text against all patterns, or only ``categories``, in a single scan.
+
+        Scanned categories report non-overlapping matches: where two categories
+        match at the same position, the one earlier in the priority order wins.
+        """
         matches = {}
-        for pattern_name, pattern in self._compiled_patterns.items():
-            found = pattern.findall(text)
-            if found:
-                matches[pattern_name] = found
+        text = text[:self.max_scan_chars]
+
+        triggered = frozenset(
+            name for name, trigger in self._triggers.items()
+            if (categories is None or name in categories) and trigger.search(text)
+        )
+        if triggered:
+            for match in self._get_scanner(triggered).finditer(text):
+                matches.setdefault(match.lastgroup, []).append(match.group())
+
+        if categories is None or 'spam_patterns' in categories:
+            spam = self._find_spam_runs(text)
+            if spam:
+                matches['spam_patterns'] = spam
+
+        if categories is None or 'repeated_messages' in categories:
+            unit = self._find_repeated_message(text)
+            if unit:
+                matches['repeated_messages'] = [unit]
+
         return matches
 
-    def calculate_suspicious_score(self, text: str, user_context: Dict[str, Any]) -> float:
-        """Calculate suspiciousness score for text"""
+    def _find_spam_runs(self, text: str) -> List[str]:
+        """Find a character repeated 11+ times or a unit of 2+ characters repeated 6+ times.
+
+        Returns the repeated unit of each non-overlapping run, leftmost first.
+        """
+        folded = text.lower()
+        runs = [(m.start(), m.end(), 1) for m in self._char_run_pattern.finditer(folded)]
+        runs.extend(self._find_periodic_runs(folded))
+        if not runs:
+            return []
+
+        found = []
+        last_end = 0
+        for start, end, period in sorted(runs, key=lambda run: (run[0], run[2])):
+            if start >= last_end:
+                found.append(folded[start:start + period])
+                last_end = end
+        return found
+
+    def _find_periodic_runs(self, text: str) -> List[Tuple[int, int, int]]:
+        """Find (start, end, period) of stretches made of 6+ copies of a 2..max_repeat_period unit.
+
+        For each period the text is cut into aligned blocks; six copies always
+        contain five equal consecutive blocks, which are then extended by less
+        than one period on each side. That is O(n / period) block comparisons
+        per period, so linear in the text for a bounded period.
+        """
+        n = len(text)
+        runs = []
+        for period in range(2, min(self.max_repeat_period, n // 6) + 1):
+            blocks = [text[i:i + period] for i in range(0, n - period + 1, period)]
+            # equal[j] is 1 when block j equals block j + 1
+            equal = bytes(map(operator.eq, blocks, blocks[1:]))
+
+            pos = equal.find(b'\x01\x01\x01\x01')
+            while pos != -1:
+                last = equal.find(b'\x00', pos)
+                if last == -1:
+                    last = len(equal)
+
+                start, end = pos * period, (last + 1) * period
+                while start > 0 and text[start - 1] == text[start - 1 + period]:
+                    start -= 1
+                while end < n and text[end] == text[end - period]:
+                    end += 1
+
+                if end - start >= 6 * period:
+                    runs.append((start, end, period))
+                pos = equal.find(b'\x01\x01\x01\x01', last)
+        return runs
+
+    def _find_repeated_message(self, text: str) -> Optional[str]:
+        """Return the longest unit of 10+ characters that the whole text repeats, if any.
+
+        The smallest period of a text is the first offset where it reappears in
+        itself doubled; str.find runs in linear time for this.
+        """
+        if text.endswith('\n'):
+            text = text[:-1]
+        n = len(text)
+        if n < 20 or '\n' in text:
+            return None
+
+        period = (text + text).find(text, 1)
+        if period >= n:
+            return None
+
+        # Every unit the text repeats is a multiple of the smallest period; keep the longest
+        copies = n // period
+        factor = next(f for f in range(2, copies + 1) if copies % f == 0)
+        unit = n // factor
+        return text[:unit] if unit >= 10 else None
+
+    def calculate_suspicious_score(self, text: str, user_context: Dict[str, Any],
+                                   matches: Optional[Dict[str, List[str]]] = None) -> float:
+        """Calculate suspiciousness score for text, reusing ``matches`` when already scanned"""
         score = 0.0
-        matches = self.match_patterns(text)
+        if matches is None:
+            matches = self.match_patterns(text)
 
         # Score based on pattern matches
         scoring = {
@@ -130,55 +278,111 @@ class PatternMatcher:
 
         return min(score, 1.0)
 
-class RateLimiter:
-    """Advanced rate limiting with multiple windows"""
-
-    def __init__(self):
-        self._user_actions: Dict[int, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
-        self._guild_actions: Dict[int, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
-        self._cleanup_task: Optional[asyncio.Task] = None
-        self._start_cleanup_task()
-
-    def _start_cleanup_task(self):
-        """Start background cleanup task"""
-        if self._cleanup_task and not self._cleanup_task.done():
-            self._cleanup_task.cancel()
-
-        self._cleanup_task = asyncio.create_task(self._cleanup_old_entries())
+# Action history older than this is dropped; no caller looks further back
+MAX_ACTION_AGE = 3600
+# Hard cap on timestamps kept per user/guild and action type
+MAX_ACTIONS_PER_KEY = 1000
+# Users/guilds tracked at once; the least recently active are evicted beyond this
+MAX_TRACKED_USERS = 100000
+MAX_TRACKED_GUILDS = 10000
+# Unresolved detections kept for resolve_threat
+MAX_ACTIVE_DETECTIONS = 10000
 
-    async def _cleanup_old_entries(self):
-        """Clean up old rate limit entries"""
-        while True:
-            try:
-                await asyncio.sleep(300)  # Clean up every 5 minutes
-                cutoff_time = time.time() - 3600  # Keep last hour
+class ActionHistory:
+    """Recent actions of one user or guild"""
 
-                for user_data in self._user_actions.values():
-                    for action_list in user_data.values():
-                        # Remove old entries
-                        while action_list and action_list[0] < cutoff_time:
-                            action_list.pop(0)
+    __slots__ = ('actions', 'last_seen')
 
-                for guild_data in self._guild_actions.values():
-                    for action_list in guild_data.values():
-                        while action_list and action_list[0] < cutoff_time:
-                            action_list.pop(0)
+    def __init__(self):
+        self.actions: Dict[str, Deque[float]] = {}
+        self.last_seen = 0.0
 
-            except asyncio.CancelledError:
+class RateLimiter:
+    """Advanced rate limiting with multiple windows.
+
+    Timestamps for each (user or guild, action type) live in a bounded deque
+    kept in ascending order and trimmed at the head whenever it is touched, so
+    recording is O(1) amortized and window counts are a bisect.
+
+    Users and guilds are kept in least-recently-active order: keys idle for
+    longer than ``max_age`` are evicted as new actions come in, and the least
+    recently active key is evicted when a cap is reached.
+    """
+
+    def __init__(self, max_age: int = MAX_ACTION_AGE, max_actions_per_key: int = MAX_ACTIONS_PER_KEY,
+                 max_users: int = MAX_TRACKED_USERS, max_guilds: int = MAX_TRACKED_GUILDS):
+        self.max_age = max_age
+        self.max_actions_per_key = max_actions_per_key
+        self.max_users = max_users
+        self.max_guilds = max_guilds
+        self._user_actions: "OrderedDict[int, ActionHistory]" = OrderedDict()
+        self._guild_actions: "OrderedDict[int, ActionHistory]" = OrderedDict()
+        self.idle_evictions = 0
+        self.capacity_evictions = 0
+
+    def _touch(self, histories: "OrderedDict[int, ActionHistory]", key: int,
+               max_keys: int, now: float) -> ActionHistory:
+        """Get the history for a key as the most recently active, evicting idle and excess keys"""
+        history = histories.get(key)
+        if history is None:
+            history = histories[key] = ActionHistory()
+        else:
+            histories.move_to_end(key)
+        history.last_seen = now
+
+        # The front of the LRU order is the longest idle key
+        cutoff = now - self.max_age
+        while histories:
+            oldest = next(iter(histories.values()))
+            if oldest.last_seen >= cutoff:
                 break
-            except Exception as e:
-                logger.error(f"Error in rate limiter cleanup: {e}")
+            histories.popitem(last=False)
+            self.idle_evictions += 1
+
+        while len(histories) > max_keys:
+            histories.popitem(last=False)
+            self.capacity_evictions += 1
+
+        return history
+
+    def _trim(self, timestamps: Deque[float], now: float) -> int:
+        """Drop timestamps older than max_age, returns how many are left"""
+        cutoff = now - self.max_age
+        while timestamps and timestamps[0] < cutoff:
+            timestamps.popleft()
+        return len(timestamps)
+
+    def _count_since(self, history: Optional[ActionHistory], action_type: str,
+                     now: float, since: float) -> int:
+        """Count actions of a type at or after ``since``"""
+        timestamps = history.actions.get(action_type) if history else None
+        if not timestamps or not self._trim(timestamps, now):
+            return 0
+        if timestamps[0] >= since:
+            return len(timestamps)
+        return len(timestamps) - bisect_left(timestamps, since)
+
+    def _append(self, actions: Dict[str, Deque[float]], action_type: str, now: float):
+        """Append a timestamp, trimming expired ones first"""
+        timestamps = actions.get(action_type)
+        if timestamps is None:
+            timestamps = actions[action_type] = deque(maxlen=self.max_actions_per_key)
+        else:
+            self._trim(timestamps, now)
+        timestamps.append(now)
 
     def record_action(self, user_id: int, guild_id: Optional[int], action_type: str):
         """Record a user action for rate limiting"""
         current_time = time.time()
 
         # Record user action
-        self._user_actions[user_id][action_type].append(current_time)
+        history = self._touch(self._user_actions, user_id, self.max_users, current_time)
+        self._append(history.actions, action_type, current_time)
 
         # Record guild action if guild provided
         if guild_id:
-            self._guild_actions[guild_id][action_type].append(current_time)
+            history = self._touch(self._guild_actions, guild_id, self.max_guilds, current_time)
+            self._append(history.actions, action_type, current_time)
 
     def is_rate_limited(self, user_id: int, guild_id: Optional[int],
                        action_type: str, threshold: int, window: int) -> Tuple[bool, int]:
@@ -187,14 +391,13 @@ class RateLimiter:
         window_start = current_time - window
 
         # Check user rate limit
-        user_actions = self._user_actions[user_id][action_type]
-        user_count = sum(1 for t in user_actions if t >= window_start)
+        user_count = self._count_since(self._user_actions.get(user_id), action_type, current_time, window_start)
 
         # Check guild rate limit
         guild_count = 0
         if guild_id:
-            guild_actions = self._guild_actions[guild_id][action_type]
-            guild_count = sum(1 for t in guild_actions if t >= window_start)
+            guild_count = self._count_since(self._guild_actions.get(guild_id), action_type,
+                                            current_time, window_start)
 
         # Consider both user and guild limits
         total_count = user_count + (guild_count * 0.5)  # Guild actions count less
@@ -207,22 +410,684 @@ class RateLimiter:
         window_start = current_time - time_window
 
         stats = {}
-        for action_type, timestamps in self._user_actions[user_id].items():
-            count = sum(1 for t in timestamps if t >= window_start)
+        history = self._user_actions.get(user_id)
+        for action_type in list(history.actions if history else ()):
+            count = self._count_since(history, action_type, current_time, window_start)
             if count > 0:
                 stats[action_type] = count
 
         return stats
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory usage and eviction statistics"""
+        return {
+            'tracked_users': len(self._user_actions),
+            'tracked_guilds': len(self._guild_actions),
+            'max_users': self.max_users,
+            'max_guilds': self.max_guilds,
+            'idle_evictions': self.idle_evictions,
+            'capacity_evictions': self.capacity_evictions
+        }
+
+class FingerprintEntry:
+    """A recent message fingerprint in a guild's window"""
+
+    __slots__ = ('sketch', 'user_id', 'channel_id', 'timestamp')
+
+    def __init__(self, sketch: FrozenSet[int], user_id: int, channel_id: Optional[int], timestamp: float):
+        self.sketch = sketch
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.timestamp = timestamp
+
+class GuildFingerprintIndex:
+    """Sliding window of fingerprints for one guild, indexed by sketch value"""
+
+    __slots__ = ('entries', 'buckets')
+
+    def __init__(self):
+        self.entries: Deque[FingerprintEntry] = deque()
+        self.buckets: Dict[int, Deque[FingerprintEntry]] = {}
+
+    def add(self, entry: FingerprintEntry):
+        self.entries.append(entry)
+        for value in entry.sketch:
+            bucket = self.buckets.get(value)
+            if bucket is None:
+                bucket = self.buckets[value] = deque()
+            bucket.append(entry)
+
+    def pop_oldest(self):
+        """Drop the oldest entry; it is also at the head of each of its buckets"""
+        entry = self.entries.popleft()
+        for value in entry.sketch:
+            bucket = self.buckets[value]
+            bucket.popleft()
+            if not bucket:
+                del self.buckets[value]
+
+class NearDuplicateDetector:
+    """Finds near-identical messages posted by different users in a guild.
+
+    Each message is normalized (case, punctuation, mentions and emoji removed)
+    and cut into character shingles; its fingerprint is a bottom-k MinHash
+    sketch, the ``sketch_size`` smallest shingle hashes. Two messages whose
+    sketches share at least ``min_shared`` values are near duplicates (high
+    Jaccard similarity). Sketch values index a per-guild sliding window, so a
+    lookup only visits messages that share a value, at most
+    ``max_candidates`` per value.
+    """
+
+    # Mentions are tried first at every position, so punctuation before them can't swallow the '<@'
+    _normalize_pattern = re.compile(r'(?:<(?:@[!&]?|#|a?:\w+:)\d+>|[\W_])+')
+
+    def __init__(self, window: float = 30.0, sketch_size: int = 16, min_shared: int = 11,
+                 shingle_size: int = 4, min_length: int = 20, max_length: int = 512,
+                 max_candidates: int = 32, max_entries_per_guild: int = 5000,
+                 max_guilds: int = MAX_TRACKED_GUILDS):
+        self.window = window
+        self.sketch_size = sketch_size
+        self.min_shared = min_shared
+        self.shingle_size = shingle_size
+        self.min_length = min_length
+        self.max_length = max_length
+        self.max_candidates = max_candidates
+        self.max_entries_per_guild = max_entries_per_guild
+        self.max_guilds = max_guilds
+        self._guilds: "OrderedDict[int, GuildFingerprintIndex]" = OrderedDict()
+        self.fingerprinted = 0
+        self.clusters_found = 0
+
+    def fingerprint(self, content: str) -> Optional[FrozenSet[int]]:
+        """Get the MinHash sketch of a message, or None if it is too short to compare"""
+        text = self._normalize_pattern.sub('', content.lower())[:self.max_length]
+        if len(text) < self.min_length:
+            return None
+
+        size = self.shingle_size
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+        return frozenset(heapq.nsmallest(self.sketch_size, map(hash, shingles)))
+
+    def observe(self, guild_id: int, user_id: int, channel_id: Optional[int], content: str,
+                window: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Add a message to its guild's window and return the near-duplicate cluster it joins.
+
+        Returns None when the message has no near duplicates from other users.
+        """
+        sketch = self.fingerprint(content)
+        if sketch is None:
+            return None
+        self.fingerprinted += 1
+
+        now = time.monotonic()
+        index = self._get_index(guild_id)
+        cutoff = now - (window if window is not None else self.window)
+        while index.entries and index.entries[0].timestamp < cutoff:
+            index.pop_oldest()
+
+        # Vote for every recent entry sharing a sketch value
+        votes: Counter = Counter()
+        for value in sketch:
+            bucket = index.buckets.get(value)
+            if bucket:
+                votes.update(islice(reversed(bucket), self.max_candidates))
+
+        matches = [entry for entry, shared in votes.items() if shared >= self.min_shared]
+
+        index.add(FingerprintEntry(sketch, user_id, channel_id, now))
+        if len(index.entries) > self.max_entries_per_guild:
+            index.pop_oldest()
+
+        users = {entry.user_id for entry in matches}
+        users.add(user_id)
+        if len(users) < 2:
+            return None
+
+        self.clusters_found += 1
+        channels = {entry.channel_id for entry in matches}
+        channels.add(channel_id)
+        return {
+            'users': len(users),
+            'channels': len(channels),
+            'messages': len(matches) + 1,
+            'first_seen_seconds_ago': now - min(entry.timestamp for entry in matches)
+        }
+
+    def _get_index(self, guild_id: int) -> GuildFingerprintIndex:
+        """Get a guild's window as most recently used, evicting the least recently used beyond max_guilds"""
+        index = self._guilds.get(guild_id)
+        if index is None:
+            index = self._guilds[guild_id] = GuildFingerprintIndex()
+            while len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+        else:
+            self._guilds.move_to_end(guild_id)
+        return index
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size statistics"""
+        return {
+            'tracked_guilds': len(self._guilds),
+            'indexed_messages': sum(len(index.entries) for index in self._guilds.values()),
+            'fingerprinted': self.fingerprinted,
+            'clusters_found': self.clusters_found
+        }
+
+# Account-age histogram bucket upper bounds, in days (the last bucket is everything older)
+JOIN_AGE_BUCKETS = (1, 7, 30, 365)
+# Accounts younger than this many days count as young
+YOUNG_ACCOUNT_DAYS = 7
+# Share of young accounts among recent joins that marks a burst as a raid
+RAID_YOUNG_RATIO = 0.5
+# A burst this many times the join threshold is a raid regardless of account ages
+RAID_VOLUME_MULTIPLIER = 3
+
+class GuildJoinWindow:
+    """Per-second join counters and account-age histograms over a rolling window.
+
+    ``slots`` is a ring of one-second rows ``[joins, age_bucket_0, ...]`` and
+    ``totals`` their running sum, so adding a join and reading the window are
+    O(1) and expired seconds are subtracted as the ring advances.
+    """
+
+    __slots__ = ('window', 'slots', 'totals', 'last_second', 'raid_until')
+
+    def __init__(self, window: int):
+        self.window = window
+        self.slots = [[0] * (len(JOIN_AGE_BUCKETS) + 2) for _ in range(window)]
+        self.totals = [0] * (len(JOIN_AGE_BUCKETS) + 2)
+        self.last_second = 0
+        self.raid_until = 0.0
+
+    def advance(self, second: int):
+        """Move the window to end at ``second``, clearing the seconds that fell out"""
+        elapsed = second - self.last_second
+        if elapsed <= 0:
+            return
+        if elapsed >= self.window:
+            for row in self.slots:
+                row[:] = [0] * len(row)
+            self.totals = [0] * len(self.totals)
+        else:
+            totals = self.totals
+            for tick in range(self.last_second + 1, second + 1):
+                row = self.slots[tick % self.window]
+                for i, count in enumerate(row):
+                    if count:
+                        totals[i] -= count
+                        row[i] = 0
+        self.last_second = second
+
+    def add(self, second: int, age_bucket: int):
+        row = self.slots[second % self.window]
+        row[0] += 1
+        row[age_bucket + 1] += 1
+        self.totals[0] += 1
+        self.totals[age_bucket + 1] += 1
+
+class JoinRaidDetector:
+    """Tracks member joins per guild and spots bursts of new, young accounts"""
+
+    def __init__(self, max_guilds: int = MAX_TRACKED_GUILDS):
+        self.max_guilds = max_guilds
+        self._guilds: "OrderedDict[int, GuildJoinWindow]" = OrderedDict()
+        self._young_buckets = bisect_left(JOIN_AGE_BUCKETS, YOUNG_ACCOUNT_DAYS) + 1
+        self.joins_seen = 0
+        self.raids_detected = 0
+
+    def record_join(self, guild_id: int, account_age_days: float, window: int) -> Dict[str, Any]:
+        """Count a join and return the guild's join statistics over the last ``window`` seconds"""
+        self.joins_seen += 1
+        now = time.monotonic()
+        second = int(now)
+
+        guild_window = self._guilds.get(guild_id)
+        if guild_window is None or guild_window.window != window:
+            guild_window = self._guilds[guild_id] = GuildJoinWindow(window)
+            guild_window.last_second = second
+            while len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+        else:
+            self._guilds.move_to_end(guild_id)
+
+        guild_window.advance(second)
+        guild_window.add(second, bisect_right(JOIN_AGE_BUCKETS, account_age_days))
+
+        totals = guild_window.totals
+        return {
+            'joins': totals[0],
+            'young_accounts': sum(totals[1:self._young_buckets + 1]),
+            'age_histogram': dict(zip(
+                [f"<{days}d" for days in JOIN_AGE_BUCKETS] + [f">={JOIN_AGE_BUCKETS[-1]}d"], totals[1:]
+            )),
+            'window': window,
+            'under_raid': guild_window.raid_until > now
+        }
+
+    def start_raid(self, guild_id: int, duration: float):
+        """Mark a guild as under raid for ``duration`` seconds"""
+        guild_window = self._guilds.get(guild_id)
+        if guild_window is not None:
+            guild_window.raid_until = time.monotonic() + duration
+            self.raids_detected += 1
+
+    def is_under_raid(self, guild_id: int) -> bool:
+        """Check whether a guild is inside a detected raid"""
+        guild_window = self._guilds.get(guild_id)
+        return guild_window is not None and guild_window.raid_until > time.monotonic()
+
+    def end_raid(self, guild_id: int):
+        """Clear a guild's raid state"""
+        guild_window = self._guilds.get(guild_id)
+        if guild_window is not None:
+            guild_window.raid_until = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get join tracking statistics"""
+        return {
+            'tracked_guilds': len(self._guilds),
+            'guilds_under_raid': sum(1 for guild_id in self._guilds if self.is_under_raid(guild_id)),
+            'joins_seen': self.joins_seen,
+            'raids_detected': self.raids_detected
+        }
+
+# Cached user contexts and guild moderation history expire after this many seconds
+USER_CONTEXT_TTL = 600
+# Members who joined the guild less than this many days ago are new users
+NEW_MEMBER_DAYS = 7
+
+class UserContextProvider:
+    """Keeps per-member analysis context in memory so the message path only does a dict lookup.
+
+    Member facts (account age, avatar, join date) come from ``member_lookup``,
+    normally backed by the discord.py member cache, and are refreshed by member
+    update events. Warning and jail counts are loaded once per guild from the
+    database and kept current by record_warning/record_jail.
+    """
+
+    def __init__(self, ttl: float = USER_CONTEXT_TTL, max_entries: int = MAX_TRACKED_USERS,
+                 max_guilds: int = MAX_TRACKED_GUILDS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_guilds = max_guilds
+        # (guild_id, user_id) -> member facts, or None when unknown
+        self.member_lookup: Optional[Callable[[int, int], Optional[Dict[str, Any]]]] = None
+        # Ordered by insertion time, so the front always expires first
+        self._contexts: "OrderedDict[Tuple[int, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._history: "OrderedDict[int, Tuple[float, Dict[int, Dict[str, int]]]]" = OrderedDict()
+        self._history_loads: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.history_loads = 0
+
+    @staticmethod
+    def default_context() -> Dict[str, Any]:
+        """Context used for members we know nothing about"""
+        return {
+            'is_new_user': False,
+            'account_age_days': 365,
+            'has_avatar': True,
+            'guild_join_date': None,
+            'previous_warnings': 0,
+            'previous_jails': 0
+        }
+
+    async def get_context(self, user_id: int, guild_id: int) -> Dict[str, Any]:
+        """Get a member's context, building it on a miss"""
+        now = time.monotonic()
+        entry = self._contexts.get((guild_id, user_id))
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        history = await self._get_history(guild_id)
+        member = self.member_lookup(guild_id, user_id) if self.member_lookup else None
+        context = self._build_context(member, history.get(user_id))
+        self._store(guild_id, user_id, context, now)
+        return context
+
+    def update_member(self, guild_id: int, user_id: int, member: Dict[str, Any]):
+        """Refresh a member's context from a member event"""
+        history = self._fresh_history(guild_id)
+        if history is None:
+            # Rebuilt with the moderation history on the next message
+            self._contexts.pop((guild_id, user_id), None)
+            return
+        self._store(guild_id, user_id, self._build_context(member, history.get(user_id)), time.monotonic())
+
+    def remove_member(self, guild_id: int, user_id: int):
+        """Forget a member that left the guild"""
+        self._contexts.pop((guild_id, user_id), None)
+
+    def record_warning(self, guild_id: int, user_id: int):
+        """Count a new warning without reloading the guild history"""
+        self._record(guild_id, user_id, 'warnings', 'previous_warnings')
+
+    def record_jail(self, guild_id: int, user_id: int):
+        """Count a new jail without reloading the guild history"""
+        self._record(guild_id, user_id, 'jails', 'previous_jails')
+
+    def _record(self, guild_id: int, user_id: int, history_key: str, context_key: str):
+        history = self._fresh_history(guild_id)
+        if history is not None:
+            counts = history.setdefault(user_id, {'warnings': 0, 'jails': 0})
+            counts[history_key] += 1
+
+        entry = self._contexts.get((guild_id, user_id))
+        if entry is not None:
+            context = dict(entry[1])
+            context[context_key] += 1
+            self._contexts[(guild_id, user_id)] = (entry[0], context)
+
+    def _build_context(self, member: Optional[Dict[str, Any]],
+                       counts: Optional[Dict[str, int]]) -> Dict[str, Any]:
+        context = self.default_context()
+        if member:
+            now = datetime.now(timezone.utc)
+            created_at = member.get('account_created_at')
+            if created_at is not None:
+                context['account_age_days'] = (now - created_at).total_seconds() / 86400
+            joined_at = member.get('joined_at')
+            if joined_at is not None:
+                context['guild_join_date'] = joined_at
+                context['is_new_user'] = now - joined_at < timedelta(days=NEW_MEMBER_DAYS)
+            context['has_avatar'] = member.get('has_avatar', True)
+        if counts:
+            context['previous_warnings'] = counts['warnings']
+            context['previous_jails'] = counts['jails']
+        return context
+
+    def _store(self, guild_id: int, user_id: int, context: Dict[str, Any], now: float):
+        key = (guild_id, user_id)
+        self._contexts[key] = (now + self.ttl, context)
+        self._contexts.move_to_end(key)
+
+        while self._contexts:
+            expires_at = next(iter(self._contexts.values()))[0]
+            if expires_at > now and len(self._contexts) <= self.max_entries:
+                break
+            self._contexts.popitem(last=False)
+
+    def _fresh_history(self, guild_id: int) -> Optional[Dict[int, Dict[str, int]]]:
+        entry = self._history.get(guild_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    async def _get_history(self, guild_id: int) -> Dict[int, Dict[str, int]]:
+        """Get a guild's moderation history, loading it at most once per ttl"""
+        history = self._fresh_history(guild_id)
+        if history is not None:
+            return history
+
+        # Concurrent misses for the same guild share one load
+        pending = self._history_loads.get(guild_id)
+        if pending is None:
+            pending = self._history_loads[guild_id] = asyncio.ensure_future(self._load_history(guild_id))
+            pending.add_done_callback(lambda _: self._history_loads.pop(guild_id, None))
+        return await asyncio.shield(pending)
+
+    async def _load_history(self, guild_id: int) -> Dict[int, Dict[str, int]]:
+        self.history_loads += 1
+        try:
+            history = await db_manager.get_moderation_history(guild_id)
+        except Exception as e:
+            # Cache the empty history too, so a database outage doesn't cost a query per message
+            logger.error(f"Error loading moderation history for guild {guild_id}: {e}")
+            history = {}
+
+        self._history[guild_id] = (time.monotonic() + self.ttl, history)
+        self._history.move_to_end(guild_id)
+        while len(self._history) > self.max_guilds:
+            self._history.popitem(last=False)
+        return history
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'cached_contexts': len(self._contexts),
+            'cached_guilds': len(self._history),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'history_loads': self.history_loads
+        }
+
+# Threat summaries can look back this many seconds; counts are kept in one-minute buckets
+THREAT_SUMMARY_HORIZON = 86400
+# Offenders listed in a threat summary
+TOP_OFFENDERS = 5
+
+class ThreatBucket:
+    """Detection counts for one guild and minute"""
+
+    __slots__ = ('minute', 'total', 'by_type', 'by_level', 'by_user')
+
+    def __init__(self, minute: int):
+        self.minute = minute
+        self.total = 0
+        self.by_type: Counter = Counter()
+        self.by_level: Counter = Counter()
+        self.by_user: Counter = Counter()
+
+class ThreatAggregates:
+    """Rolling per-guild detection counts, updated as events are recorded"""
+
+    def __init__(self, horizon: int = THREAT_SUMMARY_HORIZON, max_guilds: int = MAX_TRACKED_GUILDS):
+        self.horizon_minutes = horizon // 60
+        self.max_guilds = max_guilds
+        self._guilds: "OrderedDict[int, Deque[ThreatBucket]]" = OrderedDict()
+
+    def record(self, event: DetectionEvent):
+        """Count an event in its guild's current minute"""
+        minute = int(time.time() // 60)
+        buckets = self._guilds.get(event.guild_id)
+        if buckets is None:
+            buckets = self._guilds[event.guild_id] = deque()
+            while len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+        else:
+            self._guilds.move_to_end(event.guild_id)
+
+        if not buckets or buckets[-1].minute != minute:
+            buckets.append(ThreatBucket(minute))
+        while buckets[0].minute <= minute - self.horizon_minutes:
+            buckets.popleft()
+
+        bucket = buckets[-1]
+        bucket.total += 1
+        bucket.by_type[event.detection_type.value] += 1
+        bucket.by_level[event.threat_level.value] += 1
+        bucket.by_user[event.user_id] += 1
+
+    def summarize(self, guild_id: int, time_window: int) -> Dict[str, Any]:
+        """Sum the buckets of the last ``time_window`` seconds (at one-minute granularity)"""
+        total = 0
+        by_type: Counter = Counter()
+        by_level: Counter = Counter()
+        by_user: Counter = Counter()
+
+        cutoff = int(time.time() // 60) - (time_window + 59) // 60
+        for bucket in reversed(self._guilds.get(guild_id, ())):
+            if bucket.minute <= cutoff:
+                break
+            total += bucket.total
+            by_type.update(bucket.by_type)
+            by_level.update(bucket.by_level)
+            by_user.update(bucket.by_user)
+
+        return {
+            'total_detections': total,
+            'threats_by_type': dict(by_type),
+            'threats_by_level': dict(by_level),
+            'top_users': [{'user_id': user_id, 'count': count}
+                          for user_id, count in by_user.most_common(TOP_OFFENDERS)]
+        }
+
+# Detection events waiting to be written are capped; the oldest are dropped beyond this
+MAX_PENDING_EVENTS = 10000
+
+class DetectionEventWriter:
+    """Buffers detection events and resolutions and writes them to the database in batches"""
+
+    def __init__(self, flush_interval: float = 5.0, max_pending: int = MAX_PENDING_EVENTS):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._resolutions: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def add(self, event: DetectionEvent):
+        """Queue an event for the next flush"""
+        self._events.append({
+            'event_id': event.event_id,
+            'guild_id': event.guild_id,
+            'user_id': event.user_id,
+            'detection_type': event.detection_type.value,
+            'threat_level': event.threat_level.value,
+            'confidence': event.confidence,
+            'rule_name': event.details.get('rule_name'),
+            'details': json.dumps(event.details, default=str),
+            'timestamp': event.timestamp,
+            'resolved': False
+        })
+        self._trim()
+
+    def add_resolution(self, event_id: str, resolution: str, moderator_id: int):
+        """Queue a resolution; applied after the pending events are written"""
+        self._resolutions.append({
+            'event_id': event_id,
+            'resolution': resolution,
+            'resolved_by': moderator_id,
+            'resolved_at': datetime.utcnow()
+        })
+
+    def _trim(self):
+        while len(self._events) > self.max_pending:
+            self._events.popleft()
+            self.dropped += 1
+
+    async def flush(self) -> int:
+        """Write pending events and resolutions, returns the number of events written"""
+        async with self._flush_lock:
+            events, self._events = list(self._events), deque()
+            resolutions, self._resolutions = self._resolutions, []
+
+            try:
+                written = await db_manager.add_detection_events(events)
+                self.written += written
+            except Exception as e:
+                # Keep them for the next flush; resolutions wait for their events
+                self.failed_flushes += 1
+                logger.error(f"Failed to write detection events: {e}")
+                self._events.extendleft(reversed(events))
+                self._trim()
+                self._resolutions[:0] = resolutions
+                return 0
+
+            try:
+                await db_manager.resolve_detection_events(resolutions)
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"Failed to write detection resolutions: {e}")
+                self._resolutions[:0] = resolutions
+
+            return written
+
+    def start(self):
+        """Start periodic writes"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop periodic writes and write what is left"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        """Write pending events periodically"""
+        while True:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in detection event flush task: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get writer statistics"""
+        return {
+            'pending_events': len(self._events),
+            'pending_resolutions': len(self._resolutions),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed_flushes': self.failed_flushes
+        }
+
+# Rule fields a guild can override
+OVERRIDABLE_RULE_FIELDS = ('enabled', 'threshold', 'time_window', 'cooldown_period', 'action', 'severity')
+# Rules without patterns that are still gated on something other than the suspicious score
+NON_PATTERN_GATES = frozenset({DetectionType.RATE_LIMIT_VIOLATION, DetectionType.DUPLICATE_CONTENT,
+                               DetectionType.BOT_DETECTION})
+# (guild, user, rule) cooldowns kept at once; the least recently triggered are dropped beyond this
+MAX_RULE_COOLDOWNS = MAX_TRACKED_USERS
+# Compiled rule plans kept at once; the least recently compiled are dropped beyond this
+MAX_RULE_PLANS = MAX_TRACKED_GUILDS
+# Seconds to keep serving the last plan after overrides failed to load
+RULE_PLAN_RETRY_SECONDS = 30
+
+@dataclass(frozen=True)
+class RulePlan:
+    """A guild's effective detection rules, compiled once per configuration change"""
+    rules: Tuple[DetectionRule, ...]  # every rule with the guild's overrides applied
+    message_rules: Tuple[DetectionRule, ...]  # enabled rules evaluated on each message
+    scan_categories: Optional[FrozenSet[str]]  # pattern categories scanned up front, None for all
+    duplicate_rule: Optional[DetectionRule]
+    raid_rule: Optional[DetectionRule]
+    rate_rule: Optional[DetectionRule]
+
 class ThreatDetector:
     """Main threat detection engine"""
 
     def __init__(self):
         self.pattern_matcher = PatternMatcher()
         self.rate_limiter = RateLimiter()
+        self.duplicate_detector = NearDuplicateDetector()
+        self.join_raid_detector = JoinRaidDetector()
+        self.user_context = UserContextProvider()
         self.detection_rules: Dict[str, DetectionRule] = {}
-        self.active_detections: Dict[str, DetectionEvent] = {}
+        # Oldest first; capped so unresolved detections can't pile up forever
+        self.active_detections: "OrderedDict[str, DetectionEvent]" = OrderedDict()
+        self.max_active_detections = MAX_ACTIVE_DETECTIONS
+        self.dropped_detections = 0
+        self._active_by_guild: Counter = Counter()
+        self.aggregates = ThreatAggregates()
+        self.event_writer = DetectionEventWriter()
+        # guild_id -> (overrides list it was compiled from, override values, plan)
+        self._rule_plans: Dict[int, Tuple[Any, Tuple, RulePlan]] = {}
+        self._rule_plan_retry_at: Dict[int, float] = {}  # guild_id -> when to query overrides again
+        self.plan_compilations = 0
+        # (guild_id, user_id, rule name) -> when the rule may fire again for that user
+        self._rule_cooldowns: "OrderedDict[Tuple[int, int, str], float]" = OrderedDict()
+        self.max_rule_cooldowns = MAX_RULE_COOLDOWNS
+        self.suppressed_detections = 0
         self._initialize_rules()
+        self._default_plan = self._compile_plan(())
 
     def _initialize_rules(self):
         """Initialize detection rules"""
@@ -241,12 +1106,12 @@ class ThreatDetector:
             DetectionRule(
                 name="raid_detection",
                 detection_type=DetectionType.RAID,
-                threshold=10,
+                threshold=10,  # joins within the window
                 time_window=30,
                 cooldown_period=600,
-                action="jail",
+                action="lockdown",
                 severity=ThreatLevel.HIGH,
-                description="Detects potential raid attempts with high message volume"
+                description="Detects raids from bursts of member joins by new accounts"
             ),
             DetectionRule(
                 name="malicious_links",
@@ -281,6 +1146,16 @@ class ThreatDetector:
                 patterns=["discord_invites"],
                 description="Detects excessive Discord invite sharing"
             ),
+            DetectionRule(
+                name="duplicate_content",
+                detection_type=DetectionType.DUPLICATE_CONTENT,
+                threshold=3,  # distinct users posting the same message
+                time_window=30,
+                cooldown_period=600,
+                action="warn",
+                severity=ThreatLevel.HIGH,
+                description="Detects near-identical messages posted by several users within seconds"
+            ),
             DetectionRule(
                 name="bot_detection",
                 detection_type=DetectionType.BOT_DETECTION,
@@ -305,8 +1180,16 @@ class ThreatDetector:
 
         self.detection_rules = {rule.name: rule for rule in rules}
 
-    async def analyze_message(self, message_data: Dict[str, Any]) -> List[DetectionEvent]:
-        """Analyze a message for threats"""
+    async def analyze_message(self, message_data: Dict[str, Any],
+                              pattern_matches: Optional[Dict[str, List[str]]] = None,
+                              record_action: bool = True,
+                              scanned_categories: Optional[FrozenSet[str]] = None) -> List[DetectionEvent]:
+        """Analyze a message for threats.
+
+        ``pattern_matches`` may be passed when the message was already scanned;
+        ``scanned_categories`` then says which categories that scan covered
+        (None for all of them).
+        """
         events = []
 
         try:
@@ -315,23 +1198,48 @@ class ThreatDetector:
             content = message_data.get('content', '')
             channel_id = message_data.get('channel_id')
 
-            # Get user context
-            user_context = await self._get_user_context(user_id, guild_id)
-
-            # Pattern analysis
-            pattern_matches = self.pattern_matcher.match_patterns(content)
-            suspicious_score = self.pattern_matcher.calculate_suspicious_score(content, user_context)
+            plan = await self.get_rule_plan(guild_id)
 
             # Rate limiting analysis
-            self.rate_limiter.record_action(user_id, guild_id, 'message')
+            if record_action:
+                self.rate_limiter.record_action(user_id, guild_id, 'message')
+
+            if not plan.message_rules:
+                return events
+
+            # Pattern analysis, limited to what the guild's rules look at
+            if pattern_matches is None:
+                scanned_categories = plan.scan_categories
+                pattern_matches = self.pattern_matcher.match_patterns(content, scanned_categories)
+
+            # Near-duplicate analysis across users and channels
+            duplicate_cluster = None
+            if plan.duplicate_rule:
+                duplicate_cluster = self.duplicate_detector.observe(
+                    guild_id, user_id, channel_id, content, window=plan.duplicate_rule.time_window
+                )
+
+            candidates = [rule for rule in plan.message_rules
+                          if self._passes_gate(rule, message_data, pattern_matches, duplicate_cluster)
+                          and not self._on_cooldown(guild_id, user_id, rule)]
+            if not candidates:
+                return events
+
+            # The suspicious score weighs every category, so finish the scan once a rule is in play
+            if scanned_categories is not None:
+                remaining = self.pattern_matcher.categories - scanned_categories
+                if remaining:
+                    pattern_matches = {**pattern_matches, **self.pattern_matcher.match_patterns(content, remaining)}
 
-            # Check each detection rule
-            for rule_name, rule in self.detection_rules.items():
-                if not rule.enabled:
-                    continue
+            user_context = await self._get_user_context(user_id, guild_id)
+            suspicious_score = self.pattern_matcher.calculate_suspicious_score(content, user_context, pattern_matches)
 
-                event = await self._check_rule(rule, message_data, pattern_matches, suspicious_score, user_context)
+            for rule in candidates:
+                event = self._check_rule(rule, message_data, pattern_matches, suspicious_score,
+                                         user_context, duplicate_cluster)
                 if event:
+                    self._start_cooldown(guild_id, user_id, rule)
+                    self._record_event(event)
                     events.append(event)
 
             # Log analysis results
@@ -347,25 +1255,111 @@ class ThreatDetector:
 
         return events
 
-    async def _check_rule(self, rule: DetectionRule, message_data: Dict[str, Any],
-                         pattern_matches: Dict[str, List[str]], suspicious_score: float,
-                         user_context: Dict[str, Any]) -> Optional[DetectionEvent]:
-        """Check if a rule matches the message"""
+    async def analyze_join(self, member_data: Dict[str, Any]) -> Optional[DetectionEvent]:
+        """Record a member join and return a raid event when it completes a burst"""
+        try:
+            guild_id = member_data['guild_id']
+            rule = (await self.get_rule_plan(guild_id)).raid_rule
+            if not rule:
+                return None
 
-        # Check pattern-based rules
-        if rule.patterns:
-            matched_patterns = [p for p in rule.patterns if p in pattern_matches]
-            if not matched_patterns:
+            created_at = member_data['account_created_at']
+            account_age_days = (datetime.now(created_at.tzinfo) - created_at).total_seconds() / 86400
+
+            stats = self.join_raid_detector.record_join(guild_id, account_age_days, rule.time_window)
+            if stats['under_raid'] or stats['joins'] < rule.threshold:
+                return None
+
+            young_ratio = stats['young_accounts'] / stats['joins']
+            volume = stats['joins'] / (rule.threshold * RAID_VOLUME_MULTIPLIER)
+            if young_ratio < RAID_YOUNG_RATIO and volume < 1:
                 return None
 
+            self.join_raid_detector.start_raid(guild_id, rule.cooldown_period)
+
+            event = DetectionEvent(
+                guild_id=guild_id,
+                user_id=member_data['user_id'],
+                detection_type=rule.detection_type,
+                threat_level=rule.severity,
+                confidence=min(0.4 + young_ratio * 0.4 + min(volume, 1.0) * 0.2, 1.0),
+                details={
+                    'rule_name': rule.name,
+                    'action': rule.action,
+                    'join_stats': stats,
+                    'lockdown_seconds': rule.cooldown_period
+                }
+            )
+
+            self._record_event(event)
+            logger.warning("Join raid detected",
+                         guild_id=guild_id,
+                         joins=stats['joins'],
+                         young_accounts=stats['young_accounts'],
+                         window=rule.time_window)
+            return event
+
+        except Exception as e:
+            logger.error(f"Error analyzing member join: {e}")
+            return None
+
+    def is_under_raid(self, guild_id: int) -> bool:
+        """Check whether a guild is inside a detected join raid"""
+        return self.join_raid_detector.is_under_raid(guild_id)
+
+    def _passes_gate(self, rule: DetectionRule, message_data: Dict[str, Any],
+                     pattern_matches: Dict[str, List[str]],
+                     duplicate_cluster: Optional[Dict[str, Any]]) -> bool:
+        """Check a rule's precondition, before any confidence scoring"""
+
+        # Check pattern-based rules
+        if rule.patterns and not any(p in pattern_matches for p in rule.patterns):
+            return False
+
         # Check rate limiting rules
         if rule.detection_type == DetectionType.RATE_LIMIT_VIOLATION:
             is_limited, count = self.rate_limiter.is_rate_limited(
                 message_data['user_id'], message_data['guild_id'],
                 'message', rule.threshold, rule.time_window
             )
-            if not is_limited:
-                return None
+            return is_limited
+
+        # Check near-duplicate rules
+        if rule.detection_type == DetectionType.DUPLICATE_CONTENT:
+            return bool(duplicate_cluster) and duplicate_cluster['users'] >= rule.threshold
+
+        # Check bot behavior rules: sustained messaging from a single user
+        if rule.detection_type == DetectionType.BOT_DETECTION:
+            stats = self.rate_limiter.get_user_stats(message_data['user_id'], rule.time_window)
+            return stats.get('message', 0) >= rule.threshold
+
+        return True
+
+    def _on_cooldown(self, guild_id: int, user_id: int, rule: DetectionRule) -> bool:
+        """Check whether a rule already fired for a user within its cooldown period"""
+        key = (guild_id, user_id, rule.name)
+        until = self._rule_cooldowns.get(key)
+        if until is None:
+            return False
+        if until > time.monotonic():
+            self.suppressed_detections += 1
+            return True
+        del self._rule_cooldowns[key]
+        return False
+
+    def _start_cooldown(self, guild_id: int, user_id: int, rule: DetectionRule):
+        """Silence a rule for a user until its cooldown period is over"""
+        key = (guild_id, user_id, rule.name)
+        self._rule_cooldowns[key] = time.monotonic() + rule.cooldown_period
+        self._rule_cooldowns.move_to_end(key)
+        while len(self._rule_cooldowns) > self.max_rule_cooldowns:
+            self._rule_cooldowns.popitem(last=False)
+
+    def _check_rule(self, rule: DetectionRule, message_data: Dict[str, Any],
+                    pattern_matches: Dict[str, List[str]], suspicious_score: float,
+                    user_context: Dict[str, Any],
+                    duplicate_cluster: Optional[Dict[str, Any]] = None) -> Optional[DetectionEvent]:
+        """Build the event for a rule whose gate passed, if confident enough"""
 
         # Calculate confidence based on various factors
         confidence = self._calculate_confidence(rule, pattern_matches, suspicious_score, user_context)
@@ -385,6 +1379,7 @@ class ThreatDetector:
                 'pattern_matches': pattern_matches,
                 'suspicious_score': suspicious_score,
                 'user_context': user_context,
+                'duplicate_cluster': duplicate_cluster,
                 'message_data': message_data
             }
         )
@@ -412,10 +1407,14 @@ class ThreatDetector:
             confidence += 0.1
         if not user_context.get('has_avatar', False):
             confidence += 0.1
+        if user_context.get('previous_warnings', 0) or user_context.get('previous_jails', 0):
+            confidence += 0.1
 
         # Rule-specific adjustments
         if rule.detection_type == DetectionType.MALICIOUS_LINKS:
             confidence += 0.2  # Higher confidence for malicious links
+        elif rule.detection_type == DetectionType.DUPLICATE_CONTENT:
+            confidence += 0.3  # Several accounts posting the same text is strong evidence on its own
         elif rule.detection_type == DetectionType.RAID:
             confidence -= 0.1  # Lower base confidence for raids (needs more evidence)
 
@@ -423,22 +1422,11 @@ class ThreatDetector:
 
     async def _get_user_context(self, user_id: int, guild_id: int) -> Dict[str, Any]:
         """Get user context for analysis"""
-        context = {
-            'is_new_user': False,
-            'account_age_days': 365,
-            'has_avatar': True,
-            'guild_join_date': None,
-            'previous_warnings': 0
-        }
-
         try:
-            # This would query the database for user information
-            # For now, return default context
-            pass
+            return await self.user_context.get_context(user_id, guild_id)
         except Exception as e:
             logger.error(f"Error getting user context: {e}")
-
-        return context
+            return self.user_context.default_context()
 
     async def analyze_user_behavior(self, user_id: int, guild_id: int,
                                   time_window: int = 3600) -> Dict[str, Any]:
@@ -472,27 +1460,39 @@ class ThreatDetector:
 
     async def get_threat_summary(self, guild_id: int, time_window: int = 3600) -> Dict[str, Any]:
         """Get threat summary for a guild"""
-        summary = {
-            'total_detections': 0,
-            'threats_by_type': {},
-            'threats_by_level': {},
-            'top_users': [],
-            'active_threats': 0
-        }
-
-        try:
-            # This would query the database for threat statistics
-            # For now, return empty summary
-            pass
-        except Exception as e:
-            logger.error(f"Error getting threat summary: {e}")
-
+        summary = self.aggregates.summarize(guild_id, time_window)
+        summary['active_threats'] = self._active_by_guild.get(guild_id, 0)
         return summary
 
+    def _record_event(self, event: DetectionEvent):
+        """Track, count and persist a new detection"""
+        self._track_detection(event.event_id, event)
+        self.aggregates.record(event)
+        self.event_writer.add(event)
+
+    def _track_detection(self, event_id: str, event: DetectionEvent):
+        """Remember an unresolved detection, dropping the oldest beyond the cap"""
+        self.active_detections[event_id] = event
+        self._active_by_guild[event.guild_id] += 1
+        while len(self.active_detections) > self.max_active_detections:
+            _, dropped = self.active_detections.popitem(last=False)
+            self._release_active(dropped.guild_id)
+            self.dropped_detections += 1
+
+    def _release_active(self, guild_id: int):
+        remaining = self._active_by_guild[guild_id] - 1
+        if remaining > 0:
+            self._active_by_guild[guild_id] = remaining
+        else:
+            del self._active_by_guild[guild_id]
+
     async def resolve_threat(self, event_id: str, resolution: str, moderator_id: int):
         """Resolve a threat detection"""
-        if event_id in self.active_detections:
-            event = self.active_detections[event_id]
+        self.event_writer.add_resolution(event_id, resolution, moderator_id)
+
+        event = self.active_detections.pop(event_id, None)
+        if event is not None:
+            self._release_active(event.guild_id)
             event.resolved = True
             event.resolution = resolution
 
@@ -501,14 +1501,112 @@ class ThreatDetector:
                        resolution=resolution,
                        moderator_id=moderator_id)
 
+    async def get_rule_plan(self, guild_id: int) -> RulePlan:
+        """Get a guild's rule plan, recompiling it only when the guild's overrides changed"""
+        retry_at = self._rule_plan_retry_at.get(guild_id)
+        if retry_at is not None:
+            if retry_at > time.monotonic():
+                return self.cached_rule_plan(guild_id)
+            del self._rule_plan_retry_at[guild_id]
+
+        try:
+            overrides = await db_manager.get_rule_overrides(guild_id)
+        except Exception as e:
+            # Keep the last plan for a while, so a database outage doesn't cost a query per message
+            logger.error(f"Error loading rule overrides for guild {guild_id}: {e}")
+            self._rule_plan_retry_at[guild_id] = time.monotonic() + RULE_PLAN_RETRY_SECONDS
+            return self.cached_rule_plan(guild_id)
+
+        entry = self._rule_plans.get(guild_id)
+        if entry is not None and entry[0] is overrides:
+            return entry[2]
+
+        # The config cache hands out a new list after a reload; only new values need a compile
+        values = tuple((o.rule_name,) + tuple(getattr(o, f) for f in OVERRIDABLE_RULE_FIELDS) for o in overrides)
+        if entry is not None and entry[1] == values:
+            plan = entry[2]
+        else:
+            plan = self._compile_plan(overrides) if overrides else self._default_plan
+
+        if guild_id not in self._rule_plans and len(self._rule_plans) >= MAX_RULE_PLANS:
+            self._rule_plans.pop(next(iter(self._rule_plans)))
+        self._rule_plans[guild_id] = (overrides, values, plan)
+        return plan
+
+    def cached_rule_plan(self, guild_id: int) -> RulePlan:
+        """Get a guild's last compiled rule plan without loading anything"""
+        entry = self._rule_plans.get(guild_id)
+        return entry[2] if entry is not None else self._default_plan
+
+    def _compile_plan(self, overrides) -> RulePlan:
+        """Apply overrides to the global rules and precompute what evaluating them needs"""
+        self.plan_compilations += 1
+        by_name = {override.rule_name: override for override in overrides}
+
+        rules = []
+        for name, rule in self.detection_rules.items():
+            changes = {}
+            override = by_name.get(name)
+            if override is not None:
+                changes = {f: getattr(override, f) for f in OVERRIDABLE_RULE_FIELDS
+                           if getattr(override, f) is not None}
+                if 'severity' in changes:
+                    try:
+                        changes['severity'] = ThreatLevel(changes['severity'])
+                    except ValueError:
+                        logger.warning(f"Ignoring invalid severity override for rule {name}: {changes['severity']}")
+                        del changes['severity']
+            rules.append(replace(rule, patterns=list(rule.patterns), **changes))
+
+        enabled = {rule.name: rule for rule in rules if rule.enabled}
+        message_rules = tuple(rule for rule in enabled.values() if rule.detection_type != DetectionType.RAID)
+
+        # A rule with neither patterns nor another gate is decided by the full suspicious score
+        if any(not rule.patterns and rule.detection_type not in NON_PATTERN_GATES for rule in message_rules):
+            scan_categories = None
+        else:
+            scan_categories = frozenset(p for rule in message_rules for p in rule.patterns) & self.pattern_matcher.categories
+
+        return RulePlan(
+            rules=tuple(rules),
+            message_rules=message_rules,
+            scan_categories=scan_categories,
+            duplicate_rule=enabled.get('duplicate_content'),
+            raid_rule=enabled.get('raid_detection'),
+            rate_rule=enabled.get('rate_limit_violation')
+        )
+
+    async def set_guild_rule(self, guild_id: int, rule_name: str, **kwargs):
+        """Override rule settings for one guild"""
+        if rule_name not in self.detection_rules:
+            raise ValueError(f"Unknown detection rule: {rule_name}")
+        unknown = set(kwargs) - set(OVERRIDABLE_RULE_FIELDS)
+        if unknown:
+            raise ValueError(f"Rule fields can't be overridden: {', '.join(sorted(unknown))}")
+        for key in ('threshold', 'time_window', 'cooldown_period'):
+            if kwargs.get(key) is not None and kwargs[key] <= 0:
+                raise ValueError(f"{key} must be positive")
+        if kwargs.get('severity') is not None:
+            kwargs['severity'] = ThreatLevel(kwargs['severity']).value
+
+        await db_manager.set_rule_override(guild_id, rule_name, **kwargs)
+        logger.info(f"Detection rule overridden: {rule_name}", guild_id=guild_id, **kwargs)
+
+    async def reset_guild_rules(self, guild_id: int, rule_name: Optional[str] = None) -> int:
+        """Drop a guild's overrides for one rule, or for every rule"""
+        return await db_manager.delete_rule_overrides(guild_id, rule_name)
+
     def update_rule(self, rule_name: str, **kwargs):
-        """Update a detection rule"""
+        """Update a detection rule for every guild"""
         if rule_name in self.detection_rules:
             rule = self.detection_rules[rule_name]
             for key, value in kwargs.items():
                 if hasattr(rule, key):
                     setattr(rule, key, value)
 
+            # Every plan was compiled from the old rule
+            self._rule_plans.clear()
+            self._default_plan = self._compile_plan(())
             logger.info(f"Detection rule updated: {rule_name}", **kwargs)
 
     def enable_rule(self, rule_name: str):
@@ -519,5 +1617,165 @@ class ThreatDetector:
         """Disable a detection rule"""
         self.update_rule(rule_name, enabled=False)
 
+# Analysis worker pool: "thread" or "process", and how many workers it runs
+ANALYSIS_EXECUTOR = os.getenv('ANALYSIS_EXECUTOR', 'thread')
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2'))
+# Messages waiting for analysis; low-risk messages are sampled once the queue is 80% full
+ANALYSIS_QUEUE_SIZE = int(os.getenv('ANALYSIS_QUEUE_SIZE', '1000'))
+ANALYSIS_SHED_RATIO = 0.8
+ANALYSIS_SAMPLE_RATE = 0.1
+
+_worker_matcher: Optional[PatternMatcher] = None
+
+def scan_message(content: str, categories: Optional[FrozenSet[str]] = None) -> Dict[str, List[str]]:
+    """Pattern-scan a message; runs on the analysis pool"""
+    global _worker_matcher
+    if _worker_matcher is None:
+        _worker_matcher = PatternMatcher()
+    return _worker_matcher.match_patterns(content, categories)
+
+class AnalysisPipeline:
+    """Analyzes messages off the gateway path.
+
+    Messages wait in a bounded priority queue. Pattern scanning, the CPU-bound
+    part, runs on a thread or process pool; the stateful checks then finish on
+    the event loop. Messages from guilds under raid, from users over the rate
+    limit and with links, invites or mass mentions go first. Once the queue is
+    nearly full, the remaining low-risk messages are only sampled.
+    """
+
+    HIGH_PRIORITY = 0
+    LOW_PRIORITY = 1
+
+    def __init__(self, detector: ThreatDetector, executor: str = ANALYSIS_EXECUTOR,
+                 workers: int = ANALYSIS_WORKERS, queue_size: int = ANALYSIS_QUEUE_SIZE,
+                 shed_ratio: float = ANALYSIS_SHED_RATIO, sample_rate: float = ANALYSIS_SAMPLE_RATE):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Unknown analysis executor: {executor}")
+        self.detector = detector
+        self.executor_type = executor
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.shed_threshold = int(queue_size * shed_ratio)
+        self.sample_rate = sample_rate
+        # Called with (message_data, events) for every message that produced detections
+        self.on_events: Optional[Callable[[Dict[str, Any], List[DetectionEvent]], Awaitable[None]]] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._executor: Optional[Executor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sequence = count()  # keeps FIFO order within a priority
+        self.submitted = 0
+        self.processed = 0
+        self.shed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, message_data: Dict[str, Any]) -> bool:
+        """Queue a message for analysis, returns False if it was shed or dropped"""
+        if self._queue is None:
+            return False
+
+        # Rate accounting sees every message, including the ones shed below
+        self.detector.rate_limiter.record_action(message_data['user_id'], message_data['guild_id'], 'message')
+
+        priority = self._priority(message_data)
+        if (priority == self.LOW_PRIORITY and self._queue.qsize() >= self.shed_threshold
+                and random.random() >= self.sample_rate):
+            self.shed += 1
+            return False
+
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), message_data))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+        self.submitted += 1
+        return True
+
+    def _priority(self, message_data: Dict[str, Any]) -> int:
+        detector = self.detector
+        guild_id = message_data['guild_id']
+        if detector.is_under_raid(guild_id):
+            return self.HIGH_PRIORITY
+
+        # Only the user's own rate; is_rate_limited also weighs in the whole guild's traffic
+        rule = detector.cached_rule_plan(guild_id).rate_rule
+        if rule:
+            stats = detector.rate_limiter.get_user_stats(message_data['user_id'], rule.time_window)
+            if stats.get('message', 0) >= rule.threshold:
+                return self.HIGH_PRIORITY
+
+        if detector.pattern_matcher.has_risk_markers(message_data.get('content', '')):
+            return self.HIGH_PRIORITY
+        return self.LOW_PRIORITY
+
+    async def _worker(self):
+        """Analyze queued messages until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, message_data = await self._queue.get()
+            try:
+                plan = await self.detector.get_rule_plan(message_data['guild_id'])
+                self.processed += 1
+                if not plan.message_rules:
+                    continue
+
+                matches = await loop.run_in_executor(self._executor, scan_message,
+                                                     message_data.get('content', ''), plan.scan_categories)
+                events = await self.detector.analyze_message(message_data, pattern_matches=matches,
+                                                             record_action=False,
+                                                             scanned_categories=plan.scan_categories)
+                if events and self.on_events:
+                    await self.on_events(message_data, events)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error in analysis worker: {e}")
+            finally:
+                self._queue.task_done()
+
+    def start(self):
+        """Start the worker pool"""
+        if self._tasks:
+            return
+
+        if self.executor_type == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analysis')
+        self._queue = asyncio.PriorityQueue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the worker pool, discarding messages still queued"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue and throughput statistics"""
+        return {
+            'executor': self.executor_type,
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'queue_size': self.queue_size,
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'shed': self.shed,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
+
 # Global threat detector instance
 threat_detector = ThreatDetector()
+
+# Global analysis pipeline instance
+analysis_pipeline = AnalysisPipeline(threat_detector)
@@ -0,0 +1,203 @@
+"""
+Economy Engine
+Message-driven earnings kept in memory and settled to the database in batches.
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Optional, FrozenSet, Tuple, Any
+from dataclasses import dataclass
+
+from database import db_manager, EconomySettings
+from logging_config import log_manager
+
+logger = log_manager.get_logger(__name__)
+
+@dataclass(frozen=True)
+class ChatMoneyConfig:
+    """Parsed chat-money settings for a guild"""
+    enabled: bool
+    min_amount: int
+    max_amount: int
+    cooldown: float
+    channels: Optional[FrozenSet[int]]  # None allows every channel
+
+    @classmethod
+    def from_settings(cls, settings: EconomySettings) -> "ChatMoneyConfig":
+        """Build a config from an EconomySettings row, parsing the channel allow-list once"""
+        channels = None
+        if settings.chat_money_channels:
+            try:
+                channels = frozenset(int(channel_id) for channel_id in json.loads(settings.chat_money_channels))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Invalid chat_money_channels for guild {settings.guild_id}: {e}")
+
+        min_amount = max(0, settings.chat_money_min or 0)
+        return cls(
+            enabled=bool(settings.chat_money_enabled),
+            min_amount=min_amount,
+            max_amount=max(min_amount, settings.chat_money_max or 0),
+            cooldown=float(settings.chat_money_cooldown or 0),
+            channels=channels or None
+        )
+
+# Used for guilds without economy settings, and while their settings can't be loaded
+DISABLED_CONFIG = ChatMoneyConfig(enabled=False, min_amount=0, max_amount=0, cooldown=0.0, channels=None)
+
+# Seconds to wait before retrying a guild whose settings failed to load
+CONFIG_RETRY_SECONDS = 30
+
+class ChatMoneyEngine:
+    """Awards chat money on messages without touching the database per message.
+
+    Cooldowns and pending earnings live in memory; a background task settles
+    the pending amounts to ``user_economy`` every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, flush_interval: float = 30.0):
+        self.flush_interval = flush_interval
+        # guild_id -> (settings object the config was parsed from, parsed config)
+        self._configs: Dict[int, Tuple[EconomySettings, ChatMoneyConfig]] = {}
+        self._config_retry_at: Dict[int, float] = {}  # guild_id -> when to load settings again
+        self._cooldowns: Dict[Tuple[int, int], float] = {}
+        self._pending: Dict[int, Dict[int, int]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.messages_seen = 0
+        self.awards = 0
+        self.settled_amount = 0
+        self.failed_flushes = 0
+
+    async def get_config(self, guild_id: int) -> ChatMoneyConfig:
+        """Get the parsed config for a guild, re-parsing only when the cached settings change.
+
+        Guilds without economy settings are disabled; messages never create them.
+        """
+        entry = self._configs.get(guild_id)
+        retry_at = self._config_retry_at.get(guild_id)
+        if retry_at is not None:
+            if retry_at > time.monotonic():
+                return entry[1] if entry else DISABLED_CONFIG
+            del self._config_retry_at[guild_id]
+
+        try:
+            settings = await db_manager.get_economy_settings(guild_id)
+        except Exception as e:
+            # Keep the last config for a while, so a database outage doesn't cost a query per message
+            logger.error(f"Failed to load chat money settings for guild {guild_id}: {e}")
+            self._config_retry_at[guild_id] = time.monotonic() + CONFIG_RETRY_SECONDS
+            return entry[1] if entry else DISABLED_CONFIG
+
+        if settings is None:
+            self._configs.pop(guild_id, None)
+            return DISABLED_CONFIG
+        if entry is None or entry[0] is not settings:
+            entry = (settings, ChatMoneyConfig.from_settings(settings))
+            self._configs[guild_id] = entry
+        return entry[1]
+
+    async def handle_message(self, guild_id: int, user_id: int, channel_id: int) -> int:
+        """Record a message and return the amount awarded (0 if not eligible)"""
+        self.messages_seen += 1
+        config = await self.get_config(guild_id)
+        if not config.enabled or config.max_amount <= 0:
+            return 0
+        if config.channels is not None and channel_id not in config.channels:
+            return 0
+
+        key = (guild_id, user_id)
+        now = time.monotonic()
+        if self._cooldowns.get(key, 0.0) > now:
+            return 0
+        self._cooldowns[key] = now + config.cooldown
+
+        amount = random.randint(config.min_amount, config.max_amount)
+        if amount:
+            guild_pending = self._pending.setdefault(guild_id, {})
+            guild_pending[user_id] = guild_pending.get(user_id, 0) + amount
+            self.awards += 1
+        return amount
+
+    def get_pending(self, guild_id: int, user_id: int) -> int:
+        """Get earnings not yet written to the database"""
+        return self._pending.get(guild_id, {}).get(user_id, 0)
+
+    async def flush(self) -> int:
+        """Settle every pending earning, returns the number of wallets credited"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            updated = 0
+
+            for guild_id, earnings in pending.items():
+                try:
+                    credited = await db_manager.settle_chat_money(guild_id, earnings)
+                    updated += len(credited)
+                    self.settled_amount += sum(credited.values())
+                except Exception as e:
+                    # Keep the earnings for the next flush
+                    self.failed_flushes += 1
+                    logger.error(f"Failed to settle chat money for guild {guild_id}: {e}")
+                    guild_pending = self._pending.setdefault(guild_id, {})
+                    for user_id, amount in earnings.items():
+                        guild_pending[user_id] = guild_pending.get(user_id, 0) + amount
+
+            self._prune_cooldowns()
+            return updated
+
+    def _prune_cooldowns(self):
+        """Drop cooldowns that already expired"""
+        now = time.monotonic()
+        expired = [key for key, until in self._cooldowns.items() if until <= now]
+        for key in expired:
+            del self._cooldowns[key]
+
+    def invalidate_guild(self, guild_id: int):
+        """Forget the parsed config for a guild"""
+        self._configs.pop(guild_id, None)
+        self._config_retry_at.pop(guild_id, None)
+
+    def start(self):
+        """Start periodic settlement"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop periodic settlement and settle what is left"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        """Settle pending earnings periodically"""
+        while True:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in chat money flush task: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get engine statistics"""
+        return {
+            'messages_seen': self.messages_seen,
+            'awards': self.awards,
+            'pending_users': sum(len(earnings) for earnings in self._pending.values()),
+            'pending_amount': sum(sum(earnings.values()) for earnings in self._pending.values()),
+            'settled_amount': self.settled_amount,
+            'active_cooldowns': len(self._cooldowns),
+            'failed_flushes': self.failed_flushes
+        }
+
+# Global chat money engine instance
+chat_money_engine = ChatMoneyEngine()
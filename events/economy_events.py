@@ -0,0 +1,29 @@
+from discord.ext import commands
+
+from economy import chat_money_engine
+
+class EconomyEventsCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        """Start settling chat money when the cog is loaded"""
+        chat_money_engine.start()
+
+    async def cog_unload(self):
+        """Settle pending chat money before the cog goes away"""
+        await chat_money_engine.stop()
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """Award chat money for messages"""
+        if message.author.bot or not message.guild:
+            return
+
+        try:
+            await chat_money_engine.handle_message(message.guild.id, message.author.id, message.channel.id)
+        except Exception as e:
+            print(f"Chat money error: {e}")
+
+async def setup(bot):
+    await bot.add_cog(EconomyEventsCog(bot))
@@ -0,0 +1,343 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+import discord
+from discord.ext import commands
+
+from database import db_manager
+from detection import threat_detector, analysis_pipeline
+
+logger = logging.getLogger(__name__)
+
+class SecurityEventsCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.lockdowns = {}  # guild_id -> verification level to restore
+        self._unlock_tasks = {}  # guild_id -> task lifting the lockdown
+        self._lockdowns_restored = False
+
+    async def cog_load(self):
+        """Hook the threat detector up to the member cache and start message analysis"""
+        self.bot.threat_detector = threat_detector
+        threat_detector.user_context.member_lookup = self._lookup_member
+        analysis_pipeline.on_events = self._report_detections
+        analysis_pipeline.start()
+        threat_detector.event_writer.start()
+
+    async def cog_unload(self):
+        """Stop message analysis, detach from the threat detector and lift active lockdowns"""
+        await analysis_pipeline.stop()
+        analysis_pipeline.on_events = None
+        await threat_detector.event_writer.stop()
+        threat_detector.user_context.member_lookup = None
+        self.bot.threat_detector = None
+
+        for task in self._unlock_tasks.values():
+            task.cancel()
+        self._unlock_tasks.clear()
+
+        for guild_id in list(self.lockdowns):
+            guild = self.bot.get_guild(guild_id)
+            if guild:
+                await self._lift_lockdown(guild)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Re-arm the lockdowns that were in progress when the bot stopped"""
+        if self._lockdowns_restored:
+            return
+        self._lockdowns_restored = True
+
+        try:
+            stored = await db_manager.get_all_raid_lockdowns()
+        except Exception as e:
+            logger.error(f"Failed to load raid lockdowns: {e}")
+            return
+
+        for lockdown in stored:
+            guild = self.bot.get_guild(lockdown.guild_id)
+            if not guild or guild.id in self.lockdowns:
+                continue
+
+            self.lockdowns[guild.id] = discord.VerificationLevel(lockdown.previous_verification_level)
+            seconds = (lockdown.ends_at - datetime.utcnow()).total_seconds()
+            if seconds <= 0:
+                await self._lift_lockdown(guild)
+                continue
+
+            self._unlock_tasks[guild.id] = asyncio.create_task(self._unlock_later(guild.id, seconds))
+        logger.info(f"Restored {len(self.lockdowns)} raid lockdowns")
+
+    @staticmethod
+    def _member_facts(member):
+        """Extract the facts the threat detector scores on"""
+        return {
+            'account_created_at': member.created_at,
+            'joined_at': member.joined_at,
+            'has_avatar': member.avatar is not None
+        }
+
+    def _lookup_member(self, guild_id, user_id):
+        """Look a member up in the member cache"""
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(user_id) if guild else None
+        return self._member_facts(member) if member else None
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """Queue messages for threat analysis"""
+        if message.author.bot or not message.guild:
+            return
+
+        analysis_pipeline.submit({
+            'guild_id': message.guild.id,
+            'user_id': message.author.id,
+            'channel_id': message.channel.id,
+            'message_id': message.id,
+            'content': message.content
+        })
+
+    async def _report_detections(self, message_data, events):
+        """Send detections from message analysis to the log channel"""
+        guild = self.bot.get_guild(message_data['guild_id'])
+        if not guild:
+            return
+
+        for event in events:
+            embed = discord.Embed(
+                title="⚠️ Amenaza detectada",
+                description=f"<@{event.user_id}> en <#{message_data['channel_id']}>\n"
+                            f"[Ver mensaje](https://discord.com/channels/{guild.id}/"
+                            f"{message_data['channel_id']}/{message_data['message_id']})",
+                color=0xffaa00
+            )
+            embed.add_field(name="🔎 Tipo", value=event.detection_type.value, inline=True)
+            embed.add_field(name="📈 Nivel", value=event.threat_level.value, inline=True)
+            embed.add_field(name="🎯 Confianza", value=f"{event.confidence:.0%}", inline=True)
+            embed.timestamp = datetime.now()
+            await self._notify(guild, embed)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        """Refresh the cached context of a member"""
+        threat_detector.user_context.update_member(after.guild.id, after.id, self._member_facts(after))
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before, after):
+        """Refresh cached contexts when a user's avatar changes"""
+        if before.avatar == after.avatar:
+            return
+        for guild in after.mutual_guilds:
+            member = guild.get_member(after.id)
+            if member:
+                threat_detector.user_context.update_member(guild.id, member.id, self._member_facts(member))
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        """Drop the cached context of a member that left"""
+        threat_detector.user_context.remove_member(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        """Feed joins to the raid detector and lock the server down on a raid"""
+        if member.bot:
+            return
+
+        threat_detector.user_context.update_member(member.guild.id, member.id, self._member_facts(member))
+
+        event = await threat_detector.analyze_join({
+            'guild_id': member.guild.id,
+            'user_id': member.id,
+            'account_created_at': member.created_at
+        })
+        if event and event.details.get('action') == 'lockdown':
+            await self._lockdown(member.guild, event)
+
+    async def _lockdown(self, guild, event):
+        """Raise the verification level for the duration of the raid"""
+        if guild.id in self.lockdowns:
+            return
+
+        seconds = event.details['lockdown_seconds']
+        self.lockdowns[guild.id] = guild.verification_level
+        try:
+            await db_manager.save_raid_lockdown(guild.id, guild.verification_level.value,
+                                                datetime.utcnow() + timedelta(seconds=seconds))
+        except Exception as e:
+            # Still lock down; !unlock can be given the level to restore
+            logger.error(f"Failed to save lockdown for guild {guild.id}: {e}")
+
+        try:
+            await guild.edit(
+                verification_level=discord.VerificationLevel.highest,
+                reason="Raid detectado: bloqueo automático"
+            )
+        except (discord.Forbidden, discord.HTTPException) as e:
+            logger.error(f"Failed to lock down guild {guild.id}: {e}")
+            self.lockdowns.pop(guild.id, None)
+            await self._forget_lockdown(guild.id)
+            return
+
+        self._unlock_tasks[guild.id] = asyncio.create_task(self._unlock_later(guild.id, seconds))
+
+        stats = event.details['join_stats']
+        embed = discord.Embed(
+            title="🚨 Raid detectado",
+            description=f"Se activó el bloqueo del servidor durante {seconds // 60} minutos.",
+            color=0xff0000
+        )
+        embed.add_field(name="👥 Entradas", value=f"{stats['joins']} en {stats['window']}s", inline=True)
+        embed.add_field(name="🆕 Cuentas nuevas", value=str(stats['young_accounts']), inline=True)
+        embed.add_field(name="🎯 Confianza", value=f"{event.confidence:.0%}", inline=True)
+        embed.timestamp = datetime.now()
+        await self._notify(guild, embed)
+
+    async def _unlock_later(self, guild_id, seconds):
+        """Lift a lockdown once the raid window has passed"""
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            return
+
+        self._unlock_tasks.pop(guild_id, None)
+        guild = self.bot.get_guild(guild_id)
+        if guild:
+            await self._lift_lockdown(guild)
+
+    async def _lift_lockdown(self, guild):
+        """Restore the verification level saved when the lockdown started"""
+        level = self.lockdowns.pop(guild.id, None)
+        if level is None:
+            return
+
+        threat_detector.join_raid_detector.end_raid(guild.id)
+        try:
+            await guild.edit(verification_level=level, reason="Fin del bloqueo por raid")
+        except (discord.Forbidden, discord.HTTPException) as e:
+            logger.error(f"Failed to lift lockdown in guild {guild.id}: {e}")
+            return
+        await self._forget_lockdown(guild.id)
+
+        embed = discord.Embed(
+            title="✅ Bloqueo finalizado",
+            description="El nivel de verificación del servidor volvió a la normalidad.",
+            color=0x00ff00
+        )
+        embed.timestamp = datetime.now()
+        await self._notify(guild, embed)
+
+    async def _forget_lockdown(self, guild_id):
+        """Drop a guild's stored lockdown"""
+        try:
+            await db_manager.delete_raid_lockdown(guild_id)
+        except Exception as e:
+            logger.error(f"Failed to delete lockdown for guild {guild_id}: {e}")
+
+    async def _notify(self, guild, embed):
+        """Send an embed to the guild's log channel, if one is set"""
+        channel_id = self.bot.log_channels.get(guild.id)
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel:
+            try:
+                await channel.send(embed=embed)
+            except discord.Forbidden:
+                pass
+
+    @commands.command(name='threats')
+    @commands.has_permissions(manage_guild=True)
+    async def threats(self, ctx, minutes: int = 60):
+        """Show a summary of recent threat detections"""
+        minutes = max(1, min(minutes, 1440))
+        summary = await threat_detector.get_threat_summary(ctx.guild.id, time_window=minutes * 60)
+
+        embed = discord.Embed(
+            title="🛡️ Resumen de amenazas",
+            description=f"**Detecciones en los últimos {minutes} minutos:** {summary['total_detections']}\n"
+                        f"**Sin resolver:** {summary['active_threats']}",
+            color=0x0099ff
+        )
+
+        by_type = "\n".join(f"`{name}` • {count}" for name, count in
+                            sorted(summary['threats_by_type'].items(), key=lambda item: -item[1]))
+        embed.add_field(name="🔎 Por tipo", value=by_type[:1024] or "Ninguna", inline=True)
+
+        by_level = "\n".join(f"`{name}` • {count}" for name, count in summary['threats_by_level'].items())
+        embed.add_field(name="📈 Por nivel", value=by_level[:1024] or "Ninguna", inline=True)
+
+        top_users = "\n".join(f"<@{entry['user_id']}> • {entry['count']}" for entry in summary['top_users'])
+        embed.add_field(name="👤 Usuarios con más detecciones", value=top_users[:1024] or "Ninguno", inline=False)
+
+        await ctx.send(embed=embed)
+
+    @commands.command(name='rule')
+    @commands.has_permissions(administrator=True)
+    async def rule(self, ctx, rule_name: str = None, field: str = None, value: str = None):
+        """Show or override the guild's detection rules (admin only)"""
+        if rule_name is None:
+            plan = await threat_detector.get_rule_plan(ctx.guild.id)
+            embed = discord.Embed(title="🧩 Reglas de detección", color=0x0099ff)
+            for rule in plan.rules:
+                embed.add_field(
+                    name=f"{'✅' if rule.enabled else '⛔'} {rule.name}",
+                    value=f"umbral {rule.threshold} • ventana {rule.time_window}s • "
+                          f"espera {rule.cooldown_period}s • {rule.action} • {rule.severity.value}",
+                    inline=False
+                )
+            embed.set_footer(text="Usa !rule <regla> <campo> <valor> o !rule reset [regla]")
+            await ctx.send(embed=embed)
+            return
+
+        if rule_name == 'reset':
+            removed = await threat_detector.reset_guild_rules(ctx.guild.id, field)
+            await ctx.send(f"✅ Se eliminaron {removed} ajustes de reglas.")
+            return
+
+        if field is None or value is None:
+            await ctx.send("❌ Uso: `!rule <regla> <campo> <valor>`")
+            return
+
+        try:
+            if field == 'enabled':
+                parsed = value.lower() in ('on', 'si', 'sí', 'true', '1')
+            elif field in ('threshold', 'time_window', 'cooldown_period'):
+                parsed = int(value)
+            else:
+                parsed = value
+            await threat_detector.set_guild_rule(ctx.guild.id, rule_name, **{field: parsed})
+        except ValueError as e:
+            await ctx.send(f"❌ Ajuste inválido: {e}")
+            return
+
+        await ctx.send(f"✅ Regla `{rule_name}` actualizada: `{field}` = `{parsed}`")
+
+    @commands.command(name='unlock')
+    @commands.has_permissions(administrator=True)
+    async def unlock(self, ctx, level: str = None):
+        """Lift a raid lockdown early, optionally to a given verification level (admin only)"""
+        if level is not None:
+            try:
+                level = (discord.VerificationLevel(int(level)) if level.isdigit()
+                         else discord.VerificationLevel[level.lower()])
+            except (KeyError, ValueError):
+                await ctx.send("❌ Nivel inválido. Usa `none`, `low`, `medium`, `high` o `highest`.")
+                return
+
+        if ctx.guild.id not in self.lockdowns:
+            stored = await db_manager.get_raid_lockdown(ctx.guild.id)
+            if stored:
+                self.lockdowns[ctx.guild.id] = discord.VerificationLevel(stored.previous_verification_level)
+            elif level is None:
+                await ctx.send("ℹ️ El servidor no está bloqueado. Indica un nivel para restaurarlo: `!unlock <nivel>`")
+                return
+        if level is not None:
+            self.lockdowns[ctx.guild.id] = level
+
+        task = self._unlock_tasks.pop(ctx.guild.id, None)
+        if task:
+            task.cancel()
+        await self._lift_lockdown(ctx.guild)
+        await ctx.send("🔓 Bloqueo levantado.")
+
+async def setup(bot):
+    await bot.add_cog(SecurityEventsCog(bot))
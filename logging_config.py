@@ -354,6 +354,16 @@ class LogManager:
                    duration=duration,
                    **context)
 
+    def log_database_metrics(self, stats: Dict[str, Any]):
+        """Log database query metrics"""
+        logger = self.get_logger('database_metrics')
+        logger.info("Database metrics",
+                   statement_count=stats.get('statement_count', 0),
+                   pool_wait=stats.get('pool_wait'),
+                   methods=stats.get('methods', []),
+                   statements=stats.get('statements', []),
+                   slow_queries=len(stats.get('slow_queries', [])))
+
     def log_security_event(self, event_type: str, user_id: Optional[int] = None,
                           guild_id: Optional[int] = None, details: Optional[Dict[str, Any]] = None):
         """Log security-related events"""
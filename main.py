@@ -6,9 +6,10 @@ A modular Discord bot with comprehensive features
 import discord
 from discord.ext import commands
 import asyncio
+import json
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 
 # Import configuration
 from config.settings import BOT_CONFIG
@@ -42,8 +43,10 @@ class KoalaBot(commands.Bot):
         # Bot state
         self.uptime = None
         self.log_channels = {}  # guild_id -> channel_id
-        self.jail_data = {}    # guild_id -> {user_id -> jail_info}
+        self.jail_data = {}    # guild_id -> {user_id -> jail_info}, loaded from the database at startup
         self.last_help_execution = {}  # user_id -> timestamp
+        self.db_manager = None
+        self.threat_detector = None  # set by the security events cog
 
         # Load cogs
         asyncio.create_task(self.load_cogs())
@@ -60,6 +63,8 @@ class KoalaBot(commands.Bot):
             'cogs.slash_commands',
             'cogs.music',
             'events.logging_events',
+            'events.economy_events',
+            'events.security_events',
             'events.bot_events'
         ]
 
@@ -70,6 +75,48 @@ class KoalaBot(commands.Bot):
             except Exception as e:
                 logger.error(f"❌ Failed to load cog {cog}: {e}")
 
+    async def setup_hook(self):
+        """Start the database layer before connecting to Discord"""
+        try:
+            from database import db_manager
+            from logging_config import log_manager
+            await db_manager.startup(metrics_reporter=log_manager.log_database_metrics)
+            self.db_manager = db_manager
+            logger.info("✅ Database ready")
+        except Exception as e:
+            logger.error(f"❌ Failed to start database: {e}")
+            return
+
+        await self.load_jail_data()
+
+    async def load_jail_data(self):
+        """Rebuild the in-memory jail index from the active jail records"""
+        try:
+            records = await self.db_manager.get_all_active_jail_records()
+        except Exception as e:
+            logger.error(f"❌ Failed to load jail records: {e}")
+            return
+
+        jail_data = {}
+        for record in records:
+            jail_data.setdefault(record.guild_id, {})[record.user_id] = {
+                'original_roles': json.loads(record.original_roles) if record.original_roles else [],
+                'jailed_by': record.moderator_id,
+                'reason': record.reason,
+                'timestamp': record.jailed_at.replace(tzinfo=timezone.utc).timestamp()
+            }
+
+        self.jail_data = jail_data
+        logger.info(f"🔒 Loaded {len(records)} active jail records")
+
+    async def close(self):
+        """Unload everything, then close database connections"""
+        await super().close()
+
+        if self.db_manager:
+            await self.db_manager.shutdown()
+            self.db_manager = None
+
     async def on_ready(self):
         """Called when bot is ready"""
         self.uptime = datetime.now()
@@ -0,0 +1,406 @@
+"""Baseline schema
+
+The schema create_all built before migrations existed. Later revisions
+bring it up to date.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('guilds',
+    sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('owner_id', sa.BigInteger(), nullable=False),
+    sa.Column('member_count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_guilds_name', 'guilds', ['name'], unique=False)
+    op.create_index('ix_guilds_owner_id', 'guilds', ['owner_id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('username', sa.String(length=100), nullable=False),
+    sa.Column('discriminator', sa.String(length=10), nullable=False),
+    sa.Column('display_name', sa.String(length=100), nullable=True),
+    sa.Column('avatar_hash', sa.String(length=100), nullable=True),
+    sa.Column('banner_hash', sa.String(length=100), nullable=True),
+    sa.Column('bot', sa.Boolean(), nullable=True),
+    sa.Column('system', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_discriminator', 'users', ['discriminator'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=False)
+    op.create_table('channels',
+    sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('type', sa.String(length=20), nullable=False),
+    sa.Column('category_id', sa.BigInteger(), nullable=True),
+    sa.Column('position', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_channels_guild_id', 'channels', ['guild_id'], unique=False)
+    op.create_index('ix_channels_type', 'channels', ['type'], unique=False)
+    op.create_table('command_usage',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=True),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('command_name', sa.String(length=50), nullable=False),
+    sa.Column('execution_time', sa.Integer(), nullable=False),
+    sa.Column('success', sa.Boolean(), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_command_usage_command_name', 'command_usage', ['command_name'], unique=False)
+    op.create_index('ix_command_usage_guild_id', 'command_usage', ['guild_id'], unique=False)
+    op.create_index('ix_command_usage_timestamp', 'command_usage', ['timestamp'], unique=False)
+    op.create_index('ix_command_usage_user_id', 'command_usage', ['user_id'], unique=False)
+    op.create_table('custom_replies',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('command', sa.String(length=20), nullable=False),
+    sa.Column('type', sa.String(length=10), nullable=False),
+    sa.Column('reply', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_custom_replies_guild_cmd', 'custom_replies', ['guild_id', 'command'], unique=False)
+    op.create_table('economy_items',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('price', sa.BigInteger(), nullable=False),
+    sa.Column('sell_price', sa.BigInteger(), nullable=True),
+    sa.Column('stock', sa.Integer(), nullable=True),
+    sa.Column('role_required', sa.BigInteger(), nullable=True),
+    sa.Column('role_granted', sa.BigInteger(), nullable=True),
+    sa.Column('usable', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_economy_items_guild_id', 'economy_items', ['guild_id'], unique=False)
+    op.create_table('economy_settings',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('currency_symbol', sa.String(length=10), nullable=True),
+    sa.Column('start_balance', sa.BigInteger(), nullable=True),
+    sa.Column('max_balance', sa.BigInteger(), nullable=True),
+    sa.Column('audit_log_channel_id', sa.BigInteger(), nullable=True),
+    sa.Column('work_cooldown', sa.Integer(), nullable=True),
+    sa.Column('slut_cooldown', sa.Integer(), nullable=True),
+    sa.Column('crime_cooldown', sa.Integer(), nullable=True),
+    sa.Column('rob_cooldown', sa.Integer(), nullable=True),
+    sa.Column('work_min_payout', sa.BigInteger(), nullable=True),
+    sa.Column('work_max_payout', sa.BigInteger(), nullable=True),
+    sa.Column('slut_min_payout', sa.BigInteger(), nullable=True),
+    sa.Column('slut_max_payout', sa.BigInteger(), nullable=True),
+    sa.Column('crime_min_payout', sa.BigInteger(), nullable=True),
+    sa.Column('crime_max_payout', sa.BigInteger(), nullable=True),
+    sa.Column('crime_fail_rate', sa.Float(), nullable=True),
+    sa.Column('slut_fail_rate', sa.Float(), nullable=True),
+    sa.Column('fine_type', sa.String(length=10), nullable=True),
+    sa.Column('fine_percent', sa.Float(), nullable=True),
+    sa.Column('fine_fixed', sa.BigInteger(), nullable=True),
+    sa.Column('chat_money_enabled', sa.Boolean(), nullable=True),
+    sa.Column('chat_money_min', sa.BigInteger(), nullable=True),
+    sa.Column('chat_money_max', sa.BigInteger(), nullable=True),
+    sa.Column('chat_money_cooldown', sa.Integer(), nullable=True),
+    sa.Column('chat_money_channels', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_economy_settings_guild_id', 'economy_settings', ['guild_id'], unique=False)
+    op.create_table('economy_transactions',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('amount', sa.BigInteger(), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('moderator_id', sa.BigInteger(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_economy_transactions_guild_user', 'economy_transactions', ['guild_id', 'user_id'], unique=False)
+    op.create_index('ix_economy_transactions_timestamp', 'economy_transactions', ['timestamp'], unique=False)
+    op.create_table('game_settings',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('min_bet', sa.BigInteger(), nullable=True),
+    sa.Column('max_bet', sa.BigInteger(), nullable=True),
+    sa.Column('blackjack_decks', sa.Integer(), nullable=True),
+    sa.Column('game_cooldown', sa.Integer(), nullable=True),
+    sa.Column('slot_symbols', sa.Text(), nullable=True),
+    sa.Column('cock_fight_win_chance', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_game_settings_guild_id', 'game_settings', ['guild_id'], unique=False)
+    op.create_table('guild_members',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('nickname', sa.String(length=100), nullable=True),
+    sa.Column('joined_at', sa.DateTime(), nullable=True),
+    sa.Column('roles', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_guild_members_guild_id', 'guild_members', ['guild_id'], unique=False)
+    op.create_index('ix_guild_members_joined_at', 'guild_members', ['joined_at'], unique=False)
+    op.create_index('ix_guild_members_user_id', 'guild_members', ['user_id'], unique=False)
+    op.create_table('jail_configs',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('channel_id', sa.BigInteger(), nullable=True),
+    sa.Column('role_id', sa.BigInteger(), nullable=True),
+    sa.Column('enabled', sa.Boolean(), nullable=True),
+    sa.Column('auto_setup', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jail_configs_guild_id', 'jail_configs', ['guild_id'], unique=False)
+    op.create_table('log_configs',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('channel_id', sa.BigInteger(), nullable=False),
+    sa.Column('enabled', sa.Boolean(), nullable=True),
+    sa.Column('log_member_joins', sa.Boolean(), nullable=True),
+    sa.Column('log_member_leaves', sa.Boolean(), nullable=True),
+    sa.Column('log_message_deletes', sa.Boolean(), nullable=True),
+    sa.Column('log_bulk_deletes', sa.Boolean(), nullable=True),
+    sa.Column('log_role_changes', sa.Boolean(), nullable=True),
+    sa.Column('log_channel_changes', sa.Boolean(), nullable=True),
+    sa.Column('log_moderation_actions', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_log_configs_channel_id', 'log_configs', ['channel_id'], unique=False)
+    op.create_index('ix_log_configs_guild_id', 'log_configs', ['guild_id'], unique=False)
+    op.create_table('rate_limits',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=True),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('command_name', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('window_start', sa.DateTime(), nullable=True),
+    sa.Column('window_end', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_rate_limits_guild_user_cmd', 'rate_limits', ['guild_id', 'user_id', 'command_name'], unique=False)
+    op.create_index('ix_rate_limits_window_end', 'rate_limits', ['window_end'], unique=False)
+    op.create_table('role_income',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('role_id', sa.BigInteger(), nullable=False),
+    sa.Column('income_amount', sa.BigInteger(), nullable=False),
+    sa.Column('cooldown', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_role_income_guild_role', 'role_income', ['guild_id', 'role_id'], unique=False)
+    op.create_table('roles',
+    sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('color', sa.Integer(), nullable=True),
+    sa.Column('permissions', sa.BigInteger(), nullable=True),
+    sa.Column('position', sa.Integer(), nullable=True),
+    sa.Column('mentionable', sa.Boolean(), nullable=True),
+    sa.Column('hoist', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_roles_guild_id', 'roles', ['guild_id'], unique=False)
+    op.create_index('ix_roles_position', 'roles', ['position'], unique=False)
+    op.create_table('user_economy',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('cash', sa.BigInteger(), nullable=True),
+    sa.Column('bank', sa.BigInteger(), nullable=True),
+    sa.Column('total_earned', sa.BigInteger(), nullable=True),
+    sa.Column('last_work', sa.DateTime(), nullable=True),
+    sa.Column('last_slut', sa.DateTime(), nullable=True),
+    sa.Column('last_crime', sa.DateTime(), nullable=True),
+    sa.Column('last_rob', sa.DateTime(), nullable=True),
+    sa.Column('last_chat_money', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_economy_guild_user', 'user_economy', ['guild_id', 'user_id'], unique=False)
+    op.create_table('jail_records',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('jail_config_id', sa.BigInteger(), nullable=False),
+    sa.Column('moderator_id', sa.BigInteger(), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('original_roles', sa.Text(), nullable=True),
+    sa.Column('jailed_at', sa.DateTime(), nullable=True),
+    sa.Column('released_at', sa.DateTime(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['jail_config_id'], ['jail_configs.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jail_records_active', 'jail_records', ['active'], unique=False)
+    op.create_index('ix_jail_records_guild_id', 'jail_records', ['guild_id'], unique=False)
+    op.create_index('ix_jail_records_jailed_at', 'jail_records', ['jailed_at'], unique=False)
+    op.create_index('ix_jail_records_user_id', 'jail_records', ['user_id'], unique=False)
+    op.create_table('log_entries',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=True),
+    sa.Column('channel_id', sa.BigInteger(), nullable=True),
+    sa.Column('log_config_id', sa.BigInteger(), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('severity', sa.String(length=20), nullable=True),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('metadata', sa.Text(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['log_config_id'], ['log_configs.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_log_entries_event_type', 'log_entries', ['event_type'], unique=False)
+    op.create_index('ix_log_entries_guild_id', 'log_entries', ['guild_id'], unique=False)
+    op.create_index('ix_log_entries_severity', 'log_entries', ['severity'], unique=False)
+    op.create_index('ix_log_entries_timestamp', 'log_entries', ['timestamp'], unique=False)
+    op.create_table('user_items',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('item_id', sa.BigInteger(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=True),
+    sa.Column('acquired_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['item_id'], ['economy_items.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_items_guild_user', 'user_items', ['guild_id', 'user_id'], unique=False)
+    op.create_index('ix_user_items_item_id', 'user_items', ['item_id'], unique=False)
+    op.create_table('user_role_income',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('role_income_id', sa.BigInteger(), nullable=False),
+    sa.Column('last_collected', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.ForeignKeyConstraint(['role_income_id'], ['role_income.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_role_income_guild_user', 'user_role_income', ['guild_id', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_role_income_guild_user', table_name='user_role_income')
+    op.drop_table('user_role_income')
+    op.drop_index('ix_user_items_item_id', table_name='user_items')
+    op.drop_index('ix_user_items_guild_user', table_name='user_items')
+    op.drop_table('user_items')
+    op.drop_index('ix_log_entries_timestamp', table_name='log_entries')
+    op.drop_index('ix_log_entries_severity', table_name='log_entries')
+    op.drop_index('ix_log_entries_guild_id', table_name='log_entries')
+    op.drop_index('ix_log_entries_event_type', table_name='log_entries')
+    op.drop_table('log_entries')
+    op.drop_index('ix_jail_records_user_id', table_name='jail_records')
+    op.drop_index('ix_jail_records_jailed_at', table_name='jail_records')
+    op.drop_index('ix_jail_records_guild_id', table_name='jail_records')
+    op.drop_index('ix_jail_records_active', table_name='jail_records')
+    op.drop_table('jail_records')
+    op.drop_index('ix_user_economy_guild_user', table_name='user_economy')
+    op.drop_table('user_economy')
+    op.drop_index('ix_roles_position', table_name='roles')
+    op.drop_index('ix_roles_guild_id', table_name='roles')
+    op.drop_table('roles')
+    op.drop_index('ix_role_income_guild_role', table_name='role_income')
+    op.drop_table('role_income')
+    op.drop_index('ix_rate_limits_window_end', table_name='rate_limits')
+    op.drop_index('ix_rate_limits_guild_user_cmd', table_name='rate_limits')
+    op.drop_table('rate_limits')
+    op.drop_index('ix_log_configs_guild_id', table_name='log_configs')
+    op.drop_index('ix_log_configs_channel_id', table_name='log_configs')
+    op.drop_table('log_configs')
+    op.drop_index('ix_jail_configs_guild_id', table_name='jail_configs')
+    op.drop_table('jail_configs')
+    op.drop_index('ix_guild_members_user_id', table_name='guild_members')
+    op.drop_index('ix_guild_members_joined_at', table_name='guild_members')
+    op.drop_index('ix_guild_members_guild_id', table_name='guild_members')
+    op.drop_table('guild_members')
+    op.drop_index('ix_game_settings_guild_id', table_name='game_settings')
+    op.drop_table('game_settings')
+    op.drop_index('ix_economy_transactions_timestamp', table_name='economy_transactions')
+    op.drop_index('ix_economy_transactions_guild_user', table_name='economy_transactions')
+    op.drop_table('economy_transactions')
+    op.drop_index('ix_economy_settings_guild_id', table_name='economy_settings')
+    op.drop_table('economy_settings')
+    op.drop_index('ix_economy_items_guild_id', table_name='economy_items')
+    op.drop_table('economy_items')
+    op.drop_index('ix_custom_replies_guild_cmd', table_name='custom_replies')
+    op.drop_table('custom_replies')
+    op.drop_index('ix_command_usage_user_id', table_name='command_usage')
+    op.drop_index('ix_command_usage_timestamp', table_name='command_usage')
+    op.drop_index('ix_command_usage_guild_id', table_name='command_usage')
+    op.drop_index('ix_command_usage_command_name', table_name='command_usage')
+    op.drop_table('command_usage')
+    op.drop_index('ix_channels_type', table_name='channels')
+    op.drop_index('ix_channels_guild_id', table_name='channels')
+    op.drop_table('channels')
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_index('ix_users_discriminator', table_name='users')
+    op.drop_table('users')
+    op.drop_index('ix_guilds_owner_id', table_name='guilds')
+    op.drop_index('ix_guilds_name', table_name='guilds')
+    op.drop_table('guilds')
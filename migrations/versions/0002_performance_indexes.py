@@ -0,0 +1,71 @@
+"""Performance indexes for jail, custom reply and role income lookups
+
+Indexes are built with CREATE INDEX CONCURRENTLY on PostgreSQL, outside a
+transaction, so deploys don't lock the tables. Unique constraints are attached
+to their prebuilt index with ADD CONSTRAINT ... USING INDEX.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _add_unique_constraint(name: str, table: str, columns: list) -> None:
+    """Build the unique index online, then promote it to a constraint where supported"""
+    op.create_index(name, table, columns, unique=True, postgresql_concurrently=True)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+
+
+def _drop_unique_constraint(name: str, table: str) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint(name, table, type_='unique')
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # Jail lookups: "is this user jailed here" and "everyone jailed here"
+        op.create_index('ix_jail_records_guild_user_active', 'jail_records',
+                        ['guild_id', 'user_id', 'active'], postgresql_concurrently=True)
+        op.create_index('ix_jail_records_guild_active', 'jail_records', ['guild_id'],
+                        postgresql_where=sa.text('active'), sqlite_where=sa.text('active'),
+                        postgresql_concurrently=True)
+        op.drop_index('ix_jail_records_guild_id', table_name='jail_records', postgresql_concurrently=True)
+        op.drop_index('ix_jail_records_active', table_name='jail_records', postgresql_concurrently=True)
+
+        # Custom replies are always fetched by (guild, command, type)
+        op.create_index('ix_custom_replies_guild_cmd_type', 'custom_replies',
+                        ['guild_id', 'command', 'type'], postgresql_concurrently=True)
+        op.drop_index('ix_custom_replies_guild_cmd', table_name='custom_replies', postgresql_concurrently=True)
+
+        # One income setting per role
+        _add_unique_constraint('uq_role_income_guild_role', 'role_income', ['guild_id', 'role_id'])
+        op.drop_index('ix_role_income_guild_role', table_name='role_income', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_role_income_guild_role', 'role_income', ['guild_id', 'role_id'],
+                        postgresql_concurrently=True)
+        _drop_unique_constraint('uq_role_income_guild_role', 'role_income')
+
+        op.create_index('ix_custom_replies_guild_cmd', 'custom_replies', ['guild_id', 'command'],
+                        postgresql_concurrently=True)
+        op.drop_index('ix_custom_replies_guild_cmd_type', table_name='custom_replies', postgresql_concurrently=True)
+
+        op.create_index('ix_jail_records_active', 'jail_records', ['active'], postgresql_concurrently=True)
+        op.create_index('ix_jail_records_guild_id', 'jail_records', ['guild_id'], postgresql_concurrently=True)
+        op.drop_index('ix_jail_records_guild_active', table_name='jail_records', postgresql_concurrently=True)
+        op.drop_index('ix_jail_records_guild_user_active', table_name='jail_records', postgresql_concurrently=True)
@@ -0,0 +1,44 @@
+"""Detection events
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('detection_events',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('event_id', sa.String(length=36), nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('detection_type', sa.String(length=50), nullable=False),
+    sa.Column('threat_level', sa.String(length=20), nullable=False),
+    sa.Column('confidence', sa.Float(), nullable=False),
+    sa.Column('rule_name', sa.String(length=100), nullable=True),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('resolved', sa.Boolean(), nullable=True),
+    sa.Column('resolution', sa.Text(), nullable=True),
+    sa.Column('resolved_by', sa.BigInteger(), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_detection_events_event_id', 'detection_events', ['event_id'], unique=True)
+    op.create_index('ix_detection_events_guild_ts_type', 'detection_events', ['guild_id', 'timestamp', 'detection_type'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_detection_events_guild_ts_type', table_name='detection_events')
+    op.drop_index('ix_detection_events_event_id', table_name='detection_events')
+    op.drop_table('detection_events')
@@ -0,0 +1,37 @@
+"""Detection rule overrides
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:04
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('detection_rule_overrides',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('guild_id', sa.BigInteger(), nullable=False),
+    sa.Column('rule_name', sa.String(length=50), nullable=False),
+    sa.Column('enabled', sa.Boolean(), nullable=True),
+    sa.Column('threshold', sa.Integer(), nullable=True),
+    sa.Column('time_window', sa.Integer(), nullable=True),
+    sa.Column('cooldown_period', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(length=20), nullable=True),
+    sa.Column('severity', sa.String(length=20), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('guild_id', 'rule_name', name='uq_detection_rule_overrides_guild_rule')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('detection_rule_overrides')
@@ -0,0 +1,225 @@
+"""Net worth, economy unique constraints and partitioned log tables
+
+Brings baseline databases up to the schema the economy and retention code
+expects:
+- user_economy.net_worth (cash + bank, stored) and its ranking index
+- unique (guild, user) wallets, (guild, user, item) inventory rows and
+  (guild, user, role income) claims, after merging duplicate rows
+- composite (guild_id, timestamp) indexes on log_entries and command_usage,
+  which are converted to monthly range partitions on PostgreSQL; log_entries
+  keeps its timestamp index
+
+Each step checks the current schema first, so databases that already have
+it are left alone. Converting the log tables copies their rows and holds a
+lock on them while it runs.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:05
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# name -> (table, columns, plain index it replaces)
+UNIQUE_CONSTRAINTS = {
+    'uq_user_economy_guild_user': ('user_economy', ['guild_id', 'user_id'], 'ix_user_economy_guild_user'),
+    'uq_user_items_guild_user_item': ('user_items', ['guild_id', 'user_id', 'item_id'], 'ix_user_items_guild_user'),
+    'uq_user_role_income_guild_user_role': ('user_role_income', ['guild_id', 'user_id', 'role_income_id'],
+                                            'ix_user_role_income_guild_user'),
+}
+
+# table -> single-column indexes replaced by (guild_id, timestamp)
+LOG_TABLE_INDEXES = {
+    'log_entries': ['ix_log_entries_event_type', 'ix_log_entries_guild_id', 'ix_log_entries_severity'],
+    'command_usage': ['ix_command_usage_command_name', 'ix_command_usage_guild_id',
+                      'ix_command_usage_timestamp', 'ix_command_usage_user_id'],
+}
+
+# table -> single-column timestamp index that stays (guild-wide recent counts in get_database_stats)
+TIMESTAMP_INDEXES = {'log_entries': 'ix_log_entries_timestamp'}
+
+PARTITION_MONTHS_AHEAD = 2
+
+
+def _index_names(table: str) -> set:
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _unique_names(table: str) -> set:
+    inspector = sa.inspect(op.get_bind())
+    names = {constraint['name'] for constraint in inspector.get_unique_constraints(table)}
+    return names | {index['name'] for index in inspector.get_indexes(table) if index['unique']}
+
+
+def _is_partitioned(table: str) -> bool:
+    return op.get_bind().execute(
+        sa.text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"), {'table': table}
+    ).scalar() or False
+
+
+def _merge_duplicates(table: str, columns: list, merge: str = None) -> None:
+    """Fold rows sharing ``columns`` into the oldest one, then delete the rest"""
+    same_key = ' AND '.join(f'd.{column} = {table}.{column}' for column in columns)
+    if merge:
+        op.execute(
+            f"UPDATE {table} SET {merge.format(same_key=same_key)} "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} d WHERE {same_key} AND d.id < {table}.id) "
+            f"AND EXISTS (SELECT 1 FROM {table} d WHERE {same_key} AND d.id > {table}.id)"
+        )
+    op.execute(f"DELETE FROM {table} WHERE EXISTS (SELECT 1 FROM {table} d WHERE {same_key} AND d.id < {table}.id)")
+
+
+def _add_net_worth() -> None:
+    net_worth = sa.Column('net_worth', sa.BigInteger(), sa.Computed('cash + bank', persisted=True), nullable=True)
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite can't add a stored generated column in place
+        with op.batch_alter_table('user_economy', recreate='always') as batch_op:
+            batch_op.add_column(net_worth)
+    else:
+        op.add_column('user_economy', net_worth)
+
+
+def _partition_log_table(table: str) -> None:
+    """Move a plain PostgreSQL table into a monthly range-partitioned one"""
+    bind = op.get_bind()
+    legacy = f'{table}_unpartitioned'
+    inspector = sa.inspect(bind)
+    primary_key = inspector.get_pk_constraint(table)['name']
+    foreign_keys = inspector.get_foreign_keys(table)
+
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {primary_key} TO {legacy}_pkey")
+    op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN timestamp SET NOT NULL, ADD PRIMARY KEY (id, timestamp)")
+    for foreign_key in foreign_keys:
+        op.create_foreign_key(foreign_key['name'], table, foreign_key['referred_table'],
+                              foreign_key['constrained_columns'], foreign_key['referred_columns'])
+
+    # The id sequence must outlive the old table
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': legacy}).scalar()
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+    now = datetime.utcnow()
+    oldest = bind.execute(sa.text(f"SELECT min(timestamp) FROM {legacy}")).scalar() or now
+    start = min(oldest, now).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        last = (last + timedelta(days=32)).replace(day=1)
+    while start <= last:
+        end = (start + timedelta(days=32)).replace(day=1)
+        op.execute(f"CREATE TABLE {table}_p{start:%Y%m} PARTITION OF {table} "
+                   f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')")
+        start = end
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    op.execute(f"DROP TABLE {legacy}")
+    op.create_index(f'ix_{table}_guild_timestamp', table, ['guild_id', 'timestamp'])
+    if table in TIMESTAMP_INDEXES:
+        op.create_index(TIMESTAMP_INDEXES[table], table, ['timestamp'])
+
+
+def _fill_missing_timestamps(table: str) -> None:
+    """Rows logged without a timestamp get the migration time, as timestamp becomes NOT NULL"""
+    now = "timezone('utc', now())" if op.get_bind().dialect.name == 'postgresql' else 'CURRENT_TIMESTAMP'
+    op.execute(f"UPDATE {table} SET timestamp = {now} WHERE timestamp IS NULL")
+
+
+def _upgrade_log_table(table: str) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        if not _is_partitioned(table):
+            _fill_missing_timestamps(table)
+            _partition_log_table(table)
+        return
+
+    existing = _index_names(table)
+    for name in LOG_TABLE_INDEXES[table]:
+        if name in existing:
+            op.drop_index(name, table_name=table)
+
+    columns = {column['name']: column for column in sa.inspect(op.get_bind()).get_columns(table)}
+    if columns['timestamp']['nullable']:
+        _fill_missing_timestamps(table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+    existing = _index_names(table)
+    if f'ix_{table}_guild_timestamp' not in existing:
+        op.create_index(f'ix_{table}_guild_timestamp', table, ['guild_id', 'timestamp'])
+    if table in TIMESTAMP_INDEXES and TIMESTAMP_INDEXES[table] not in existing:
+        op.create_index(TIMESTAMP_INDEXES[table], table, ['timestamp'])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'net_worth' not in {column['name'] for column in inspector.get_columns('user_economy')}:
+        _add_net_worth()
+
+    for table in LOG_TABLE_INDEXES:
+        _upgrade_log_table(table)
+
+    # Duplicates left by racing get-or-create calls; the oldest row is the one the bot has been reading
+    missing = {name: spec for name, spec in UNIQUE_CONSTRAINTS.items() if name not in _unique_names(spec[0])}
+    if 'uq_user_economy_guild_user' in missing:
+        _merge_duplicates('user_economy', ['guild_id', 'user_id'])
+    if 'uq_user_items_guild_user_item' in missing:
+        _merge_duplicates('user_items', ['guild_id', 'user_id', 'item_id'],
+                          merge="quantity = (SELECT sum(d.quantity) FROM user_items d WHERE {same_key})")
+    if 'uq_user_role_income_guild_user_role' in missing:
+        _merge_duplicates('user_role_income', ['guild_id', 'user_id', 'role_income_id'],
+                          merge="last_collected = (SELECT max(d.last_collected) FROM user_role_income d WHERE {same_key})")
+
+    needs_ranking_index = 'ix_user_economy_guild_net_worth' not in _index_names('user_economy')
+    replaced = {name: index for name, (table, _, index) in missing.items() if index in _index_names(table)}
+
+    with op.get_context().autocommit_block():
+        for name, (table, columns, _) in missing.items():
+            op.create_index(name, table, columns, unique=True, postgresql_concurrently=True)
+            if bind.dialect.name == 'postgresql':
+                op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+            if name in replaced:
+                op.drop_index(replaced[name], table_name=table, postgresql_concurrently=True)
+
+        if needs_ranking_index:
+            op.create_index('ix_user_economy_guild_net_worth', 'user_economy',
+                            ['guild_id', sa.text('net_worth DESC'), 'user_id'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    # Partitioned log tables stay partitioned; only their indexes go back
+    bind = op.get_bind()
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_economy_guild_net_worth', table_name='user_economy', postgresql_concurrently=True)
+
+        for name, (table, columns, index) in UNIQUE_CONSTRAINTS.items():
+            op.create_index(index, table, ['guild_id', 'user_id'], postgresql_concurrently=True)
+            if bind.dialect.name == 'postgresql':
+                op.drop_constraint(name, table, type_='unique')
+            else:
+                op.drop_index(name, table_name=table)
+
+    for table, indexes in LOG_TABLE_INDEXES.items():
+        op.drop_index(f'ix_{table}_guild_timestamp', table_name=table)
+        for name in indexes:
+            column = name[len(f'ix_{table}_'):]
+            op.create_index(name, table, [column])
+
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('user_economy', recreate='always') as batch_op:
+            batch_op.drop_column('net_worth')
+    else:
+        op.drop_column('user_economy', 'net_worth')
@@ -43,7 +43,10 @@ async def test_database():
     try:
         print("\nTesting database connection...")
 
-        from database import db_manager
+        from database import DatabaseManager
+
+        # Run against an in-memory SQLite database unless a test database is configured
+        db_manager = DatabaseManager(database_url=os.getenv('TEST_DATABASE_URL', 'sqlite+aiosqlite:///:memory:'))
 
         # Test database connection
         await db_manager.create_tables()
@@ -66,6 +69,8 @@ async def test_database():
         })
         print("✅ User creation test successful")
 
+        await db_manager.shutdown()
+
         print("🎉 Database tests passed!")
         return True
 
@@ -0,0 +1,848 @@
+#!/usr/bin/env python3
+"""
+Test script for the database layer
+"""
+import asyncio
+import sys
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+TEST_GUILD_ID = 123456789
+
+async def create_test_database(**kwargs):
+    """Create a database manager with fresh tables, on in-memory SQLite unless a test database is configured"""
+    from database import DatabaseManager
+
+    db_manager = DatabaseManager(database_url=os.getenv('TEST_DATABASE_URL', 'sqlite+aiosqlite:///:memory:'), **kwargs)
+    await db_manager.drop_tables()
+    await db_manager.create_tables()
+    await db_manager.get_or_create_guild(TEST_GUILD_ID, {
+        'name': 'Test Guild',
+        'owner_id': 987654321,
+        'member_count': 100
+    })
+    return db_manager
+
+async def create_test_users(db_manager, *user_ids):
+    """Create the users that per-guild rows reference"""
+    for user_id in user_ids:
+        await db_manager.get_or_create_user(user_id, {
+            'username': f'user{user_id}',
+            'discriminator': '0001'
+        })
+
+async def test_config_cache():
+    """Test that guild config reads are cached and invalidated on update"""
+    try:
+        print("\nTesting guild config cache...")
+
+        db_manager = await create_test_database()
+        try:
+            assert await db_manager.get_jail_config(TEST_GUILD_ID) is None
+            assert await db_manager.get_jail_config(TEST_GUILD_ID) is None
+            stats = db_manager.get_config_cache_stats()['jail_config']
+            assert stats['misses'] == 1 and stats['negative_hits'] == 1, stats
+            print("✅ Missing config cached as a negative entry")
+
+            await db_manager.update_guild_log_config(TEST_GUILD_ID, channel_id=555, enabled=True)
+            configs = await asyncio.gather(*[db_manager.get_guild_log_config(TEST_GUILD_ID) for _ in range(5)])
+            assert all(config is configs[0] for config in configs)
+            assert db_manager.get_config_cache_stats()['log_config']['misses'] == 1
+            print("✅ Concurrent reads share one load")
+
+            await db_manager.update_jail_config(TEST_GUILD_ID, enabled=False)
+            jail_config = await db_manager.get_jail_config(TEST_GUILD_ID)
+            assert jail_config is not None and jail_config.enabled is False
+            print("✅ Updates invalidate the cached config")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Config cache tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Config cache error: {e!r}")
+        return False
+
+async def test_balance_updates():
+    """Test that concurrent balance updates are applied atomically and stay in bounds"""
+    try:
+        print("\nTesting balance updates...")
+
+        from sqlalchemy import select, func
+        from database import EconomyTransaction
+
+        db_manager = await create_test_database()
+        try:
+            user_id = 1001
+            await create_test_users(db_manager, user_id)
+            start = (await db_manager.get_or_create_user_economy(TEST_GUILD_ID, user_id)).cash
+            await asyncio.gather(*[
+                db_manager.update_user_balance(TEST_GUILD_ID, user_id, cash_change=10, reason='test')
+                for _ in range(20)
+            ])
+            economy = await db_manager.update_user_balance(TEST_GUILD_ID, user_id, bank_change=50)
+            assert economy.cash == start + 200 and economy.bank == 50, (economy.cash, economy.bank)
+            assert economy.net_worth == economy.cash + economy.bank
+            print("✅ Concurrent updates all applied")
+
+            try:
+                await db_manager.update_user_balance(TEST_GUILD_ID, user_id, cash_change=-(start + 201))
+                raise AssertionError("overdraft was accepted")
+            except ValueError:
+                pass
+            economy = await db_manager.get_or_create_user_economy(TEST_GUILD_ID, user_id)
+            assert economy.cash == start + 200
+            print("✅ Overdraft rejected without changing the balance")
+
+            async with db_manager.get_async_session() as session:
+                logged = (await session.execute(
+                    select(func.count()).select_from(EconomyTransaction).filter_by(user_id=user_id)
+                )).scalar()
+            assert logged == 21, logged
+            print("✅ One transaction logged per applied change")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Balance update tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Balance update error: {e!r}")
+        return False
+
+async def test_leaderboard_ranking():
+    """Test that the in-memory ranking matches the database and follows balance changes"""
+    try:
+        print("\nTesting leaderboard ranking...")
+
+        db_manager = await create_test_database()
+        try:
+            await create_test_users(db_manager, *range(1, 6))
+            for user_id in range(1, 6):
+                await db_manager.update_user_balance(TEST_GUILD_ID, user_id, bank_change=100 * user_id)
+
+            rows, total = await db_manager.get_leaderboard_page(TEST_GUILD_ID, page=1, per_page=3)
+            assert total == 5 and [user_id for _, user_id, _ in rows] == [5, 4, 3], rows
+            top = await db_manager.get_leaderboard(TEST_GUILD_ID, limit=3)
+            assert [(economy.user_id, economy.net_worth) for economy in top] == \
+                [(user_id, net_worth) for _, user_id, net_worth in rows]
+            print("✅ Ranking matches the database leaderboard")
+
+            await db_manager.update_user_balance(TEST_GUILD_ID, 1, bank_change=1000)
+            assert await db_manager.get_user_rank(TEST_GUILD_ID, 1) == 1
+            assert await db_manager.get_user_rank(TEST_GUILD_ID, 5) == 2
+            assert await db_manager.get_user_rank(TEST_GUILD_ID, 999) is None
+            print("✅ Balance changes move users in the loaded ranking")
+
+            await db_manager.reset_economy(TEST_GUILD_ID)
+            await db_manager.clean_leaderboard(TEST_GUILD_ID)
+            assert await db_manager.get_leaderboard_page(TEST_GUILD_ID) == ([], 0)
+            print("✅ Resets drop the cached ranking")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Leaderboard tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Leaderboard error: {e!r}")
+        return False
+
+async def test_retention():
+    """Test that retention purges expired rows in batches and keeps recent ones"""
+    try:
+        print("\nTesting retention...")
+
+        from datetime import datetime, timedelta
+        from sqlalchemy import select, func
+        from database import CommandUsage, RateLimit
+
+        db_manager = await create_test_database()
+        try:
+            await create_test_users(db_manager, 1)
+            expired = datetime.utcnow() - timedelta(days=200)
+            async with db_manager.get_async_session() as session:
+                session.add_all([
+                    CommandUsage(guild_id=TEST_GUILD_ID, user_id=1, command_name='ping', execution_time=1, timestamp=expired)
+                    for _ in range(25)
+                ])
+                session.add_all([
+                    CommandUsage(guild_id=TEST_GUILD_ID, user_id=1, command_name='ping', execution_time=1)
+                    for _ in range(5)
+                ])
+                session.add_all([RateLimit(user_id=1, command_name='ping', window_end=expired) for _ in range(3)])
+                await session.commit()
+
+            report = await db_manager.run_retention(batch_size=10, pause=0)
+            assert report['command_usage'] == 25 and report['rate_limits'] == 3, report
+            async with db_manager.get_async_session() as session:
+                remaining = (await session.execute(select(func.count()).select_from(CommandUsage))).scalar()
+            assert remaining == 5, remaining
+            print("✅ Expired rows purged across several batches")
+
+            try:
+                db_manager.set_retention_days('guilds', 1)
+                raise AssertionError("retention accepted a table without a policy")
+            except ValueError:
+                pass
+            for _ in range(2):
+                await db_manager.update_user_balance(TEST_GUILD_ID, 1, cash_change=5, reason='test')
+            db_manager.set_retention_days('economy_transactions', 0)
+            assert (await db_manager.run_retention(pause=0))['economy_transactions'] == 2
+            print("✅ Retention periods are configurable per table")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Retention tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Retention error: {e!r}")
+        return False
+
+async def test_log_partitions():
+    """Test monthly log partitions on PostgreSQL and the chunked fallback elsewhere"""
+    try:
+        print("\nTesting log partitions...")
+
+        from datetime import datetime, timedelta
+        from sqlalchemy import select, text
+        from database import LogEntry
+
+        db_manager = await create_test_database()
+        try:
+            log_config = await db_manager.update_guild_log_config(TEST_GUILD_ID, channel_id=555, enabled=True)
+            await db_manager.log_event(TEST_GUILD_ID, 'test', 'Recent', 'Kept by retention')
+            await db_manager.ensure_partitions(months_ahead=1)
+
+            # Far older than any monthly partition, so PostgreSQL routes it to DEFAULT
+            async with db_manager.get_async_session() as session:
+                session.add(LogEntry(guild_id=TEST_GUILD_ID, log_config_id=log_config.id, event_type='test',
+                                     title='Old', description='Purged by retention',
+                                     timestamp=datetime.utcnow() - timedelta(days=400)))
+                await session.commit()
+
+            if db_manager._dialect_name == 'postgresql':
+                async with db_manager.get_async_session() as session:
+                    result = await session.execute(text(
+                        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'log_entries'"
+                    ))
+                    partitions = set(result.scalars().all())
+                assert {f"log_entries_p{datetime.utcnow():%Y%m}", 'log_entries_default'} <= partitions, partitions
+                print("✅ Current month and default partitions exist")
+            else:
+                assert await db_manager.drop_expired_partitions('log_entries', datetime.utcnow()) == 0
+
+            assert await db_manager.cleanup_old_logs(days=30) == 1
+            async with db_manager.get_async_session() as session:
+                titles = (await session.execute(select(LogEntry.title))).scalars().all()
+            assert titles == ['Recent'], titles
+            print("✅ Old logs are purged, including rows outside every monthly partition")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Log partition tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Log partition error: {e!r}")
+        return False
+
+async def test_database_stats():
+    """Test that database stats are counted in one snapshot and cached briefly"""
+    try:
+        print("\nTesting database stats...")
+
+        from datetime import datetime, timedelta
+        from database import LogEntry
+
+        db_manager = await create_test_database()
+        try:
+            await db_manager.get_or_create_user(1, {'username': 'first', 'discriminator': '0001'})
+            await db_manager.jail_user(TEST_GUILD_ID, 1, moderator_id=2, reason='test')
+
+            log_config = await db_manager.update_guild_log_config(TEST_GUILD_ID, channel_id=555, enabled=True)
+            await db_manager.log_event(TEST_GUILD_ID, 'test', 'Recent', 'Counted')
+            async with db_manager.get_async_session() as session:
+                session.add(LogEntry(guild_id=TEST_GUILD_ID, log_config_id=log_config.id, event_type='test',
+                                     title='Old', description='Not counted',
+                                     timestamp=datetime.utcnow() - timedelta(days=2)))
+                await session.commit()
+
+            stats = await db_manager.get_database_stats()
+            assert stats['guilds'] == 1 and stats['users'] == 1 and stats['active_jails'] == 1, stats
+            assert stats['recent_logs_24h'] == 1, stats
+            assert 'ix_log_entries_timestamp' in {index.name for index in LogEntry.__table__.indexes}
+            assert stats['estimated_tables'] == []
+            print("✅ Row counts, recent logs and active jails reported")
+
+            await db_manager.get_or_create_user(2, {'username': 'second', 'discriminator': '0002'})
+            assert (await db_manager.get_database_stats())['users'] == 1
+            assert (await db_manager.get_database_stats(use_cache=False))['users'] == 2
+            print("✅ Snapshot cached until refreshed")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Database stats tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Database stats error: {e!r}")
+        return False
+
+async def test_inventory_upserts():
+    """Test inventory upserts, bulk grants and removals, and the store catalog cache"""
+    try:
+        print("\nTesting inventory operations...")
+
+        db_manager = await create_test_database()
+        try:
+            await create_test_users(db_manager, 1, 2, 3)
+            sword = await db_manager.create_store_item(TEST_GUILD_ID, 'Sword', 'Sharp', 100)
+            shield = await db_manager.create_store_item(TEST_GUILD_ID, 'Shield', 'Sturdy', 80)
+            assert [item.name for item in await db_manager.get_store_items(TEST_GUILD_ID)] == ['Sword', 'Shield']
+            await db_manager.get_store_items(TEST_GUILD_ID)
+            assert db_manager.get_config_cache_stats()['store_items']['hits'] == 1
+            print("✅ Store catalog served from cache")
+
+            await db_manager.add_item_to_inventory(TEST_GUILD_ID, 1, sword.id)
+            await db_manager.add_item_to_inventory(TEST_GUILD_ID, 1, sword.id, quantity=2)
+            inventory = await db_manager.get_user_inventory(TEST_GUILD_ID, 1)
+            assert [(item.item_id, item.quantity) for item in inventory] == [(sword.id, 3)]
+            print("✅ Repeated grants add to one inventory row")
+
+            written = await db_manager.bulk_add_items(TEST_GUILD_ID, [1, 2, 3, 2], {sword.id: 1, shield.id: 2}, batch_size=2)
+            assert written == 6, written
+            removed = await db_manager.bulk_remove_items(TEST_GUILD_ID, [1, 2, 3], {sword.id: 2, shield.id: 2})
+            assert {item_id: sorted(user_ids) for item_id, user_ids in removed.items()} == \
+                {sword.id: [1], shield.id: [1, 2, 3]}, removed
+            assert await db_manager.remove_item_from_inventory(TEST_GUILD_ID, 2, sword.id)
+            assert not await db_manager.remove_item_from_inventory(TEST_GUILD_ID, 2, sword.id)
+            assert await db_manager.get_user_inventory(TEST_GUILD_ID, 2) == []
+            print("✅ Bulk removals only charge users holding enough")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Inventory tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Inventory error: {e!r}")
+        return False
+
+async def test_role_income():
+    """Test that role income is paid once per cooldown across all of a member's roles"""
+    try:
+        print("\nTesting role income...")
+
+        db_manager = await create_test_database()
+        try:
+            await create_test_users(db_manager, 1, 2, 3, 4, 5)
+            await db_manager.set_role_income(TEST_GUILD_ID, 10, 100, cooldown=3600)
+            await db_manager.set_role_income(TEST_GUILD_ID, 20, 50, cooldown=3600)
+            start = (await db_manager.get_or_create_user_economy(TEST_GUILD_ID, 1)).cash
+
+            paid = await db_manager.collect_all_role_income(TEST_GUILD_ID, 1, [10, 20, 30])
+            assert paid == {10: 100, 20: 50}, paid
+            assert await db_manager.collect_all_role_income(TEST_GUILD_ID, 1, [10, 20]) == {}
+            assert (await db_manager.get_or_create_user_economy(TEST_GUILD_ID, 1)).cash == start + 150
+            print("✅ Every eligible role paid in one collection")
+
+            results = await asyncio.gather(*[
+                db_manager.collect_all_role_income(TEST_GUILD_ID, 2, [10]) for _ in range(5)
+            ])
+            assert sum(1 for paid in results if paid) == 1, results
+            print("✅ Concurrent collections pay once")
+
+            paid = await db_manager.payout_role_income(TEST_GUILD_ID, {1: [10], 3: [10, 20], 4: [30]})
+            assert paid == {3: 150}, paid
+            print("✅ Bulk payout skips members on cooldown")
+
+            await db_manager.update_economy_settings(TEST_GUILD_ID, max_balance=1000)
+            capped = await db_manager.get_or_create_user_economy(TEST_GUILD_ID, 5)
+            await db_manager.update_user_balance(TEST_GUILD_ID, 5, cash_change=1000 - capped.cash)
+            assert await db_manager.payout_role_income(TEST_GUILD_ID, {5: [10]}) == {}
+            await db_manager.update_user_balance(TEST_GUILD_ID, 5, cash_change=-500)
+            assert await db_manager.payout_role_income(TEST_GUILD_ID, {5: [10]}) == {5: 100}
+            print("✅ Members at the balance cap keep their cooldown")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Role income tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Role income error: {e!r}")
+        return False
+
+async def test_chat_money():
+    """Test chat-money cooldowns, batched settlement, crediting up to the balance cap and settings lookups"""
+    try:
+        print("\nTesting chat money...")
+
+        from sqlalchemy import select
+        import economy
+        from economy import ChatMoneyEngine
+        from database import EconomyTransaction, EconomySettings
+
+        db_manager = await create_test_database()
+        global_db_manager = economy.db_manager
+        economy.db_manager = db_manager
+        try:
+            await create_test_users(db_manager, 1, 2, 999)
+            settings = await db_manager.update_economy_settings(
+                TEST_GUILD_ID, chat_money_enabled=True, chat_money_min=5, chat_money_max=5,
+                chat_money_cooldown=60, max_balance=110
+            )
+            start = settings.start_balance
+            engine = ChatMoneyEngine()
+
+            assert await engine.handle_message(TEST_GUILD_ID, 1, 555) == 5
+            assert await engine.handle_message(TEST_GUILD_ID, 1, 555) == 0
+            assert await engine.handle_message(TEST_GUILD_ID, 2, 555) == 5
+            assert engine.get_pending(TEST_GUILD_ID, 1) == 5
+            print("✅ Cooldowns applied in memory")
+
+            assert await engine.flush() == 2
+            assert engine.get_pending(TEST_GUILD_ID, 1) == 0
+            assert (await db_manager.get_or_create_user_economy(TEST_GUILD_ID, 1)).cash == start + 5
+            print("✅ Pending earnings settled in one batch")
+
+            assert await db_manager.settle_chat_money(TEST_GUILD_ID, {1: 10, 999: 3}) == {1: 5, 999: 3}
+            assert await db_manager.settle_chat_money(TEST_GUILD_ID, {1: 10}) == {}
+            economy_row = await db_manager.get_or_create_user_economy(TEST_GUILD_ID, 1)
+            assert economy_row.cash == 110 and economy_row.total_earned == 10, (economy_row.cash, economy_row.total_earned)
+            async with db_manager.get_async_session() as session:
+                amounts = (await session.execute(
+                    select(EconomyTransaction.amount).filter_by(user_id=1, type='chat_money').order_by(EconomyTransaction.id)
+                )).scalars().all()
+            assert amounts == [5, 5], amounts
+            print("✅ Only the amount under the cap is credited and logged")
+
+            capped_engine = ChatMoneyEngine()
+            assert await capped_engine.handle_message(TEST_GUILD_ID, 1, 555) == 5
+            assert await capped_engine.flush() == 0 and capped_engine.get_stats()['settled_amount'] == 0
+            assert engine.get_stats()['settled_amount'] == 10
+            print("✅ Settled amounts count only what was credited")
+
+            other_guild = TEST_GUILD_ID + 1
+            assert await engine.handle_message(other_guild, 1, 555) == 0
+            async with db_manager.get_async_session() as session:
+                rows = (await session.execute(select(EconomySettings).filter_by(guild_id=other_guild))).scalars().all()
+            assert rows == [], rows
+            print("✅ Messages never create economy settings")
+
+            calls = 0
+
+            async def failing_get_economy_settings(guild_id):
+                nonlocal calls
+                calls += 1
+                raise RuntimeError("database unavailable")
+
+            db_manager.get_economy_settings = failing_get_economy_settings
+            failing_engine = ChatMoneyEngine()
+            for _ in range(3):
+                assert await failing_engine.handle_message(TEST_GUILD_ID, 3, 555) == 0
+            assert calls == 1, calls
+            print("✅ Settings load failures disable the guild and back off")
+        finally:
+            economy.db_manager = global_db_manager
+            await db_manager.shutdown()
+
+        print("🎉 Chat money tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Chat money error: {e!r}")
+        return False
+
+async def test_replica_routing():
+    """Test that reads go to a healthy replica except right after writes"""
+    try:
+        print("\nTesting replica routing...")
+
+        import tempfile
+        from sqlalchemy import text
+        from database import DatabaseManager
+
+        async def replies(db_manager):
+            return [reply.reply for reply in await db_manager.get_custom_replies(TEST_GUILD_ID, 'hug', 'text')]
+
+        with tempfile.TemporaryDirectory() as directory:
+            replica_url = f"sqlite+aiosqlite:///{os.path.join(directory, 'replica.db')}"
+            replica = DatabaseManager(database_url=replica_url)
+            await replica.create_tables()
+            await replica.add_custom_reply(TEST_GUILD_ID, 'hug', 'text', 'replica')
+            await replica.shutdown()
+
+            db_manager = await create_test_database(replica_urls=[replica_url], replica_lag_window=0.2)
+            try:
+                await db_manager.add_custom_reply(TEST_GUILD_ID, 'hug', 'text', 'primary')
+                assert await replies(db_manager) == ['primary']
+                print("✅ Reads after a write stay on the primary")
+
+                await asyncio.sleep(0.3)
+                assert await replies(db_manager) == ['replica']
+                print("✅ Reads return to the replica once the lag window passes")
+
+                db_manager._mark_replica(0, False)
+                assert await replies(db_manager) == ['primary']
+                db_manager._mark_replica(0, True)
+                assert await replies(db_manager) == ['replica']
+                print("✅ Unhealthy replicas fall back to the primary without pinning")
+
+                with db_manager.pin_primary():
+                    assert await replies(db_manager) == ['primary']
+                assert await db_manager.check_replicas() == [True]
+                print("✅ Explicit pins and health checks work")
+
+                async with db_manager.get_async_session() as session:
+                    await session.execute(text("SELECT 1"))
+                assert await replies(db_manager) == ['replica']
+                print("✅ Primary sessions that only read don't pin")
+
+                await asyncio.create_task(db_manager.add_custom_reply(TEST_GUILD_ID, 'pat', 'text', 'primary'))
+                assert await replies(db_manager) == ['primary']
+                print("✅ A write in another task keeps reads on the primary")
+            finally:
+                await db_manager.shutdown()
+
+        print("🎉 Replica routing tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Replica routing error: {e!r}")
+        return False
+
+async def test_startup():
+    """Test that engines are created lazily and startup brings the schema up to date"""
+    try:
+        print("\nTesting startup and shutdown...")
+
+        from sqlalchemy import text
+        from database import DatabaseManager
+
+        db_manager = DatabaseManager(database_url=os.getenv('TEST_DATABASE_URL', 'sqlite+aiosqlite:///:memory:'))
+        assert db_manager._async_engine is None
+        print("✅ No engine created before first use")
+
+        try:
+            await db_manager.startup(retention_interval=None)
+            await db_manager.startup(retention_interval=None)
+            async with db_manager.get_async_session() as session:
+                revision = (await session.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+            assert revision is not None
+            guild = await db_manager.get_or_create_guild(TEST_GUILD_ID, {'name': 'Test Guild', 'owner_id': 1})
+            assert guild.id == TEST_GUILD_ID
+            print(f"✅ Startup migrated the schema to revision {revision}")
+        finally:
+            await db_manager.shutdown()
+
+        assert db_manager._async_engine is None
+        print("✅ Shutdown disposed the engine")
+
+        print("🎉 Startup tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Startup error: {e!r}")
+        return False
+
+async def test_query_instrumentation():
+    """Test that statements are grouped by shape and attributed to the calling method"""
+    try:
+        print("\nTesting query instrumentation...")
+
+        from database import normalize_sql
+
+        assert normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'") == \
+            normalize_sql("SELECT *\nFROM t WHERE id IN (4, 5) AND name = 'y'")
+        print("✅ Literals and IN lists normalized")
+
+        db_manager = await create_test_database(slow_query_ms=0)
+        try:
+            db_manager.reset_query_stats()
+            await db_manager.get_custom_replies(TEST_GUILD_ID, 'hug', 'text')
+            await db_manager.get_custom_replies(TEST_GUILD_ID, 'pat', 'text')
+
+            stats = db_manager.get_query_stats()
+            methods = {entry['name']: entry for entry in stats['methods']}
+            assert methods['get_custom_replies']['count'] == 2, methods
+            select_stats = [entry for entry in stats['statements'] if 'custom_replies' in entry['name']]
+            assert len(select_stats) == 1 and select_stats[0]['count'] == 2, select_stats
+            assert select_stats[0]['methods'] == ['get_custom_replies']
+            assert stats['slow_queries'] and stats['pool_wait']['count'] == 2
+            print("✅ Statement shapes attributed to their method")
+
+            db_manager.set_query_instrumentation(False)
+            db_manager.reset_query_stats()
+            await db_manager.get_custom_replies(TEST_GUILD_ID, 'hug', 'text')
+            assert db_manager.get_query_stats()['statement_count'] == 0
+            print("✅ Instrumentation can be switched off")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Query instrumentation tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Query instrumentation error: {e!r}")
+        return False
+
+async def test_sqlite_profile():
+    """Test the embedded SQLite profile: WAL pragmas and queued concurrent writers"""
+    try:
+        print("\nTesting SQLite profile...")
+
+        import tempfile
+        from sqlalchemy import text
+        from database import DatabaseManager
+
+        with tempfile.TemporaryDirectory() as directory:
+            db_manager = DatabaseManager(database_url=f"sqlite+aiosqlite:///{os.path.join(directory, 'bot.db')}")
+            try:
+                await db_manager.startup(retention_interval=None)
+                async with db_manager.get_async_session(readonly=True) as session:
+                    journal_mode = (await session.execute(text("PRAGMA journal_mode"))).scalar()
+                    synchronous = (await session.execute(text("PRAGMA synchronous"))).scalar()
+                assert journal_mode == 'wal' and synchronous == 1, (journal_mode, synchronous)
+                print("✅ WAL journal and tuned pragmas applied")
+
+                await asyncio.gather(*[
+                    db_manager.update_user_balance(TEST_GUILD_ID, user_id % 5, cash_change=1)
+                    for user_id in range(50)
+                ])
+                leaderboard = await db_manager.get_leaderboard(TEST_GUILD_ID)
+                start = (await db_manager.get_or_create_economy_settings(TEST_GUILD_ID)).start_balance
+                assert sorted(economy.cash for economy in leaderboard) == [start + 10] * 5
+                print("✅ Concurrent writers queued without lock errors")
+
+                await db_manager.update_game_settings(TEST_GUILD_ID)
+                held, release = asyncio.Event(), asyncio.Event()
+
+                async def hold_writer():
+                    async with db_manager.get_async_session():
+                        held.set()
+                        await release.wait()
+
+                writer = asyncio.create_task(hold_writer())
+                await held.wait()
+                try:
+                    other_guild = TEST_GUILD_ID + 1
+                    await asyncio.wait_for(asyncio.gather(
+                        db_manager.get_guild_log_config(other_guild),
+                        db_manager.get_jail_config(other_guild),
+                        db_manager.get_economy_settings(other_guild),
+                        db_manager.get_store_items(other_guild),
+                        db_manager.get_leaderboard(other_guild),
+                        db_manager.get_game_settings(TEST_GUILD_ID),
+                    ), timeout=5)
+                finally:
+                    release.set()
+                    await writer
+                print("✅ Cached loaders don't wait for the writer")
+            finally:
+                await db_manager.shutdown()
+
+        print("🎉 SQLite profile tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ SQLite profile error: {e!r}")
+        return False
+
+async def test_jail_records():
+    """Test that jail state and moderation history persist in the database"""
+    try:
+        print("\nTesting jail records...")
+
+        import json
+
+        db_manager = await create_test_database()
+        try:
+            await create_test_users(db_manager, 1, 2)
+            await db_manager.jail_user(TEST_GUILD_ID, 1, moderator_id=99, reason='spam', original_roles=[10, 20])
+            try:
+                await db_manager.jail_user(TEST_GUILD_ID, 1, moderator_id=99)
+                raise AssertionError("user was jailed twice")
+            except ValueError:
+                pass
+            records = await db_manager.get_all_active_jail_records()
+            assert [(record.user_id, json.loads(record.original_roles)) for record in records] == [(1, [10, 20])]
+            print("✅ Active jail stored with the original roles")
+
+            released = await db_manager.unjail_user(TEST_GUILD_ID, 1)
+            assert released is not None and released.released_at is not None
+            assert await db_manager.unjail_user(TEST_GUILD_ID, 1) is None
+            assert await db_manager.get_active_jail_records(TEST_GUILD_ID) == []
+            print("✅ Release clears the active jail")
+
+            await db_manager.add_warning(TEST_GUILD_ID, 1, moderator_id=99, reason='rude')
+            await db_manager.add_warning(TEST_GUILD_ID, 2, moderator_id=99)
+            history = await db_manager.get_moderation_history(TEST_GUILD_ID)
+            assert history == {1: {'warnings': 1, 'jails': 1}, 2: {'warnings': 1, 'jails': 0}}, history
+            print("✅ Moderation history counts warnings and jails")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Jail record tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Jail record error: {e!r}")
+        return False
+
+async def test_raid_lockdowns():
+    """Test that raid lockdowns keep the verification level to restore across restarts"""
+    try:
+        print("\nTesting raid lockdowns...")
+
+        from datetime import datetime, timedelta
+
+        db_manager = await create_test_database()
+        try:
+            ends_at = datetime.utcnow() + timedelta(minutes=10)
+            await db_manager.save_raid_lockdown(TEST_GUILD_ID, 1, ends_at)
+            await db_manager.save_raid_lockdown(TEST_GUILD_ID, 2, ends_at + timedelta(minutes=5))
+            lockdowns = await db_manager.get_all_raid_lockdowns()
+            assert [(lockdown.guild_id, lockdown.previous_verification_level) for lockdown in lockdowns] == \
+                [(TEST_GUILD_ID, 2)]
+            assert (await db_manager.get_raid_lockdown(TEST_GUILD_ID)).ends_at == ends_at + timedelta(minutes=5)
+            print("✅ One lockdown per guild with the level to restore")
+
+            assert await db_manager.delete_raid_lockdown(TEST_GUILD_ID)
+            assert not await db_manager.delete_raid_lockdown(TEST_GUILD_ID)
+            assert await db_manager.get_raid_lockdown(TEST_GUILD_ID) is None
+            assert await db_manager.get_all_raid_lockdowns() == []
+            print("✅ Lifted lockdowns are forgotten")
+        finally:
+            await db_manager.shutdown()
+
+        print("🎉 Raid lockdown tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Raid lockdown error: {e!r}")
+        return False
+
+async def test_migrations():
+    """Test that a database created before migrations is stamped, de-duplicated and upgraded"""
+    try:
+        print("\nTesting schema migrations...")
+
+        import tempfile
+        from alembic import command
+        from alembic.config import Config
+        from sqlalchemy import inspect, text
+        from database import DatabaseManager, ALEMBIC_INI, MIGRATIONS_DIR, BASELINE_REVISION
+
+        def build_legacy_schema(connection):
+            alembic_cfg = Config(ALEMBIC_INI)
+            alembic_cfg.set_main_option('script_location', MIGRATIONS_DIR)
+            alembic_cfg.attributes['connection'] = connection
+            connection.commit()
+            command.upgrade(alembic_cfg, BASELINE_REVISION)
+            # create_all never recorded a revision
+            connection.execute(text("DROP TABLE alembic_version"))
+            connection.execute(text(
+                "INSERT INTO user_economy (guild_id, user_id, cash, bank, total_earned) "
+                "VALUES (1, 10, 50, 5, 0), (1, 10, 70, 0, 0), (1, 11, 30, 0, 0)"
+            ))
+            connection.execute(text(
+                "INSERT INTO user_items (guild_id, user_id, item_id, quantity) VALUES (1, 10, 7, 2), (1, 10, 7, 3)"
+            ))
+
+        with tempfile.TemporaryDirectory() as directory:
+            db_manager = DatabaseManager(database_url=f"sqlite+aiosqlite:///{os.path.join(directory, 'legacy.db')}")
+            try:
+                async with db_manager.async_engine.connect() as connection:
+                    await connection.run_sync(build_legacy_schema)
+                    await connection.commit()
+
+                await db_manager.create_tables()
+                async with db_manager.async_engine.connect() as connection:
+                    wallets = (await connection.execute(text(
+                        "SELECT user_id, cash, net_worth FROM user_economy ORDER BY user_id"
+                    ))).all()
+                    items = (await connection.execute(text("SELECT user_id, quantity FROM user_items"))).all()
+                    indexes = await connection.run_sync(
+                        lambda sync_connection: {index['name'] for index in inspect(sync_connection).get_indexes('user_economy')}
+                    )
+                assert [tuple(row) for row in wallets] == [(10, 50, 55), (11, 30, 30)], wallets
+                assert [tuple(row) for row in items] == [(10, 5)], items
+                assert 'ix_user_economy_guild_net_worth' in indexes, indexes
+                print("✅ Legacy schema stamped, duplicates merged and net worth added")
+
+                await db_manager.add_item_to_inventory(1, 10, 7, quantity=1)
+                assert [item.quantity for item in await db_manager.get_user_inventory(1, 10)] == [6]
+                assert [economy.user_id for economy in await db_manager.get_leaderboard(1)] == [10, 11]
+                print("✅ Upserts and rankings work on the migrated schema")
+
+                await db_manager.create_tables()
+                print("✅ Re-running migrations is a no-op")
+            finally:
+                await db_manager.shutdown()
+
+        print("🎉 Migration tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Migration error: {e!r}")
+        return False
+
+async def main():
+    """Run all tests"""
+    print("🚀 Starting Database Tests")
+    print("=" * 50)
+
+    tests = [
+        test_config_cache,
+        test_balance_updates,
+        test_leaderboard_ranking,
+        test_retention,
+        test_log_partitions,
+        test_database_stats,
+        test_inventory_upserts,
+        test_role_income,
+        test_chat_money,
+        test_replica_routing,
+        test_startup,
+        test_query_instrumentation,
+        test_sqlite_profile,
+        test_jail_records,
+        test_raid_lockdowns,
+        test_migrations,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if await test():
+                passed += 1
+        except Exception as e:
+            print(f"❌ Test failed with exception: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("🎉 All database tests passed!")
+        return True
+    else:
+        print("⚠️  Some tests failed. Please check the errors above.")
+        return False
+
+if __name__ == "__main__":
+    # Run tests
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
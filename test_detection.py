@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Test script for the threat detection components
+"""
+import asyncio
+import sys
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+async def create_test_database():
+    """Point the detection module at a fresh database, on in-memory SQLite unless a test database is configured"""
+    import detection
+    from database import DatabaseManager
+
+    db_manager = DatabaseManager(database_url=os.getenv('TEST_DATABASE_URL', 'sqlite+aiosqlite:///:memory:'))
+    await db_manager.drop_tables()
+    await db_manager.create_tables()
+    detection.db_manager = db_manager
+    return db_manager
+
+async def release_test_database(db_manager):
+    """Close a test database and restore the global database manager"""
+    import database
+    import detection
+
+    detection.db_manager = database.db_manager
+    await db_manager.shutdown()
+
+async def test_combined_scanner():
+    """Test that one combined scan finds what the separate patterns find"""
+    try:
+        print("\nTesting combined pattern scanner...")
+
+        from detection import PatternMatcher
+
+        matcher = PatternMatcher()
+        text = ("join discord.gg/abc123 or http://scam.example.com now @everyone, "
+                "mail me at someone@example.com !eval")
+        matches = matcher.match_patterns(text)
+        for name in ('discord_invites', 'suspicious_urls', 'mass_mentions', 'email_addresses', 'suspicious_commands'):
+            expected = matcher._compiled_patterns[name].findall(text)
+            assert expected and matches.get(name) == expected, (name, matches.get(name), expected)
+        print("✅ Combined scan matches the individual patterns")
+
+        only_invites = matcher.match_patterns(text, frozenset({'discord_invites'}))
+        assert list(only_invites) == ['discord_invites'], only_invites
+        assert matcher.match_patterns("just a friendly hello") == {}
+        print("✅ Category filters and trigger pre-checks work")
+
+        assert matcher.has_risk_markers("see https://example.com")
+        assert not matcher.has_risk_markers("nothing to see")
+        scanners = len(matcher._scanners)
+        matcher.match_patterns(text)
+        assert len(matcher._scanners) == scanners
+        print("✅ Combined scanners compiled once per category set")
+
+        print("🎉 Combined scanner tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Combined scanner error: {e!r}")
+        return False
+
+async def test_spam_detectors():
+    """Test the linear-time spam run and repeated-message detectors"""
+    try:
+        print("\nTesting spam detectors...")
+
+        import time
+        from detection import PatternMatcher
+
+        matcher = PatternMatcher()
+        assert matcher.match_patterns("nooooooooooooooo way")['spam_patterns'] == ['o']
+        assert matcher.match_patterns("hahahahahahahaha")['spam_patterns'] == ['ha']
+        assert 'spam_patterns' not in matcher.match_patterns("hahaha that is funny")
+        print("✅ Character and unit runs detected")
+
+        assert matcher.match_patterns("buy my stuff " * 4)['repeated_messages'] == ["buy my stuff " * 2]
+        assert 'repeated_messages' not in matcher.match_patterns("a perfectly normal sentence here")
+        print("✅ Whole-message repeats detected")
+
+        # Inputs that make backtracking patterns blow up
+        hostile = ["a" * 3999 + "!", "ab" * 1999 + "x", "@" * 4000, "1." * 2000, "A" * 19 + "a" * 3981]
+        start = time.perf_counter()
+        for text in hostile:
+            matcher.match_patterns(text)
+        elapsed = time.perf_counter() - start
+        assert elapsed < 1.0, elapsed
+        print(f"✅ Hostile inputs scanned in {elapsed * 1000:.1f} ms")
+
+        print("🎉 Spam detector tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Spam detector error: {e!r}")
+        return False
+
+async def test_rate_limiter():
+    """Test window counts, trimming and per-key caps of the rate limiter"""
+    try:
+        print("\nTesting rate limiter...")
+
+        import time
+        from detection import RateLimiter
+
+        limiter = RateLimiter(max_age=50, max_actions_per_key=3)
+        for _ in range(2):
+            limiter.record_action(1, 10, 'message')
+        limiter.record_action(2, 10, 'message')
+        assert limiter.is_rate_limited(1, 10, 'message', threshold=3, window=60) == (True, 3)
+        assert limiter.is_rate_limited(2, 10, 'message', threshold=3, window=60) == (False, 2)
+        assert limiter.is_rate_limited(3, None, 'message', threshold=1, window=60) == (False, 0)
+        print("✅ User and guild actions counted per window")
+
+        timestamps = limiter._user_actions[1].actions['message']
+        timestamps.appendleft(time.time() - 30)
+        assert limiter.get_user_stats(1, time_window=20) == {'message': 2}
+        assert limiter.get_user_stats(1, time_window=40) == {'message': 3}
+        timestamps.appendleft(time.time() - 100)
+        limiter.record_action(1, None, 'message')
+        assert len(timestamps) == 3 and timestamps[0] > time.time() - 50
+        print("✅ Windows counted by bisect and old actions trimmed")
+
+        for _ in range(10):
+            limiter.record_action(4, None, 'message')
+        assert limiter.get_user_stats(4) == {'message': 3}
+        print("✅ Actions per key capped")
+
+        print("🎉 Rate limiter tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Rate limiter error: {e!r}")
+        return False
+
+async def test_state_eviction():
+    """Test that idle and excess detection state is evicted"""
+    try:
+        print("\nTesting detection state bounds...")
+
+        from detection import RateLimiter, ThreatDetector, DetectionEvent, DetectionType, ThreatLevel
+
+        limiter = RateLimiter(max_users=2, max_guilds=1)
+        for user_id in (1, 2, 3):
+            limiter.record_action(user_id, user_id * 10, 'message')
+        stats = limiter.get_stats()
+        assert stats['tracked_users'] == 2 and stats['tracked_guilds'] == 1, stats
+        assert 1 not in limiter._user_actions and stats['capacity_evictions'] == 3
+        print("✅ Least recently active keys evicted at the cap")
+
+        limiter._user_actions[2].last_seen -= limiter.max_age + 1
+        limiter.record_action(3, None, 'message')
+        assert list(limiter._user_actions) == [3] and limiter.get_stats()['idle_evictions'] == 1
+        print("✅ Idle keys evicted as new actions arrive")
+
+        detector = ThreatDetector()
+        detector.max_active_detections = 2
+        events = [
+            DetectionEvent(guild_id=1, user_id=user_id, detection_type=DetectionType.SPAM,
+                           threat_level=ThreatLevel.LOW, confidence=0.5, details={})
+            for user_id in range(3)
+        ]
+        for event in events:
+            detector._track_detection(event.event_id, event)
+        assert list(detector.active_detections) == [events[1].event_id, events[2].event_id]
+        assert detector.dropped_detections == 1 and detector._active_by_guild[1] == 2
+
+        await detector.resolve_threat(events[2].event_id, 'false_positive', moderator_id=99)
+        assert detector._active_by_guild[1] == 1 and events[2].resolved
+        print("✅ Unresolved detections capped and released on resolve")
+
+        print("🎉 Detection state tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Detection state error: {e!r}")
+        return False
+
+async def test_near_duplicates():
+    """Test MinHash near-duplicate detection across users and channels"""
+    try:
+        print("\nTesting near-duplicate detection...")
+
+        from detection import NearDuplicateDetector
+
+        detector = NearDuplicateDetector()
+        spam = "Free nitro for everyone, claim it now at the link below before it runs out"
+        assert detector.fingerprint("hi there") is None
+        assert detector.fingerprint(spam.upper() + "!!!") == detector.fingerprint(spam)
+        assert detector.fingerprint(spam + ", <@!123456789> <#555>") == detector.fingerprint(spam)
+        print("✅ Fingerprints ignore case, punctuation and mentions")
+
+        assert detector.observe(1, 100, 10, spam) is None
+        assert detector.observe(1, 100, 11, spam) is None
+        cluster = detector.observe(1, 101, 12, "<@123456789> " + spam.upper() + "s <:nitro:987654321>")
+        assert cluster is not None and cluster['users'] == 2 and cluster['channels'] == 3, cluster
+        assert cluster['messages'] == 3
+        print("✅ Edited copies from another user join the cluster")
+
+        assert detector.observe(2, 102, 20, spam) is None
+        assert detector.observe(1, 103, 10, "Does anyone know when the next community game night starts?") is None
+        print("✅ Other guilds and unrelated messages don't match")
+
+        assert detector.observe(1, 104, 10, spam, window=0) is None
+        assert detector.get_stats()['indexed_messages'] == 2
+        print("✅ Expired messages leave the window")
+
+        print("🎉 Near-duplicate tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Near-duplicate error: {e!r}")
+        return False
+
+async def test_join_raids():
+    """Test rolling join counters and raid detection from member joins"""
+    try:
+        print("\nTesting join raid detection...")
+
+        from datetime import datetime, timedelta
+        from detection import JoinRaidDetector, ThreatDetector, DetectionType
+
+        raids = JoinRaidDetector()
+        for age_days in (0.5, 2, 3, 400):
+            stats = raids.record_join(1, age_days, window=30)
+        assert stats['joins'] == 4 and stats['young_accounts'] == 3, stats
+        assert stats['age_histogram'] == {'<1d': 1, '<7d': 2, '<30d': 0, '<365d': 0, '>=365d': 1}
+        guild_window = raids._guilds[1]
+        guild_window.advance(guild_window.last_second + 30)
+        assert raids.record_join(1, 400, window=30)['joins'] == 1
+        print("✅ Joins counted per rolling window and account age")
+
+        db_manager = await create_test_database()
+        try:
+            detector = ThreatDetector()
+            young = datetime.utcnow() - timedelta(hours=6)
+            events = [
+                await detector.analyze_join({'guild_id': 2, 'user_id': user_id, 'account_created_at': young})
+                for user_id in range(12)
+            ]
+            assert events[:9] == [None] * 9 and events[10:] == [None, None], events
+            assert events[9].detection_type == DetectionType.RAID
+            assert events[9].details['join_stats']['young_accounts'] == 10
+            assert detector.is_under_raid(2) and not detector.is_under_raid(1)
+            print("✅ Burst of young accounts reported once as a raid")
+        finally:
+            await release_test_database(db_manager)
+
+        print("🎉 Join raid tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Join raid error: {e!r}")
+        return False
+
+async def test_user_context():
+    """Test that member context is cached and moderation history loaded once per guild"""
+    try:
+        print("\nTesting user context provider...")
+
+        from datetime import datetime, timedelta, timezone
+        from detection import UserContextProvider
+
+        db_manager = await create_test_database()
+        try:
+            await db_manager.get_or_create_guild(1, {'name': 'Test Guild', 'owner_id': 99})
+            await db_manager.get_or_create_user(10, {'username': 'user10', 'discriminator': '0001'})
+            await db_manager.add_warning(1, 10, moderator_id=99)
+            await db_manager.jail_user(1, 10, moderator_id=99)
+
+            now = datetime.now(timezone.utc)
+            members = {(1, 10): {'account_created_at': now - timedelta(days=2),
+                                 'joined_at': now - timedelta(days=1), 'has_avatar': False}}
+            provider = UserContextProvider()
+            provider.member_lookup = lambda guild_id, user_id: members.get((guild_id, user_id))
+
+            contexts = await asyncio.gather(*[provider.get_context(user_id, 1) for user_id in (10, 11, 12)])
+            context = contexts[0]
+            assert context['is_new_user'] and not context['has_avatar'] and 1.9 < context['account_age_days'] < 2.1
+            assert (context['previous_warnings'], context['previous_jails']) == (1, 1)
+            assert contexts[1] == UserContextProvider.default_context()
+            assert provider.history_loads == 1
+            print("✅ Context built from member facts and one history load")
+
+            provider.record_warning(1, 10)
+            provider.record_jail(1, 11)
+            assert (await provider.get_context(10, 1))['previous_warnings'] == 2
+            assert (await provider.get_context(11, 1))['previous_jails'] == 1
+            assert provider.get_stats()['hits'] == 2 and provider.history_loads == 1
+            print("✅ New warnings and jails counted without reloading")
+
+            provider.update_member(1, 12, {'account_created_at': now - timedelta(days=1), 'has_avatar': True})
+            assert (await provider.get_context(12, 1))['account_age_days'] < 2
+            provider.remove_member(1, 12)
+            assert (await provider.get_context(12, 1)) == UserContextProvider.default_context()
+            print("✅ Member events refresh and drop cached contexts")
+        finally:
+            await release_test_database(db_manager)
+
+        print("🎉 User context tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ User context error: {e!r}")
+        return False
+
+async def test_analysis_pipeline():
+    """Test pipeline priorities, load shedding and detections from the worker pool"""
+    try:
+        print("\nTesting analysis pipeline...")
+
+        from detection import AnalysisPipeline, ThreatDetector, DetectionType
+
+        db_manager = await create_test_database()
+        pipeline = AnalysisPipeline(ThreatDetector(), executor='thread', workers=2,
+                                    queue_size=8, shed_ratio=0.5, sample_rate=0.0)
+        try:
+            detections = []
+
+            async def on_events(message_data, events):
+                detections.extend(event.detection_type for event in events)
+
+            pipeline.on_events = on_events
+            assert not pipeline.submit({'guild_id': 1, 'user_id': 1, 'content': 'hello'})
+
+            # Workers only run once the test yields, so the queue fills up first
+            pipeline.start()
+            accepted = [pipeline.submit({'guild_id': 1, 'user_id': user_id, 'content': 'hello there'})
+                        for user_id in range(6)]
+            assert accepted == [True] * 4 + [False] * 2
+            risky = [pipeline.submit({'guild_id': 1, 'user_id': 100 + i, 'channel_id': 5,
+                                      'content': f'free stuff at http://scam.example.com/{i}'})
+                     for i in range(5)]
+            assert risky == [True] * 4 + [False]
+            stats = pipeline.get_stats()
+            assert (stats['shed'], stats['dropped'], stats['queue_depth']) == (2, 1, 8), stats
+            print("✅ Low-risk messages shed and a full queue drops")
+
+            await pipeline._queue.join()
+            stats = pipeline.get_stats()
+            assert stats['processed'] == 8 and stats['failed'] == 0, stats
+            assert detections.count(DetectionType.MALICIOUS_LINKS) == 4, detections
+            print("✅ Queued messages analyzed on the worker pool")
+        finally:
+            await pipeline.stop()
+            await release_test_database(db_manager)
+
+        print("🎉 Analysis pipeline tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Analysis pipeline error: {e!r}")
+        return False
+
+async def test_detection_events():
+    """Test in-memory threat summaries and batched writes of detection events"""
+    try:
+        print("\nTesting detection event store...")
+
+        from datetime import datetime, timedelta
+        from detection import ThreatDetector, DetectionEventWriter, DetectionEvent, DetectionType, ThreatLevel
+
+        def make_event(user_id, detection_type, threat_level=ThreatLevel.MEDIUM):
+            return DetectionEvent(guild_id=1, user_id=user_id, detection_type=detection_type,
+                                  threat_level=threat_level, confidence=0.9, details={'rule_name': 'test'})
+
+        db_manager = await create_test_database()
+        try:
+            detector = ThreatDetector()
+            events = [make_event(10, DetectionType.SPAM), make_event(10, DetectionType.SPAM),
+                      make_event(11, DetectionType.RAID, ThreatLevel.HIGH)]
+            for event in events:
+                detector._record_event(event)
+            await detector.resolve_threat(events[0].event_id, 'warned', moderator_id=99)
+
+            summary = await detector.get_threat_summary(1, time_window=3600)
+            assert summary['total_detections'] == 3 and summary['active_threats'] == 2, summary
+            assert summary['threats_by_type'] == {'spam': 2, 'raid': 1}
+            assert summary['threats_by_level'] == {'medium': 2, 'high': 1}
+            assert summary['top_users'][0] == {'user_id': 10, 'count': 2}
+            assert (await detector.get_threat_summary(2))['total_detections'] == 0
+            print("✅ Threat summaries served from memory")
+
+            assert await detector.event_writer.flush() == 3
+            stored = await db_manager.get_detection_events(1, datetime.utcnow() - timedelta(hours=1))
+            assert len(stored) == 3
+            assert {record.event_id: record.resolution for record in stored if record.resolved} == \
+                {events[0].event_id: 'warned'}
+            assert detector.event_writer.get_stats()['pending_events'] == 0
+            print("✅ Events and resolutions written in one flush")
+
+            writer = DetectionEventWriter(max_pending=2)
+            for event in events:
+                writer.add(event)
+            assert writer.get_stats()['pending_events'] == 2 and writer.dropped == 1
+            print("✅ Pending events capped")
+        finally:
+            await release_test_database(db_manager)
+
+        print("🎉 Detection event tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Detection event error: {e!r}")
+        return False
+
+async def test_rule_plans():
+    """Test per-guild rule overrides compiled into cached rule plans"""
+    try:
+        print("\nTesting rule plans...")
+
+        from datetime import datetime, timedelta, timezone
+        from detection import ThreatDetector, ThreatLevel, DetectionType
+
+        db_manager = await create_test_database()
+        try:
+            detector = ThreatDetector()
+            default_plan = await detector.get_rule_plan(1)
+            assert default_plan is detector._default_plan and detector.plan_compilations == 1
+            assert 'spam_patterns' in default_plan.scan_categories and 'phone_numbers' not in default_plan.scan_categories
+            print("✅ Guilds without overrides share the default plan")
+
+            await detector.set_guild_rule(1, 'bot_detection', enabled=False)
+            await detector.set_guild_rule(1, 'mass_mentions', threshold=10, severity='high')
+            plan = await detector.get_rule_plan(1)
+            rules = {rule.name: rule for rule in plan.message_rules}
+            assert 'bot_detection' not in rules
+            assert rules['mass_mentions'].threshold == 10 and rules['mass_mentions'].severity == ThreatLevel.HIGH
+            assert detector.detection_rules['mass_mentions'].threshold == 3
+            assert 'mass_mentions' in plan.scan_categories and 'phone_numbers' not in plan.scan_categories
+            assert await detector.get_rule_plan(1) is plan and detector.plan_compilations == 2
+            assert await detector.get_rule_plan(2) is default_plan
+            print("✅ Overrides compiled once and narrow the pattern scan")
+
+            for rule_name, fields in (('nope', {'enabled': False}), ('spam_detection', {'threshold': 0}),
+                                      ('spam_detection', {'patterns': []})):
+                try:
+                    await detector.set_guild_rule(1, rule_name, **fields)
+                    raise AssertionError(f"override accepted: {rule_name} {fields}")
+                except ValueError:
+                    pass
+            print("✅ Invalid overrides rejected")
+
+            calls = 0
+
+            async def failing_get_rule_overrides(guild_id):
+                nonlocal calls
+                calls += 1
+                raise RuntimeError("database unavailable")
+
+            loaded_get_rule_overrides = db_manager.get_rule_overrides
+            db_manager.get_rule_overrides = failing_get_rule_overrides
+            plans = [await detector.get_rule_plan(1) for _ in range(50)]
+            db_manager.get_rule_overrides = loaded_get_rule_overrides
+            assert calls == 1 and all(cached is plan for cached in plans), calls
+            print("✅ Load failures keep the last plan and back off")
+
+            now = datetime.now(timezone.utc)
+            detector.user_context.update_member(2, 20, {'account_created_at': now - timedelta(days=1),
+                                                         'joined_at': now, 'has_avatar': False})
+            message = {'guild_id': 2, 'user_id': 20, 'channel_id': 5, 'content': 'hello there'}
+            assert await detector.analyze_message(message) == []
+            message['content'] = 'free stuff at http://scam.example.com'
+            first = await detector.analyze_message(message)
+            assert [event.detection_type for event in first] == [DetectionType.MALICIOUS_LINKS], first
+            assert await detector.analyze_message(message) == [] and detector.suppressed_detections == 1
+            print("✅ Harmless chat passes and rules stay quiet during their cooldown")
+
+            detector._rule_plan_retry_at.clear()
+            assert await detector.reset_guild_rules(1) == 2
+            assert await detector.get_rule_plan(1) is default_plan
+            print("✅ Resetting overrides returns to the default plan")
+        finally:
+            await release_test_database(db_manager)
+
+        print("🎉 Rule plan tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Rule plan error: {e!r}")
+        return False
+
+async def main():
+    """Run all tests"""
+    print("🚀 Starting Detection Tests")
+    print("=" * 50)
+
+    tests = [
+        test_combined_scanner,
+        test_spam_detectors,
+        test_rate_limiter,
+        test_state_eviction,
+        test_near_duplicates,
+        test_join_raids,
+        test_user_context,
+        test_analysis_pipeline,
+        test_detection_events,
+        test_rule_plans,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if await test():
+                passed += 1
+        except Exception as e:
+            print(f"❌ Test failed with exception: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("🎉 All detection tests passed!")
+        return True
+    else:
+        print("⚠️  Some tests failed. Please check the errors above.")
+        return False
+
+if __name__ == "__main__":
+    # Run tests
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)